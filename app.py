@@ -1,11 +1,21 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from database import get_connection, init_db
+from database import connection, read_source, apply_changes, delete_rows, rebuild_stats
+from query_cache import read_table, cache_stats
+import profiler
+from profiler import section
+from search import search
+from linking import partner_event_links, link_partner, refresh_links
+from whatsapp import partner_links, whatsapp_link
+from report_engine import PERIODS, METRICS, period_report, render_report
+from report_archive import PAGE_SIZE, save_report, report_count, report_page, report_body, compact_archive
+from exports import EXPORTS, FORMATS, export_title, export_file, file_name
+from charts import figure, partner_types
+from queries import dashboard_kpis, interaction_breakdown, urgent_tasks, stats_summary, stat, partner_count, partner_page, partner_filter_options
+from sync import SHEETS, push_all, pull_all, reset_tracking, enqueue, start_worker, outbox_status
 from datetime import datetime, timedelta
 import time
-import requests
-from streamlit_gsheets import GSheetsConnection
+from functools import partial
 
 import os
 
@@ -25,92 +35,19 @@ SCRIPT_URL = get_secret("script_url")
 # إعدادات الصفحة
 st.set_page_config(page_title="مشرف تنمية العلاقات المجتمعية", layout="wide", initial_sidebar_state="auto")
 
-# تهيئة قاعدة البيانات المحلية
-init_db()
+# بداية قياس إعادة التشغيل (لا يسجل شيئاً ما لم يُفعّل من لوحة الأداء)
+profiler.begin_run()
 
+# تهيئة قاعدة البيانات المحلية تتم مرة واحدة لكل عملية عند أول اتصال (database.get_connection)،
+# فلا تلمس شاشة الدخول القاعدة ولا يُعاد فحص المخطط في كل إعادة تشغيل
 # --- وظائف المزامنة السحابية الجديدة ---
-def sync_to_gs_via_script(table_name, df_custom=None):
-    """مزامنة البيانات من القاعدة المحلية إلى جوجل شيت عبر Apps Script"""
-    if not SCRIPT_URL:
-        return False
-        
-    tables_map = {
-        "action_plan": ("ActionPlan", ["الهدف", "النشاط", "المسؤول", "الزمن", "KPI", "الأولوية", "نوع المهمة", "الحالة"]),
-        "parents": ("Parents", ["الاسم", "النوع", "الخبرة", "التفاعل", "الهاتف"]),
-        "events": ("Events", ["الفعالية", "التاريخ", "المكان", "الحضور"]),
-        "reports": ("Reports", ["التاريخ", "نص التقرير"])
-    }
-    
-    if table_name not in tables_map:
-        return False
-    
-    sheet_name, columns = tables_map[table_name]
-    
-    if df_custom is not None:
-        df = df_custom
-    else:
-        conn = get_connection()
-        try:
-            df = pd.read_sql(f"SELECT * FROM {table_name}", conn)
-        except:
-            # محاولة أخيرة لضمان وجود الجدول
-            from database import init_db
-            init_db()
-            try:
-                df = pd.read_sql(f"SELECT * FROM {table_name}", conn)
-            except:
-                df = pd.DataFrame()
-        conn.close()
-    
-    if df.empty:
-        rows = []
-    else:
-        mapping = {
-            "action_plan": {
-                "objective": "الهدف", "activity": "النشاط", "responsibility": "المسؤول", 
-                "timeframe": "الزمن", "kpi": "KPI", "priority": "الأولوية", 
-                "task_type": "نوع المهمة", "status": "الحالة"
-            },
-            "parents": {
-                "name": "الاسم", "participation_type": "النوع", 
-                "expertise": "الخبرة", "interaction_level": "التفاعل",
-                "phone": "الهاتف"
-            },
-            "events": {
-                "name": "الفعالية", "date": "التاريخ", 
-                "location": "المكان", "attendees_count": "الحضور"
-            },
-            "reports": {
-                "report_date": "التاريخ", "report_content": "نص التقرير"
-            }
-        }
-        
-        df_sync = df.rename(columns=mapping.get(table_name, {}))
-        
-        # تحويل أي أعمدة تحتوي على تواريخ إلى نصوص لضمان ظهورها بشكل صحيح في جوجل شيت
-        for col in df_sync.columns:
-            if df_sync[col].dtype == 'datetime64[ns]' or 'تاريخ' in col or 'الزمن' in col or 'التاريخ' in col:
-                df_sync[col] = df_sync[col].astype(str)
-                
-        for col in columns:
-            if col not in df_sync.columns:
-                df_sync[col] = ""
-        
-        df_sync = df_sync[columns]
-        rows = [[str(item) if item is not None and str(item) != 'NaT' else "" for item in row] for row in df_sync.values.tolist()]
+def queue_sync(table_name):
+    """إضافة الجدول إلى طابور المزامنة والعودة فوراً دون انتظار الشبكة"""
+    if SCRIPT_URL:
+        enqueue(table_name)
 
-    payload = {
-        "action": "update",
-        "sheetName": sheet_name,
-        "columns": columns,
-        "rows": rows
-    }
-    
-    try:
-        response = requests.post(SCRIPT_URL, json=payload, timeout=15)
-        return response.status_code == 200
-    except Exception as e:
-        return False
+# عامل الخلفية يعمل مرة واحدة لكل عملية ويفرغ طابور المزامنة
+start_worker(SCRIPT_URL)
 
 if 'logged_in' not in st.session_state:
     st.session_state.logged_in = False
@@ -151,13 +88,21 @@ if not st.session_state.logged_in:
 
 is_admin = st.session_state.user_role == "admin"
 
+# الاتصال بجوجل شيت ومكتبته يُحمّلان عند أول حاجة فقط ويُحفظان لكل العملية؛
+# الخطأ لا يُخزن (يُرفع من داخل الدالة المخزنة) فتُعاد المحاولة في التشغيل التالي
+@st.cache_resource(show_spinner=False)
+def _open_gsheets_connection():
+    from streamlit_gsheets import GSheetsConnection
+    return st.connection("gsheets", type=GSheetsConnection)
+
 # محاولة الربط بجوجل شيت بشكل آمن
-conn_gs = None
-if os.path.exists(".streamlit/secrets.toml") or os.environ.get("CONNECTIONS_GSHEETS_SPREADSHEET"):
+def gsheets_connection():
+    if not (os.path.exists(".streamlit/secrets.toml") or os.environ.get("CONNECTIONS_GSHEETS_SPREADSHEET")):
+        return None
     try:
-        conn_gs = st.connection("gsheets", type=GSheetsConnection)
+        return _open_gsheets_connection()
     except Exception:
-        conn_gs = None
+        return None
 
 # تنسيق CSS مخصص - ألوان هادئة ورسمية
 st.markdown("""
@@ -248,71 +193,130 @@ st.markdown("""
     """, unsafe_allow_html=True)
 
 # --- وظائف مساعدة ---
+# أسماء الأعمدة المعروضة في جداول التحرير (عمود القاعدة: اسم العرض)
+PLAN_COLUMNS = {
+    'objective': 'الهدف',
+    'activity': 'النشاط',
+    'responsibility': 'المسؤول',
+    'timeframe': 'الجدول الزمني',
+    'kpi': 'مؤشر الأداء',
+    'priority': 'الأولوية',
+    'status': 'الحالة',
+    'task_type': 'نوع المهمة'
+}
+PARTNER_COLUMNS = {
+    'name': 'الاسم',
+    'participation_type': 'نوع المشاركة',
+    'expertise': 'الخبرة/المجال',
+    'interaction_level': 'مستوى التفاعل',
+    'phone': 'رقم الهاتف'
+}
+EVENT_COLUMNS = {
+    'name': 'الفعالية',
+    'date': 'التاريخ',
+    'location': 'المكان',
+    'attendees_count': 'الحضور المتوقع',
+    'rating': 'التقييم'
+}
+
+def _editor_value(col, value):
+    # عمود الزمن في الخطة (DateColumn) يصل من المحرر بصيغة ISO فنحفظ جزء التاريخ فقط؛
+    # تاريخ الفعاليات نص حر يُحفظ كما كُتب
+    if col == 'timeframe' and value:
+        return str(value)[:10]
+    return value
+
+def save_editor_changes(table, editor_key, display_df, columns, required=(), defaults=None):
+    """حفظ فروقات محرر الجدول فقط (المعدل والمضاف والمحذوف) بدلاً من إعادة كتابة كل الصفوف"""
+    state = st.session_state.get(editor_key) or {}
+    to_db = {shown: col for col, shown in columns.items()}
+    ids = display_df['id'].tolist()
+
+    def db_values(changes):
+        return {to_db[k]: _editor_value(to_db[k], v) for k, v in changes.items() if k in to_db}
+
+    updates = []
+    for pos, changes in state.get("edited_rows", {}).items():
+        rid = ids[int(pos)]
+        values = db_values(changes)
+        # تعديل أعمدة العرض فقط (مثل مربع الحذف) لا يستدعي أي كتابة
+        if values and not pd.isna(rid):
+            updates.append((int(rid), values))
+    inserts = []
+    for added in state.get("added_rows", []):
+        values = db_values(added)
+        if any(values.get(c) for c in required):
+            inserts.append({**(defaults or {}), **values})
+    deletes = [int(ids[pos]) for pos in state.get("deleted_rows", []) if not pd.isna(ids[pos])]
+    return apply_changes(table, updates, inserts, deletes)
+
 def load_data(table):
-    conn = get_connection()
+    # القراءة تمر عبر ذاكرة التخزين المشتركة ولا تلمس القاعدة إلا بعد تغير بيانات الجدول
     try:
-        df = pd.read_sql(f"SELECT * FROM {table}", conn)
+        with section(f"تحميل {table}"):
+            df = read_table(table)
     except Exception:
-        init_db()
-        try: df = pd.read_sql(f"SELECT * FROM {table}", conn)
-        except: df = pd.DataFrame()
-    conn.close()
+        df = pd.DataFrame()
     
     # إذا كانت البيانات فارغة محلياً وهناك اتصال بجوجل شيت، نحاول المزامنة
-    if df.empty and conn_gs:
+    if df.empty and gsheets_connection():
         sync_data_from_gs()
         # محاولة التحميل مرة أخرى بعد المزامنة
-        conn = get_connection()
-        try: df = pd.read_sql(f"SELECT * FROM {table}", conn)
+        try: df = read_table(table)
         except: df = pd.DataFrame()
-        conn.close()
         
     return df
 
+def sheet_modified_time(conn_gs):
+    """وقت آخر تعديل لملف جوجل شيت (Drive API)، أو None إذا لم يكن متاحاً (مثل الملفات العامة)"""
+    try:
+        return conn_gs.client._open_spreadsheet().get_lastUpdateTime()
+    except Exception:
+        return None
+
 def sync_data_from_gs(force=False):
+    conn_gs = gsheets_connection()
     if not conn_gs:
         return
     
-    tables_map = {
-        "action_plan": ("ActionPlan", {
-            "الهدف": "objective", "النشاط": "activity", "المسؤول": "responsibility", 
-            "الزمن": "timeframe", "KPI": "kpi", "الأولوية": "priority", 
-            "نوع المهمة": "task_type", "الحالة": "status"
-        }),
-        "parents": ("Parents", {
-            "الاسم": "name", "النوع": "participation_type", 
-            "الخبرة": "expertise", "التفاعل": "interaction_level",
-            "الهاتف": "phone"
-        }),
-        "events": ("Events", {
-            "الفعالية": "name", "التاريخ": "date", 
-            "المكان": "location", "الحضور": "attendees_count"
-        }),
-        "reports": ("Reports", {
-            "التاريخ": "report_date", "نص التقرير": "report_content"
-        })
-    }
+    # السحب التلقائي للجداول الفارغة محلياً فقط، والقسري لكل الجداول
+    if force:
+        tables = list(SHEETS)
+    else:
+        with connection() as conn:
+            tables = [t for t in SHEETS if conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] == 0]
+    if not tables:
+        return
     
-    conn = get_connection()
-    for table, (ws, mapping) in tables_map.items():
-        try:
-            # التحقق إذا كان الجدول فارغاً أو إذا كان هناك طلب مزامنة قسرية
-            local_count = pd.read_sql(f"SELECT COUNT(*) as count FROM {table}", conn).iloc[0]['count']
-            if local_count == 0 or force:
-                gs_df = conn_gs.read(worksheet=ws, ttl=0)
-                if not gs_df.empty:
-                    gs_df = gs_df.dropna(how='all')
-                    to_insert = gs_df.rename(columns=mapping)
-                    cols = list(mapping.values())
-                    to_insert = to_insert[[c for c in cols if c in to_insert.columns]]
-                    
-                    if not to_insert.empty:
-                        if force:
-                            conn.execute(f"DELETE FROM {table}")
-                        to_insert.to_sql(table, conn, if_exists='append', index=False)
-        except Exception as e:
-            st.sidebar.warning(f"⚠️ فشل مزامنة {table}: {e}")
-    conn.close()
+    # قراءة الأوراق بالتوازي ثم دمج كل جدول في معاملة مستقلة بمطابقة عمود المعرف؛
+    # في السحب القسري تُتخطى الجداول التي لم يتغير الملف منذ آخر سحب لها
+    modified = sheet_modified_time(conn_gs) if force else None
+    with section("مزامنة: سحب"):
+        results = pull_all(lambda ws: conn_gs.read(worksheet=ws, ttl=0), tables, modified)
+    imported = False
+    for table, result in results.items():
+        if isinstance(result, Exception):
+            st.sidebar.warning(f"⚠️ فشل مزامنة {table}: {result}")
+        elif any(result.values()):
+            imported = True
+    if imported:
+        # المشغلات تحدّث الملخص أثناء الاستيراد، لكن إعادة البناء تضمن تطابقه بعد الاستبدال الجماعي
+        rebuild_stats()
+        # الروابط الآلية تُحسب من الشركاء والفعاليات المسحوبة
+        if any(isinstance(results.get(t), dict) and any(results[t].values()) for t in ("parents", "events")):
+            refresh_links()
+        # التقارير المسحوبة تُكتب نصاً عادياً ثم تُضغط
+        if isinstance(results.get("reports"), dict) and any(results["reports"].values()):
+            compact_archive()
+
+def show_period_report(report):
+    """مؤشرات التقرير الدوري مع نسبة التغير عن الفترة السابقة"""
+    st.caption(f"{report['title']} — {report['label']} (مقارنة مع {report['previous_label']})")
+    cols = st.columns(4)
+    for i, (key, name) in enumerate(METRICS.items()):
+        value = report['current'][key]
+        change = report['change'][key]
+        cols[i % 4].metric(name, "—" if value is None else value, f"{change:+.1f}%" if change is not None else None)
 
 # --- القائمة الجانبية ---
 # الساعة والتاريخ (ساعة حية)
@@ -373,9 +377,16 @@ menu = st.sidebar.radio(
         "🤖 الذكاء الاصطناعي"
     ]
 )
+profiler.set_label(menu)
 
 st.sidebar.markdown("---")
 st.sidebar.subheader("🔄 حالة البيانات")
+if SCRIPT_URL:
+    outbox = outbox_status()
+    st.sidebar.caption(f"📮 بانتظار الرفع: {outbox['depth']} | آخر رفع ناجح: {outbox['last_success'] or '—'} (UTC)")
+    if outbox['last_error']:
+        st.sidebar.caption(f"⚠️ {outbox['last_error']} — ستُعاد المحاولة تلقائياً")
+
 if st.sidebar.button("📥 مزامنة من السحابة"):
     with st.spinner("جاري استيراد البيانات من Google Sheets..."):
         sync_data_from_gs(force=True)
@@ -385,26 +396,72 @@ if st.sidebar.button("📥 مزامنة من السحابة"):
 if st.sidebar.button("📤 مزامنة إلى السحابة"):
     with st.spinner("جاري رفع البيانات..."):
         success = True
-        conn = get_connection()
+        to_push = []
         for table in ["action_plan", "parents", "events", "reports"]:
             try:
                 # منع مسح البيانات السحابية إذا كانت القاعدة المحلية فارغة تماماً
-                count_df = pd.read_sql(f"SELECT COUNT(*) as count FROM {table}", conn)
-                count = count_df.iloc[0]['count'] if not count_df.empty else 0
+                with connection() as conn:
+                    count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
                 
                 if count > 0:
-                    if not sync_to_gs_via_script(table):
-                        success = False
-                        st.sidebar.error(f"فشلت مزامنة {table}")
+                    to_push.append(table)
                 else:
                     st.sidebar.info(f"تخطي {table} لأنها فارغة محلياً")
             except Exception as e:
                 st.sidebar.error(f"⚠️ خطأ في قراءة الجدول {table}")
                 success = False
-        conn.close()
+        
+        # رفع الجداول بالتوازي عبر جلسة HTTP مشتركة، مع زمن كل جدول
+        with section("مزامنة: رفع"):
+            pushed = push_all(SCRIPT_URL, to_push, full=True)
+        for table, result in pushed.items():
+            if result["ok"]:
+                st.sidebar.caption(f"✅ {table} ({result['seconds']:.1f} ث)")
+            else:
+                success = False
+                st.sidebar.error(f"فشلت مزامنة {table} ({result['seconds']:.1f} ث)")
         if success:
             st.sidebar.success("تمت المزامنة بالكامل")
 
+if is_admin:
+    stats = cache_stats()
+    st.sidebar.caption(f"⚡ الذاكرة المؤقتة: {stats['hits']} إصابة / {stats['misses']} إخفاق ({stats['bytes'] / 1048576:.1f} MB)")
+    if st.sidebar.button("🧮 إعادة بناء الإحصائيات"):
+        rebuild_stats()
+        st.sidebar.success("تمت إعادة حساب ملخص الإحصائيات")
+
+    # لوحة الأداء: القياس يعمل فقط أثناء تفعيله ويشمل كل الجلسات في العملية
+    with st.sidebar.expander("⏱️ الأداء"):
+        profiling = st.toggle("تفعيل القياس", value=profiler.is_enabled(), key="perf_on")
+        if profiling != profiler.is_enabled():
+            profiler.enable(profiling)
+        if profiling:
+            runs = profiler.recent_runs(10)
+            if runs:
+                st.caption("آخر عمليات إعادة التشغيل")
+                st.dataframe(pd.DataFrame(runs)[['label', 'total_ms', 'query_count', 'sql_ms', 'completed']], hide_index=True)
+                if runs[0]['sections']:
+                    st.caption(f"أقسام آخر تشغيل ({runs[0]['label'] or '—'})")
+                    st.dataframe(pd.DataFrame(runs[0]['sections']), hide_index=True)
+                st.caption("أبطأ الاستعلامات")
+                st.dataframe(pd.DataFrame(profiler.slowest_queries(10)), hide_index=True)
+            else:
+                st.caption("تظهر القياسات بعد إعادة التشغيل التالية")
+            calls = profiler.sync_calls()
+            if calls:
+                st.caption("طلبات المزامنة")
+                st.dataframe(pd.DataFrame(calls), hide_index=True)
+            st.download_button("⬇️ تصدير JSON", profiler.export_json(), "profile.json", "application/json")
+            if st.button("🧹 مسح القياسات"):
+                profiler.clear()
+
+    # الملف يُبنى عند النقر فقط (ومن الذاكرة المؤقتة ما لم تتغير بيانات الجدول)
+    with st.sidebar.expander("⬇️ تصدير البيانات"):
+        export_table = st.selectbox("الجدول", list(EXPORTS), format_func=export_title, key="export_table")
+        for fmt, (fmt_label, mime) in FORMATS.items():
+            st.download_button(fmt_label, partial(export_file, export_table, fmt), file_name(export_table, fmt), mime,
+                               key=f"export_{fmt}", on_click="ignore")
+
 st.sidebar.markdown("---")
 st.sidebar.markdown("<p style='text-align:center; color:#95a5a6; font-size:0.7rem;'>تطوير: توفيق اليعقوبي</p>", unsafe_allow_html=True)
 
@@ -415,50 +472,51 @@ if st.sidebar.button("🚪 تسجيل الخروج"):
 
 # --- معالجة البحث ---
 if search_query:
-    all_dfs = {"الشركاء": load_data("parents"), "الخطة": load_data("action_plan")}
+    # البحث عبر فهرس FTS5 في جميع الجداول، مع ترتيب النتائج حسب الصلة
+    results = search(search_query, limit=50)
     with st.expander("🔎 نتائج البحث", expanded=True):
-        for cat, df in all_dfs.items():
-            if not df.empty:
-                res = df[df.astype(str).apply(lambda x: x.str.contains(search_query, case=False)).any(axis=1)]
-                if not res.empty:
-                    st.write(f"**📍 في {cat}:**")
-                    st.dataframe(res.drop(columns=['id'], errors='ignore'), use_container_width=True)
+        if not results:
+            st.info("لا توجد نتائج مطابقة")
+        for cat, res in results.items():
+            st.write(f"**📍 في {cat}:**")
+            st.dataframe(res.drop(columns=['id'], errors='ignore'), use_container_width=True)
 
 # --- التنقل بين التبويبات ---
 
 if menu == "📊 لوحة التحكم":
     st.title("📊 لوحة القيادة المجتمعية")
-    df_p = load_data("parents")
-    df_pl = load_data("action_plan")
-    df_e = load_data("events")
+    # المؤشرات تُحسب داخل SQLite ولا تُحمّل الجداول كاملة
+    with section("مؤشرات لوحة التحكم"):
+        kpis = dashboard_kpis()
     
     c1, c2, c3, c4 = st.columns(4)
-    c1.metric("الشركاء المسجلين", len(df_p))
-    c2.metric("الفعاليات المجدولة", len(df_e))
-    c3.metric("أهداف محققة", len(df_pl[df_pl['status'] == 'مكتمل']) if not df_pl.empty else 0)
-    c4.metric("تفاعل الشركاء", f"{(len(df_p[df_p['interaction_level'] == 'مرتفع'])/len(df_p)*100 if not df_p.empty else 0):.0f}%")
+    c1.metric("الشركاء المسجلين", kpis['partners'])
+    c2.metric("الفعاليات المجدولة", kpis['events'])
+    c3.metric("أهداف محققة", kpis['completed_goals'])
+    c4.metric("تفاعل الشركاء", f"{kpis['high_interaction_pct']:.0f}%")
     
     st.divider()
     col_l, col_r = st.columns(2)
     with col_l:
         st.subheader("📈 تفاعل الشركاء")
-        if not df_p.empty and 'interaction_level' in df_p.columns:
-            st.plotly_chart(px.pie(df_p, names='interaction_level', hole=0.4, color_discrete_sequence=px.colors.sequential.Blues_r), use_container_width=True)
+        levels = interaction_breakdown()
+        if not levels.empty:
+            with section("رسم التفاعل"):
+                st.plotly_chart(figure("interaction"), use_container_width=True)
         else:
             st.info("لا توجد بيانات تفاعل كافية")
     with col_r:
         st.subheader("🚨 مهام عاجلة")
-        if not df_pl.empty and 'priority' in df_pl.columns and 'status' in df_pl.columns:
-            urgent = df_pl[(df_pl['priority'] == 'مرتفع') & (df_pl['status'] != 'مكتمل')]
-            if not urgent.empty:
-                for _, r in urgent.iterrows(): 
-                    t_icon = "💰" if r.get('task_type') == 'مادي' else "💡"
-                    date_info = f"📅 {r['timeframe']}" if r['timeframe'] else ""
-                    
-                    st.error(f"{t_icon} **{r['activity']}** \n {date_info}")
-            else: st.success("لا توجد مهام متأخرة")
-        else:
-            st.success("لا توجد مهام مسجلة")
+        urgent = urgent_tasks(limit=20)
+        if not urgent.empty:
+            for _, r in urgent.iterrows(): 
+                t_icon = "💰" if r.get('task_type') == 'مادي' else "💡"
+                date_info = f"📅 {r['timeframe']}" if r['timeframe'] else ""
+                
+                st.error(f"{t_icon} **{r['activity']}** \n {date_info}")
+            if kpis['urgent_total'] > len(urgent):
+                st.caption(f"… و{kpis['urgent_total'] - len(urgent)} مهام عاجلة أخرى في خطة العمل")
+        else: st.success("لا توجد مهام متأخرة")
 
 elif menu == "📅 خطة العمل":
     st.title("📅 خطة العمل السنوية")
@@ -479,32 +537,18 @@ elif menu == "📅 خطة العمل":
                     t_type = st.selectbox("نوع المهمة", ["معنوي", "مادي"])
                 
                 if st.form_submit_button("حفظ"):
-                    conn = get_connection()
                     try:
-                        conn.execute("INSERT INTO action_plan (objective, activity, responsibility, timeframe, kpi, priority, status, task_type) VALUES (?,?,?,?,?,?,'قيد التنفيذ',?)", 
-                                     (obj, act, resp, str(timeframe), kpi, prio, t_type))
-                        conn.commit()
-                        conn.close()
-                        
+                        with connection("action_plan") as conn:
+                            conn.execute("INSERT INTO action_plan (objective, activity, responsibility, timeframe, kpi, priority, status, task_type) VALUES (?,?,?,?,?,?,'قيد التنفيذ',?)", 
+                                         (obj, act, resp, str(timeframe), kpi, prio, t_type))
+                    except Exception as e:
+                        st.error(f"خطأ: {e}")
+                    else:
                         # مزامنة سحابية عبر الرابط الجديد
-                        sync_to_gs_via_script("action_plan")
+                        queue_sync("action_plan")
                         
                         st.success("تم الحفظ بنجاح")
                         st.rerun()
-                    except Exception as e:
-                        # إضافة العمود في حال عدم وجوده
-                        if "no column named task_type" in str(e):
-                            conn.execute("ALTER TABLE action_plan ADD COLUMN task_type TEXT DEFAULT 'معنوي'")
-                            conn.commit()
-                            conn.execute("INSERT INTO action_plan (objective, activity, responsibility, timeframe, kpi, priority, status, task_type) VALUES (?,?,?,?,?,?,'قيد التنفيذ',?)", 
-                                         (obj, act, resp, str(timeframe), kpi, prio, t_type))
-                            conn.commit()
-                            conn.close()
-                            sync_to_gs_via_script("action_plan")
-                            st.success("تم التحديث والحفظ")
-                            st.rerun()
-                        else:
-                            st.error(f"خطأ: {e}")
     
     if not df_pl.empty:
         st.subheader("📋 بنود الخطة")
@@ -516,16 +560,7 @@ elif menu == "📅 خطة العمل":
             pass
             
         # ترجمة الأعمدة للعرض
-        display_pl = df_pl.rename(columns={
-            'objective': 'الهدف',
-            'activity': 'النشاط',
-            'responsibility': 'المسؤول',
-            'timeframe': 'الجدول الزمني',
-            'kpi': 'مؤشر الأداء',
-            'priority': 'الأولوية',
-            'status': 'الحالة',
-            'task_type': 'نوع المهمة'
-        })
+        display_pl = df_pl.rename(columns=PLAN_COLUMNS)
         
         if is_admin:
             display_pl['حذف'] = False
@@ -534,76 +569,49 @@ elif menu == "📅 خطة العمل":
             if st.session_state.get("plan_edit") and (st.session_state.plan_edit.get("edited_rows") or st.session_state.plan_edit.get("added_rows") or st.session_state.plan_edit.get("deleted_rows")):
                 st.warning("⚠️ لديك تعديلات غير محفوظة في الجدول أدناه. يرجى الضغط على زر 'حفظ كافة التعديلات' لحفظها.")
 
-            edited_df = st.data_editor(
-                display_pl, 
-                key="plan_edit", 
-                use_container_width=True, 
-                num_rows="dynamic",
-                column_config={
-                    "id": st.column_config.NumberColumn("ID", disabled=True),
-                    "الجدول الزمني": st.column_config.DateColumn("الجدول الزمني")
-                }
-            )
+            with section("محرر الخطة"):
+                edited_df = st.data_editor(
+                    display_pl, 
+                    key="plan_edit", 
+                    use_container_width=True, 
+                    num_rows="dynamic",
+                    column_config={
+                        "id": st.column_config.NumberColumn("ID", disabled=True),
+                        "الجدول الزمني": st.column_config.DateColumn("الجدول الزمني")
+                    }
+                )
             
             c_del, c_save = st.columns(2)
             if c_del.button("🔴 حذف المحدد من الخطة"):
                 to_del = edited_df[edited_df['حذف'] == True]
                 if not to_del.empty:
-                    conn = get_connection()
-                    for rid in to_del['id']: 
-                        if not pd.isna(rid):
-                            conn.execute(f"DELETE FROM action_plan WHERE id={rid}")
-                    conn.commit(); conn.close()
+                    delete_rows("action_plan", to_del['id'].tolist())
                     
-                    # مزامنة سحابية بعد الحذف عبر الرابط
-                    sync_to_gs_via_script("action_plan")
+                    # مزامنة سحابية واحدة بعد الحذف
+                    queue_sync("action_plan")
                         
                     st.success("تم الحذف بنجاح")
                     st.rerun()
             
             if c_save.button("💾 حفظ كافة التعديلات في الخطة"):
-                conn = get_connection()
                 try:
-                    for _, row in edited_df.iterrows():
-                        if 'id' in row and not pd.isna(row['id']):
-                            conn.execute("""UPDATE action_plan SET objective=?, activity=?, responsibility=?, timeframe=?, kpi=?, priority=?, status=?, task_type=? WHERE id=?""",
-                                         (row['الهدف'], row['النشاط'], row['المسؤول'], str(row['الجدول الزمني']), row['مؤشر الأداء'], row['الأولوية'], row['الحالة'], row.get('نوع المهمة', 'معنوي'), row['id']))
-                        else:
-                            # إضافة بند جديد تم إدخاله عبر الجدول
-                            if row['الهدف'] or row['النشاط']:
-                                conn.execute("""INSERT INTO action_plan (objective, activity, responsibility, timeframe, kpi, priority, status, task_type) 
-                                               VALUES (?,?,?,?,?,?,?,?)""",
-                                             (row['الهدف'], row['النشاط'], row['المسؤول'], str(row['الجدول الزمني']), row['مؤشر الأداء'], row['الأولوية'], row.get('الحالة', 'قيد التنفيذ'), row.get('نوع المهمة', 'معنوي')))
-                    conn.commit()
+                    # البنود الجديدة تُحفظ فقط إذا احتوت على هدف أو نشاط
+                    changed = save_editor_changes("action_plan", "plan_edit", display_pl, PLAN_COLUMNS,
+                                                  required=('objective', 'activity'),
+                                                  defaults={'status': 'قيد التنفيذ', 'task_type': 'معنوي'})
                 except Exception as e:
-                    if "no column named task_type" in str(e):
-                        conn.execute("ALTER TABLE action_plan ADD COLUMN task_type TEXT DEFAULT 'معنوي'")
-                        conn.commit()
-                        for _, row in edited_df.iterrows():
-                            if 'id' in row and not pd.isna(row['id']):
-                                conn.execute("""UPDATE action_plan SET objective=?, activity=?, responsibility=?, timeframe=?, kpi=?, priority=?, status=?, task_type=? WHERE id=?""",
-                                             (row['الهدف'], row['النشاط'], row['المسؤول'], str(row['الجدول الزمني']), row['مؤشر الأداء'], row['الأولوية'], row['الحالة'], row.get('نوع المهمة', 'معنوي'), row['id']))
-                            else:
-                                if row['الهدف'] or row['النشاط']:
-                                    conn.execute("""INSERT INTO action_plan (objective, activity, responsibility, timeframe, kpi, priority, status, task_type) 
-                                                   VALUES (?,?,?,?,?,?,?,?)""",
-                                                 (row['الهدف'], row['النشاط'], row['المسؤول'], str(row['الجدول الزمني']), row['مؤشر الأداء'], row['الأولوية'], row.get('الحالة', 'قيد التنفيذ'), row.get('نوع المهمة', 'معنوي')))
-                        conn.commit()
-                    else:
-                        st.error(f"❌ خطأ في قاعدة البيانات: {e}")
-                finally:
-                    conn.close()
-                
-                # مزامنة سحابية شاملة بعد الحفظ
-                sync_to_gs_via_script("action_plan")
-                st.success("✅ تم تحديث الخطة بنجاح")
-                st.rerun()
+                    st.error(f"❌ خطأ في قاعدة البيانات: {e}")
+                else:
+                    # مزامنة سحابية بعد الحفظ
+                    if changed:
+                        queue_sync("action_plan")
+                    st.success("✅ تم تحديث الخطة بنجاح")
+                    st.rerun()
         else:
             st.dataframe(display_pl.drop(columns=['id'], errors='ignore'), use_container_width=True)
 
 elif menu == "👨‍👩‍👧‍👦 الشركاء وأولياء الأمور":
     st.title("👨‍👩‍👧‍👦 إدارة الشركاء الاستراتيجيين")
-    df_e = load_data("events")
     
     # السماح للجميع (المسؤول والزوار) بتسجيل شريك جديد
     with st.expander("➕ تسجيل شريك جديد"):
@@ -614,142 +622,141 @@ elif menu == "👨‍👩‍👧‍👦 الشركاء وأولياء الأمو
             level = st.selectbox("مستوى التفاعل المتوقع", ["مرتفع", "متوسط", "محدود"])
             phone = st.text_input("رقم الهاتف")
             if st.form_submit_button("إضافة شريك"):
-                conn = get_connection()
                 try:
-                    conn.execute("INSERT INTO parents (name, participation_type, expertise, interaction_level, phone) VALUES (?,?,?,?,?)", (name, type_p, exp, level, phone))
-                    conn.commit()
-                except Exception as e:
-                    if "no column named phone" in str(e):
-                        conn.execute("ALTER TABLE parents ADD COLUMN phone TEXT")
-                        conn.commit()
+                    with connection("parents") as conn:
                         conn.execute("INSERT INTO parents (name, participation_type, expertise, interaction_level, phone) VALUES (?,?,?,?,?)", (name, type_p, exp, level, phone))
-                        conn.commit()
-                    else:
-                        st.error(f"خطأ: {e}")
-                finally:
-                    conn.close()
+                except Exception as e:
+                    st.error(f"خطأ: {e}")
+                else:
+                    refresh_links()
                 
                 # مزامنة سحابية عبر الرابط الجديد
-                sync_to_gs_via_script("parents")
+                queue_sync("parents")
                 
                 st.success("تم تسجيل الشريك بنجاح")
                 st.rerun()
 
-    df_p = load_data("parents")
-    if not df_p.empty:
+    # التحميل الأول من جوجل شيت إذا كان الجدول فارغاً محلياً
+    if not partner_count():
+        load_data("parents")
+    if partner_count():
         st.subheader("🔍 استعراض الشركاء")
         
+        # الجدول والبطاقات يعرضان صفحة واحدة حتى لا يُبنى المحرر والروابط لآلاف الشركاء في كل إعادة تشغيل
+        type_options, level_options = partner_filter_options()
+        sort_labels = {"الاسم": "name", "الأحدث": "newest", "مستوى التفاعل": "interaction_level"}
+        f1, f2, f3, f4 = st.columns(4)
+        f_type = f1.selectbox("مجال الشراكة", ["الكل"] + type_options, key="p_f_type")
+        f_level = f2.selectbox("مستوى التفاعل", ["الكل"] + level_options, key="p_f_level")
+        f_sort = f3.selectbox("الترتيب", list(sort_labels), key="p_f_sort")
+        page_size = f4.selectbox("عدد البطاقات", [10, 20, 50], index=1, key="p_page_size")
+        
+        filters = dict(participation_type=None if f_type == "الكل" else f_type,
+                       interaction_level=None if f_level == "الكل" else f_level)
+        total = partner_count(**filters)
+        pages = max(1, -(-total // page_size))
+        # العودة للصفحة الأولى إذا قلّ عدد الصفحات بعد تغيير الفلتر
+        if st.session_state.get("p_page", 1) > pages:
+            st.session_state.p_page = 1
+        page = st.number_input("الصفحة", min_value=1, max_value=pages, step=1, key="p_page") if pages > 1 else 1
+        page_df = partner_page(page, page_size, sort=sort_labels[f_sort], **filters)
+        if total:
+            st.caption(f"عرض {(page - 1) * page_size + 1}–{(page - 1) * page_size + len(page_df)} من {total} شريك")
+        else:
+            st.info("لا يوجد شركاء مطابقون للفلتر")
+        
         # ترجمة الأعمدة للعرض
-        display_p = df_p.rename(columns={
-            'name': 'الاسم',
-            'participation_type': 'نوع المشاركة',
-            'expertise': 'الخبرة/المجال',
-            'interaction_level': 'مستوى التفاعل',
-            'phone': 'رقم الهاتف'
-        })
+        display_p = page_df.rename(columns=PARTNER_COLUMNS)
         
-        # إضافة عمود لرابط واتساب الذكي
-        def make_ai_whatsapp_link(row):
-            phone = row.get('رقم الهاتف')
-            name = row.get('الاسم')
-            p_type = row.get('نوع المشاركة')
-            
-            if phone and name:
-                # صياغة رسمية ودية طويلة
-                message = f"""الأخ الفاضل الأستاذ {name} المحترم،،
-
-السلام عليكم ورحمة الله وبركاته..
-يسرنا في قسم تنمية العلاقات المجتمعية أن نتقدم لشخصكم الكريم بخالص الشكر وعظيم الامتنان على مساهماتكم القيمة وتفاعلكم المستمر في مجال ({p_type}). إننا نؤمن يقيناً بأن نجاح مبادراتنا يعتمد بشكل كبير على وجود شركاء متميزين مثلكم، ونثمن عالياً هذا العطاء الذي يعكس روح المسؤولية والتعاون المشترك. نتطلع دوماً لاستمرار هذا التعاون المثمر، ونسأل الله العلي القدير أن يبارك في جهودكم ويسدد خطاكم لما فيه خير الجميع.
-
-تفضلوا بقبول فائق التقدير والامتنان،،
-أ . توفيق اليعقوبي (مشرف تنمية علاقات مجتمعية)"""
-                
-                # تنظيف الرقم وتجهيز الرابط
-                clean_phone = ''.join(filter(str.isdigit, str(phone)))
-                encoded_msg = message.replace(' ', '%20').replace('\n', '%0A')
-                return f"https://api.whatsapp.com/send?phone={clean_phone}&text={encoded_msg}"
-            return ""
-
         if is_admin:
-            display_p['واتساب الذكي'] = display_p.apply(make_ai_whatsapp_link, axis=1)
+            display_p['واتساب الذكي'] = display_p['id'].map(partner_links(page_df, "thanks")).fillna("")
             display_p['حذف'] = False
+            # مفتاح المحرر مرتبط بالصفحة والفلاتر، فلا تنطبق تعديلات صفحة على صفوف صفحة أخرى
+            p_edit = f"p_edit_{page}_{page_size}_{f_type}_{f_level}_{f_sort}"
             
             # تنبيه بوجود تغييرات غير محفوظة
-            if st.session_state.get("p_edit") and (st.session_state.p_edit.get("edited_rows") or st.session_state.p_edit.get("added_rows") or st.session_state.p_edit.get("deleted_rows")):
+            if st.session_state.get(p_edit) and (st.session_state[p_edit].get("edited_rows") or st.session_state[p_edit].get("added_rows") or st.session_state[p_edit].get("deleted_rows")):
                 st.warning("⚠️ لديك تعديلات غير محفوظة في الجدول أدناه. يرجى الضغط على زر 'حفظ تعديلات الشركاء' لحفظها.")
 
-            edited_p = st.data_editor(
-                display_p, 
-                key="p_edit", 
-                use_container_width=True, 
-                num_rows="dynamic",
-                column_config={
-                    "id": st.column_config.NumberColumn("ID", disabled=True),
-                    "واتساب الذكي": st.column_config.LinkColumn("🤖 مراسلة ذكية", display_text="رسالة شكر")
-                }
-            )
+            with section("محرر الشركاء"):
+                edited_p = st.data_editor(
+                    display_p, 
+                    key=p_edit, 
+                    use_container_width=True, 
+                    num_rows="dynamic",
+                    column_config={
+                        "id": st.column_config.NumberColumn("ID", disabled=True),
+                        "واتساب الذكي": st.column_config.LinkColumn("🤖 مراسلة ذكية", display_text="رسالة شكر")
+                    }
+                )
             
             c_p1, c_p2 = st.columns(2)
             if c_p1.button("🔴 حذف المحدد من الشركاء"):
                 to_del = edited_p[edited_p['حذف'] == True]
                 if not to_del.empty:
-                    conn = get_connection()
-                    for rid in to_del['id']: 
-                        if not pd.isna(rid):
-                            conn.execute(f"DELETE FROM parents WHERE id={rid}")
-                    conn.commit(); conn.close()
+                    delete_rows("parents", to_del['id'].tolist())
                     
-                    # مزامنة سحابية بعد الحذف عبر الرابط
-                    sync_to_gs_via_script("parents")
+                    # مزامنة سحابية واحدة بعد الحذف
+                    queue_sync("parents")
                         
                     st.success("تم الحذف بنجاح")
                     st.rerun()
             
             if c_p2.button("💾 حفظ تعديلات الشركاء"):
-                conn = get_connection()
-                for _, row in edited_p.iterrows():
-                    if 'id' in row and not pd.isna(row['id']):
-                        conn.execute("""UPDATE parents SET name=?, participation_type=?, expertise=?, interaction_level=?, phone=? WHERE id=?""",
-                                     (row['الاسم'], row['نوع المشاركة'], row['الخبرة/المجال'], row['مستوى التفاعل'], row.get('رقم الهاتف', ''), row['id']))
-                    else:
-                        if row['الاسم']:
-                            conn.execute("""INSERT INTO parents (name, participation_type, expertise, interaction_level, phone) VALUES (?,?,?,?,?)""",
-                                         (row['الاسم'], row['نوع المشاركة'], row['الخبرة/المجال'], row['مستوى التفاعل'], row.get('رقم الهاتف', '')))
-                conn.commit(); conn.close()
-                
-                # مزامنة سحابية بعد الحفظ
-                sync_to_gs_via_script("parents")
-                
-                st.success("✅ تم التحديث بنجاح")
-                st.rerun()
+                try:
+                    changed = save_editor_changes("parents", p_edit, display_p, PARTNER_COLUMNS, required=('name',))
+                except Exception as e:
+                    st.error(f"❌ خطأ في قاعدة البيانات: {e}")
+                else:
+                    # تحديث الروابط الآلية ثم مزامنة سحابية بعد الحفظ
+                    if changed:
+                        refresh_links()
+                        queue_sync("parents")
+                    
+                    st.success("✅ تم التحديث بنجاح")
+                    st.rerun()
         else:
             # الزوار لا يرون عمود الهاتف ولا عمود الواتساب الذكي
             st.dataframe(display_p.drop(columns=['id', 'رقم الهاتف', 'واتساب الذكي'], errors='ignore'), use_container_width=True)
         
+        if is_admin:
+            with st.expander("🔗 ربط شريك بفعالية"):
+                df_p = load_data("parents")
+                df_e = load_data("events")
+                if not df_e.empty:
+                    with st.form("link_f"):
+                        link_p = st.selectbox("الشريك", df_p['id'].tolist(), format_func=dict(zip(df_p['id'], df_p['name'])).get)
+                        link_e = st.selectbox("الفعالية", df_e['id'].tolist(), format_func=dict(zip(df_e['id'], df_e['name'])).get)
+                        if st.form_submit_button("ربط"):
+                            link_partner(link_p, link_e)
+                            st.success("تم الربط بنجاح")
+                            st.rerun()
+                else:
+                    st.info("لا توجد فعاليات مسجلة")
+        
+        # الروابط محفوظة في جدول partner_events (تُحدّث عند الحفظ) وتُجلب باستعلام واحد لكل الشركاء
+        links = partner_event_links()
         st.divider()
-        for _, row in df_p.iterrows():
+        
+        card_links = partner_links(page_df, "thanks_short") if is_admin else {}
+        for _, row in page_df.iterrows():
             with st.container():
                 cl1, cl2 = st.columns([1, 2])
                 cl1.markdown(f"### 👤 {row['name']}")
                 cl1.caption(f"🛡️ {row['participation_type']} | {row['expertise']}")
                 
                 # إضافة زر واتساب ذكي للبطاقة (للمسؤول فقط)
-                if is_admin and row.get('phone'):
-                    name = row.get('name')
-                    p_type = row.get('participation_type')
-                    clean_p = ''.join(filter(str.isdigit, str(row['phone'])))
-                    message = f"السلام عليكم ورحمة الله وبركاته الأستاذ {name}، نتقدم لكم بخالص الشكر لمساهمتكم في ({p_type}).\n\nأ . توفيق اليعقوبي (مشرف تنمية علاقات مجتمعية)"
-                    encoded_msg = message.replace(' ', '%20').replace('\n', '%0A')
-                    wa_url = f"https://api.whatsapp.com/send?phone={clean_p}&text={encoded_msg}"
-                    cl1.markdown(f"[🤖 رسالة شكر]({wa_url})")
+                if is_admin:
+                    wa_url = card_links.get(row['id'], "")
+                    if wa_url:
+                        cl1.markdown(f"[🤖 رسالة شكر]({wa_url})")
                 
-                if not df_e.empty and 'name' in df_e.columns:
-                    linked = df_e[df_e['name'].str.contains(row['name'], na=False)]
-                    if not linked.empty:
-                        cl2.write("**🚀 الفعاليات المرتبطة:**")
-                        for _, li in linked.iterrows(): cl2.info(f"🔹 {li['name']}")
-                    else:
-                        cl2.write("➖ لا توجد فعاليات مرتبطة حالياً")
+                linked = links.get(row['id'], [])
+                if linked:
+                    cl2.write("**🚀 الفعاليات المرتبطة:**")
+                    for event_name in linked: cl2.info(f"🔹 {event_name}")
+                else:
+                    cl2.write("➖ لا توجد فعاليات مرتبطة حالياً")
                 st.divider()
 
 elif menu == "🎭 الفعاليات والأنشطة":
@@ -763,27 +770,17 @@ elif menu == "🎭 الفعاليات والأنشطة":
                 at = st.number_input("عدد الحضور المتوقع", 0)
                 if st.form_submit_button("إضافة للجدول"):
                     try:
-                        conn = get_connection()
-                        conn.execute('''CREATE TABLE IF NOT EXISTS events (
-                            id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            name TEXT NOT NULL,
-                            date TEXT,
-                            location TEXT,
-                            attendees_count INTEGER,
-                            rating INTEGER
-                        )''')
-                        conn.execute("INSERT INTO events (name, date, location, attendees_count) VALUES (?,?,?,?)", 
-                                     (en, str(ed), el, at))
-                        conn.commit()
-                        conn.close()
+                        with connection("events") as conn:
+                            conn.execute("INSERT INTO events (name, date, location, attendees_count) VALUES (?,?,?,?)", 
+                                         (en, str(ed), el, at))
                     except Exception as e:
                         st.info("ℹ️ ملاحظة: سيتم الحفظ سحابياً فقط")
-                    
-                    # مزامنة سحابية عبر الرابط (الأولوية للحفظ السحابي)
-                    if sync_to_gs_via_script("events"):
-                        st.success("✅ تم الحفظ بنجاح سحابياً")
                     else:
-                        st.warning("⚠️ تم الحفظ محلياً وفشل المزامنة مع جوجل شيت")
+                        refresh_links()
+                    
+                    # مزامنة سحابية في الخلفية عبر الطابور
+                    queue_sync("events")
+                    st.success("✅ تم الحفظ بنجاح، وستتم المزامنة السحابية في الخلفية")
                     
                     time.sleep(1)
                     st.rerun()
@@ -792,13 +789,7 @@ elif menu == "🎭 الفعاليات والأنشطة":
     if not df_e.empty:
         st.subheader("🗓️ جدول الفعاليات")
         # ترجمة الأعمدة للعرض
-        display_df = df_e.rename(columns={
-            'name': 'الفعالية',
-            'date': 'التاريخ',
-            'location': 'المكان',
-            'attendees_count': 'الحضور المتوقع',
-            'rating': 'التقييم'
-        })
+        display_df = df_e.rename(columns=EVENT_COLUMNS)
         
         if is_admin:
             display_df['حذف'] = False
@@ -807,109 +798,97 @@ elif menu == "🎭 الفعاليات والأنشطة":
             if st.session_state.get("e_edit") and (st.session_state.e_edit.get("edited_rows") or st.session_state.e_edit.get("added_rows") or st.session_state.e_edit.get("deleted_rows")):
                 st.warning("⚠️ لديك تعديلات غير محفوظة في الجدول أدناه. يرجى الضغط على زر 'حفظ تعديلات الفعاليات' (إذا توفر) أو الحذف المباشر.")
 
-            edited_e = st.data_editor(
-                display_df, 
-                key="e_edit", 
-                use_container_width=True, 
-                num_rows="dynamic",
-                column_config={"id": st.column_config.NumberColumn("ID", disabled=True)}
-            )
+            with section("محرر الفعاليات"):
+                edited_e = st.data_editor(
+                    display_df, 
+                    key="e_edit", 
+                    use_container_width=True, 
+                    num_rows="dynamic",
+                    column_config={"id": st.column_config.NumberColumn("ID", disabled=True)}
+                )
             
             c_e1, c_e2 = st.columns(2)
             if c_e1.button("🔴 حذف الفعاليات المحددة"):
                 to_del = edited_e[edited_e['حذف'] == True]
                 if not to_del.empty:
-                    conn = get_connection()
-                    for _, row in to_del.iterrows():
-                        if 'id' in row and not pd.isna(row['id']):
-                            conn.execute(f"DELETE FROM events WHERE id={row['id']}")
-                    conn.commit(); conn.close()
+                    delete_rows("events", to_del['id'].tolist())
                     
-                    # مزامنة سحابية بعد الحذف عبر الرابط الجديد
-                    sync_to_gs_via_script("events")
+                    # مزامنة سحابية واحدة بعد الحذف
+                    queue_sync("events")
                     st.success("تم الحذف بنجاح")
                     st.rerun()
             
             if c_e2.button("💾 حفظ تعديلات الفعاليات"):
-                conn = get_connection()
-                for _, row in edited_e.iterrows():
-                    if 'id' in row and not pd.isna(row['id']):
-                        conn.execute("""UPDATE events SET name=?, date=?, location=?, attendees_count=?, rating=? WHERE id=?""",
-                                     (row['الفعالية'], str(row['التاريخ']), row['المكان'], row['الحضور المتوقع'], row.get('التقييم', 0), row['id']))
-                    else:
-                        if row['الفعالية']:
-                            conn.execute("""INSERT INTO events (name, date, location, attendees_count, rating) VALUES (?,?,?,?,?)""",
-                                         (row['الفعالية'], str(row['التاريخ']), row['المكان'], row['الحضور المتوقع'], row.get('التقييم', 0)))
-                conn.commit(); conn.close()
-                
-                # مزامنة سحابية بعد الحفظ عبر الرابط الجديد
-                sync_to_gs_via_script("events")
-                st.success("✅ تم تحديث الفعاليات بنجاح")
-                st.rerun()
+                try:
+                    changed = save_editor_changes("events", "e_edit", display_df, EVENT_COLUMNS, required=('name',))
+                except Exception as e:
+                    st.error(f"❌ خطأ في قاعدة البيانات: {e}")
+                else:
+                    # تحديث الروابط الآلية ثم مزامنة سحابية بعد الحفظ عبر الطابور
+                    if changed:
+                        refresh_links()
+                        queue_sync("events")
+                    st.success("✅ تم تحديث الفعاليات بنجاح")
+                    st.rerun()
         else:
             st.dataframe(display_df.drop(columns=['id', 'حذف'], errors='ignore'), use_container_width=True)
 
 elif menu == "📈 التقارير والإحصائيات":
     st.title("📈 مركز التقارير والتحليلات")
-    df_e = load_data("events")
-    df_p = load_data("parents")
+    summary = stats_summary()
     
-    if not df_e.empty:
+    if stat(summary, 'events.count'):
+        # الرسوم من بيانات مجمعة في SQL ومحفوظة لكل نسخة من البيانات (لا تمر الجداول الكاملة)
         col_c1, col_c2 = st.columns(2)
         with col_c1:
             st.subheader("📊 حضور الفعاليات")
-            fig = px.bar(df_e, x='name', y='attendees_count', title="عدد الحضور حسب الفعالية")
-            st.plotly_chart(fig, use_container_width=True)
+            with section("رسم الحضور"):
+                st.plotly_chart(figure("attendance"), use_container_width=True)
         
         with col_c2:
             st.subheader("👥 توزيع الشركاء")
-            if 'participation_type' in df_p.columns:
-                fig_pie = px.pie(df_p, names='participation_type', title="أنواع الشراكات")
-                st.plotly_chart(fig_pie, use_container_width=True)
+            if not partner_types().empty:
+                with section("رسم الشراكات"):
+                    st.plotly_chart(figure("partner_types"), use_container_width=True)
+
+        st.subheader("📅 الحضور الشهري")
+        with section("رسم الحضور الشهري"):
+            st.plotly_chart(figure("monthly_attendance"), use_container_width=True)
         
         st.divider()
+        # ملخص الفترة من استعلامات التجميع المفهرسة بدلاً من الجداول الكاملة
+        st.subheader("🗓️ ملخص الفترة")
+        period = st.selectbox("الفترة", list(PERIODS), format_func=lambda p: PERIODS[p][0], key="rep_period")
+        report = period_report(period)
+        show_period_report(report)
+
         if st.button("📤 تصدير ملخص التقارير إلى Google Sheets"):
             try:
-                # تجهيز النص الموحد للتقرير كما طلب المستخدم
-                report_text = f"""تقرير دوري: مشرف تنمية العلاقات المجتمعية
-التاريخ: {datetime.now().strftime('%Y-%m-%d')}
-------------------------------------------
-1. ملخص الإنجاز: تم تنفيذ {len(df_e)} عملية/فعالية.
-2. حالة أولياء الأمور: يوجد {len(df_p)} ولي أمر مسجل.
-3. التوصيات: الاستمرار في تعزيز التواصل الرقمي.
-------------------------------------------"""
+                # تجهيز النص الموحد للتقرير للفترة المختارة
+                report_text = render_report(report)
                 
                 # 1. حفظ التقرير في قاعدة البيانات المحلية أولاً لضمان الأرشفة
                 try:
-                    conn_local = get_connection()
-                    c = conn_local.cursor()
-                    # التأكد من وجود الجدول قبل الإدخال
-                    c.execute('''CREATE TABLE IF NOT EXISTS reports (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        report_date TEXT,
-                        report_content TEXT
-                    )''')
-                    report_date_str = datetime.now().strftime("%Y-%m-%d %H:%M")
-                    c.execute("INSERT INTO reports (report_date, report_content) VALUES (?, ?)", 
-                              (report_date_str, report_text))
-                    conn_local.commit()
-                    conn_local.close()
+                    save_report(report_text)
                 except Exception as db_err:
                     st.error(f"⚠️ فشل الحفظ المحلي: {db_err}")
 
                 # 2. مزامنة جميع التقارير (بما فيها التاريخية) إلى جوجل شيت
                 # هذا يضمن ظهور كل تقرير في صف مستقل وعدم ضياع التقارير السابقة
-                if sync_to_gs_via_script("reports"):
-                    st.success("✅ تم حفظ التقرير وتحديث الأرشيف في Google Sheets بنجاح")
+                if SCRIPT_URL:
+                    queue_sync("reports")
+                    st.success("✅ تم حفظ التقرير، وسيُرفع الأرشيف إلى Google Sheets في الخلفية")
                     st.text_area("معاينة التقرير الحالي:", report_text, height=200)
-                elif conn_gs:
+                elif gsheets_connection():
                     # محاولة بديلة عبر gsheets connection إذا فشل السكريبت
                     try:
-                        conn_local = get_connection()
-                        all_reports = pd.read_sql("SELECT report_date as 'التاريخ', report_content as 'نص التقرير' FROM reports", conn_local)
-                        conn_local.close()
+                        with connection() as conn_local:
+                            all_reports = pd.read_sql(f"SELECT report_date as 'التاريخ', report_content as 'نص التقرير' FROM {read_source('reports')}", conn_local)
                         
-                        conn_gs.update(worksheet="Reports", data=all_reports)
+                        gsheets_connection().update(worksheet="Reports", data=all_reports)
+                        # الورقة كُتبت بدون عمود المعرف، فيجب أن يكون الرفع التالي كاملاً
+                        with connection() as conn_local:
+                            reset_tracking(conn_local, "reports")
                         st.success("✅ تم تحديث أرشيف التقارير بنجاح (عبر الربط المباشر)")
                         st.text_area("معاينة التقرير الحالي:", report_text, height=200)
                     except Exception as e:
@@ -919,24 +898,26 @@ elif menu == "📈 التقارير والإحصائيات":
             except Exception as e:
                 st.error(f"❌ خطأ غير متوقع: {e}")
         
-        # عرض أرشيف التقارير المحفوظة
+        # عرض أرشيف التقارير المحفوظة: صفحات مفلترة بالتاريخ، ونص التقرير يُحمّل عند فتحه فقط
         st.divider()
         st.subheader("📚 أرشيف التقارير السابقة")
         try:
-            conn_local = get_connection()
-            # التأكد من وجود الجدول حتى لو لم يتم الحفظ بعد
-            c = conn_local.cursor()
-            c.execute('''CREATE TABLE IF NOT EXISTS reports (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                report_date TEXT,
-                report_content TEXT
-            )''')
-            conn_local.commit()
-            
-            history_df = pd.read_sql("SELECT report_date as 'التاريخ', report_content as 'محتوى التقرير' FROM reports ORDER BY id DESC", conn_local)
-            conn_local.close()
-            if not history_df.empty:
-                st.dataframe(history_df, use_container_width=True)
+            col_from, col_to = st.columns(2)
+            date_from = col_from.date_input("من تاريخ", value=None, key="archive_from")
+            date_to = col_to.date_input("إلى تاريخ", value=None, key="archive_to")
+            total = report_count(date_from, date_to)
+            if total:
+                pages = (total + PAGE_SIZE - 1) // PAGE_SIZE
+                # تغيير الفلتر قد يجعل الصفحة المحفوظة خارج النطاق
+                if st.session_state.get("archive_page", 1) > pages:
+                    st.session_state["archive_page"] = pages
+                page = st.number_input(f"الصفحة (من {pages})", min_value=1, max_value=pages, key="archive_page")
+                st.caption(f"{total} تقرير")
+                for entry in report_page(page - 1, PAGE_SIZE, date_from, date_to).itertuples():
+                    label = f"🗓️ {entry.report_date} — {entry.title or 'تقرير'}"
+                    exp = st.expander(label, key=f"archive_{entry.id}", on_change="rerun")
+                    if exp.open:
+                        exp.text(report_body(entry.id) or "")
             else:
                 st.info("لا توجد تقارير مؤرشفة حالياً. سيتم أرشفة التقارير عند الضغط على زر التصدير.")
         except Exception as e:
@@ -950,7 +931,7 @@ elif menu == "🤖 الذكاء الاصطناعي":
     tab_gen, tab_swot, tab_reports = st.tabs(["✉️ توليد الخطابات", "🔍 التحليل الرباعي SWOT", "📊 تقارير الأداء"])
     
     df_p = load_data("parents")
-    df_e = load_data("events")
+    summary = stats_summary()
     
     with tab_gen:
         st.subheader("✉️ مولد المراسلات الرسمية")
@@ -987,11 +968,8 @@ elif menu == "🤖 الذكاء الاصطناعي":
                     partner_info = df_p[df_p['name'] == p_name].iloc[0]
                     phone = partner_info.get('phone', '')
                     
-                    if phone:
-                        clean_phone = ''.join(filter(str.isdigit, str(phone)))
-                        encoded_letter = st.session_state.current_generated_letter.replace(' ', '%20').replace('\n', '%0A')
-                        wa_link = f"https://api.whatsapp.com/send?phone={clean_phone}&text={encoded_letter}"
-                        
+                    wa_link = whatsapp_link(phone, st.session_state.current_generated_letter)
+                    if wa_link:
                         st.markdown(f"""
                             <a href="{wa_link}" target="_blank" style="text-decoration: none;">
                                 <div style="background-color: #25d366; color: white; padding: 10px 20px; border-radius: 8px; text-align: center; font-weight: bold; cursor: pointer;">
@@ -1012,16 +990,19 @@ elif menu == "🤖 الذكاء الاصطناعي":
         st.subheader("🔍 التحليل الرباعي الذكي")
         st.write("بناءً على البيانات الحالية، يقترح النظام التحليل التالي:")
         col1, col2 = st.columns(2)
-        col1.success(f"**نقاط القوة:** وجود {len(df_p)} شركاء فاعلين.")
+        col1.success(f"**نقاط القوة:** وجود {stat(summary, 'parents.count')} شركاء فاعلين.")
         col2.warning(f"**نقاط الضعف:** الحاجة لزيادة عدد الفعاليات المنجزة.")
         col1.info("**الفرص:** توسيع قاعدة الشراكات في المجالات المهنية.")
         col2.error("**التحديات:** تفاوت مستويات التفاعل بين الشركاء.")
 
     with tab_reports:
         st.subheader("📑 نظام التقارير التلقائي")
-        rep_type = st.radio("نوع التقرير", ["تقرير شهري", "تقرير فصلي", "تقرير سنوي"], horizontal=True)
+        rep_type = st.radio("نوع التقرير", list(PERIODS), format_func=lambda p: PERIODS[p][0], horizontal=True)
         if st.button("توليد التقرير الإحصائي"):
-            st.write(f"تقرير {rep_type} - تم توليده بتاريخ {datetime.now().strftime('%Y-%m-%d')}")
-            st.write(f"إجمالي الفعاليات: {len(df_e)}")
-            st.write(f"إجمالي الشركاء: {len(df_p)}")
-            st.download_button("تحميل بيانات الشركاء (Excel)", df_p.to_csv().encode('utf-8'), "partners.csv", "text/csv")
+            st.write(f"{PERIODS[rep_type][0]} - تم توليده بتاريخ {datetime.now().strftime('%Y-%m-%d')}")
+            show_period_report(period_report(rep_type))
+            st.write(f"إجمالي الشركاء: {stat(summary, 'parents.count')}")
+            st.download_button("تحميل بيانات الشركاء (Excel)", partial(export_file, "parents", "xlsx"),
+                               file_name("parents", "xlsx"), FORMATS["xlsx"][1], on_click="ignore")
+
+profiler.end_run()
@@ -0,0 +1,167 @@
+// سكربت Google Apps Script المرجعي لاستقبال المزامنة من التطبيق
+// يُنشر كتطبيق ويب (Deploy > Web app) ويوضع رابطه في script_url
+//
+// الصيغ المدعومة:
+//   update: { action, sheetName, columns, rows }                       استبدال الورقة بالكامل
+//   delta:  { action, sheetName, columns, idColumn, upserts, deletes } تعديل الصفوف المتغيرة فقط
+//   رفع كامل مجزأ للجداول الكبيرة (تُجمع الدفعات في ورقة مؤقتة ولا تُستبدل الورقة إلا عند commit):
+//     begin:  { action, sheetName, columns, uploadId }
+//     append: { action, sheetName, uploadId, seq, encoding: 'gzip', rows }  rows = base64(gzip(JSON))
+//     commit: { action, sheetName, uploadId, rowCount }
+
+function doPost(e) {
+  var payload = JSON.parse(e.postData.contents);
+  var lock = LockService.getScriptLock();
+  lock.waitLock(30000);
+  try {
+    var sheet = getOrCreateSheet_(payload.sheetName);
+    if (payload.action === 'update') {
+      replaceSheet_(sheet, payload.columns, payload.rows);
+    } else if (payload.action === 'delta') {
+      var error = applyDelta_(sheet, payload);
+      if (error) {
+        return json_({ ok: false, error: error });
+      }
+    } else if (payload.action === 'begin') {
+      beginUpload_(payload);
+    } else if (payload.action === 'append') {
+      var appendError = appendUpload_(payload);
+      if (appendError) {
+        return json_({ ok: false, error: appendError });
+      }
+    } else if (payload.action === 'commit') {
+      var commitError = commitUpload_(sheet, payload);
+      if (commitError) {
+        return json_({ ok: false, error: commitError });
+      }
+    } else {
+      return json_({ ok: false, error: 'unknown action: ' + payload.action });
+    }
+    return json_({ ok: true });
+  } finally {
+    lock.releaseLock();
+  }
+}
+
+function getOrCreateSheet_(name) {
+  var ss = SpreadsheetApp.getActiveSpreadsheet();
+  return ss.getSheetByName(name) || ss.insertSheet(name);
+}
+
+function replaceSheet_(sheet, columns, rows) {
+  sheet.clearContents();
+  var values = [columns].concat(rows);
+  sheet.getRange(1, 1, values.length, columns.length).setValues(values);
+}
+
+function applyDelta_(sheet, payload) {
+  var columns = payload.columns;
+  var lastRow = sheet.getLastRow();
+  var header = lastRow > 0 ? sheet.getRange(1, 1, 1, sheet.getLastColumn()).getValues()[0] : [];
+  var idIndex = header.indexOf(payload.idColumn);
+
+  // ورقة بدون عمود المعرف لا يمكن تعديلها جزئياً؛ التطبيق يعيد الإرسال بصيغة update كاملة
+  if (idIndex === -1) {
+    return 'missing_id_column';
+  }
+
+  // فهرس: المعرف -> رقم الصف في الورقة
+  var ids = lastRow > 1 ? sheet.getRange(2, idIndex + 1, lastRow - 1, 1).getValues() : [];
+  var rowById = {};
+  for (var i = 0; i < ids.length; i++) {
+    rowById[String(ids[i][0])] = i + 2;
+  }
+
+  var appended = [];
+  payload.upserts.forEach(function (row) {
+    var target = rowById[String(row[0])];
+    if (target) {
+      sheet.getRange(target, 1, 1, columns.length).setValues([row]);
+    } else {
+      appended.push(row);
+    }
+  });
+  if (appended.length) {
+    sheet.getRange(sheet.getLastRow() + 1, 1, appended.length, columns.length).setValues(appended);
+  }
+
+  // الحذف من الأسفل إلى الأعلى حتى لا تتغير أرقام الصفوف المتبقية
+  var toDelete = payload.deletes
+    .map(function (id) { return rowById[String(id)]; })
+    .filter(function (r) { return r; })
+    .sort(function (a, b) { return b - a; });
+  toDelete.forEach(function (r) { sheet.deleteRow(r); });
+  return null;
+}
+
+function stagingName_(sheetName, uploadId) {
+  return '_upload_' + sheetName + '_' + uploadId;
+}
+
+function beginUpload_(payload) {
+  var ss = SpreadsheetApp.getActiveSpreadsheet();
+  // حذف أي رفع سابق لنفس الورقة لم يكتمل
+  var prefix = '_upload_' + payload.sheetName + '_';
+  ss.getSheets().forEach(function (s) {
+    if (s.getName().indexOf(prefix) === 0) {
+      ss.deleteSheet(s);
+    }
+  });
+  var staging = ss.insertSheet(stagingName_(payload.sheetName, payload.uploadId));
+  staging.hideSheet();
+  staging.getRange(1, 1, 1, payload.columns.length).setValues([payload.columns]);
+}
+
+function decodeRows_(payload) {
+  if (payload.encoding !== 'gzip') {
+    return payload.rows;
+  }
+  var blob = Utilities.newBlob(Utilities.base64Decode(payload.rows), 'application/x-gzip');
+  return JSON.parse(Utilities.ungzip(blob).getDataAsString('UTF-8'));
+}
+
+function appendUpload_(payload) {
+  var staging = SpreadsheetApp.getActiveSpreadsheet().getSheetByName(stagingName_(payload.sheetName, payload.uploadId));
+  if (!staging) {
+    return 'unknown_upload';
+  }
+  // seq يجعل إعادة إرسال الدفعة نفسها (بعد انقطاع الرد) بلا أثر
+  var props = PropertiesService.getScriptProperties();
+  var key = 'upload_' + payload.uploadId;
+  var last = Number(props.getProperty(key) || -1);
+  if (payload.seq <= last) {
+    return null;
+  }
+  if (payload.seq !== last + 1) {
+    return 'out_of_order';
+  }
+  var rows = decodeRows_(payload);
+  if (rows.length) {
+    staging.getRange(staging.getLastRow() + 1, 1, rows.length, rows[0].length).setValues(rows);
+  }
+  props.setProperty(key, String(payload.seq));
+  return null;
+}
+
+function commitUpload_(sheet, payload) {
+  var ss = SpreadsheetApp.getActiveSpreadsheet();
+  var staging = ss.getSheetByName(stagingName_(payload.sheetName, payload.uploadId));
+  if (!staging) {
+    return 'unknown_upload';
+  }
+  PropertiesService.getScriptProperties().deleteProperty('upload_' + payload.uploadId);
+  // التحقق من وصول كل الدفعات قبل المساس بالورقة الأصلية
+  if (staging.getLastRow() - 1 !== payload.rowCount) {
+    ss.deleteSheet(staging);
+    return 'row_count_mismatch';
+  }
+  sheet.clearContents();
+  var source = staging.getDataRange();
+  source.copyTo(sheet.getRange(1, 1), SpreadsheetApp.CopyPasteType.PASTE_VALUES, false);
+  ss.deleteSheet(staging);
+  return null;
+}
+
+function json_(obj) {
+  return ContentService.createTextOutput(JSON.stringify(obj)).setMimeType(ContentService.MimeType.JSON);
+}
@@ -0,0 +1,40 @@
+import re
+
+# توحيد أشكال الحروف العربية قبل الفهرسة والبحث
+# (الألف والهمزات، التاء المربوطة، الألف المقصورة)
+ARABIC_FOLDING = {
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ؤ": "و", "ئ": "ي",
+    "ة": "ه",
+    "ى": "ي",
+}
+
+# علامات التشكيل والتطويل تُحذف كلياً
+ARABIC_DIACRITICS = "ًٌٍَُِّْٰـ"
+
+_TRANSLATION = str.maketrans({**ARABIC_FOLDING, **{ch: None for ch in ARABIC_DIACRITICS}})
+_WORD = re.compile(r"\w+")
+
+
+def normalize(text):
+    """تطبيع النص العربي: توحيد الحروف المتشابهة وحذف التشكيل وتحويل اللاتيني لحروف صغيرة"""
+    if text is None:
+        return ""
+    return str(text).translate(_TRANSLATION).lower()
+
+
+def words(text):
+    return _WORD.findall(normalize(text))
+
+
+def normalize_sql(expr):
+    """نفس تطبيع normalize() كتعبير SQL (سلسلة replace) لاستخدامه داخل المشغلات
+
+    بهذا تبقى الفهرسة صحيحة حتى لو كُتبت البيانات من خارج التطبيق دون دوال بايثون.
+    """
+    sql = f"lower(COALESCE({expr}, ''))"
+    for src, dst in ARABIC_FOLDING.items():
+        sql = f"replace({sql}, '{src}', '{dst}')"
+    for ch in ARABIC_DIACRITICS:
+        sql = f"replace({sql}, '{ch}', '')"
+    return sql
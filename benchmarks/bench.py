@@ -0,0 +1,204 @@
+"""قياس أداء طبقة البيانات على قواعد تجريبية بأحجام مختلفة
+
+التشغيل (من جذر المستودع):
+    python -m benchmarks.bench run --scales 1000 10000 --out bench.json
+    python -m benchmarks.bench compare old.json new.json --threshold 0.25
+
+كل قياس يُكرر عدة مرات ويُسجل الوسيط والأدنى بالمللي ثانية. وضع compare يطبع الفرق
+لكل قياس ويخرج برمز 1 إذا تباطأ أي قياس بأكثر من النسبة المحددة.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+
+import pandas as pd
+
+import charts
+import database
+import queries
+import report_archive
+import report_engine
+import search
+import sync
+from benchmarks import datagen
+from query_cache import clear_cache, read_table
+
+TABLES = ("parents", "action_plan", "events", "reports")
+
+
+def measure(fn, repeat, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": round(statistics.median(times), 3), "min_ms": round(min(times), 3), "runs": repeat}
+
+
+def _consume(payloads):
+    # بناء الحمولات فقط (بما فيها الضغط) دون إرسالها
+    return sum(len(json.dumps(p, ensure_ascii=False)) for p in payloads)
+
+
+def _build_push(table, delta):
+    with database.connection() as conn:
+        conn.execute("BEGIN")
+        up_to = sync._last_change_id(conn, table)
+        return _consume(sync.delta_payloads(conn, table, up_to) if delta else sync.full_payloads(conn, table))
+
+
+def _sheet_frames():
+    """أوراق مطابقة لمحتوى القاعدة الحالي (كما يعيدها conn_gs.read) لمحاكاة السحب"""
+    frames = {}
+    with database.connection() as conn:
+        for table in TABLES:
+            _, columns = sync.sheet_columns(table)
+            frames[table] = pd.DataFrame(list(sync._iter_rows(conn, table)), columns=columns)
+    return frames
+
+
+def bench_scale(scale, repeat, workdir, seed=42):
+    path = os.path.join(workdir, f"bench_{scale}.db")
+    started = time.perf_counter()
+    datagen.generate(path, scale, seed)
+    database.configure(path)
+    results = {"generate_s": round(time.perf_counter() - started, 2)}
+    rng = random.Random(seed)
+
+    def record(name, fn, setup=None, times=repeat):
+        results[name] = measure(fn, times, setup)
+
+    # قراءة الجداول (load_data): باردة بعد مسح الذاكرة المؤقتة، ودافئة منها
+    for table in TABLES:
+        record(f"load_data.{table}.cold", lambda t=table: read_table(t), setup=clear_cache)
+        record(f"load_data.{table}.warm", lambda t=table: read_table(t))
+
+    # البحث الشامل في القائمة الجانبية
+    record("search.common_name", lambda: search.search("أحمد"))
+    record("search.prefix", lambda: search.search("الملت"))
+    record("search.no_match", lambda: search.search("كلمةغيرموجودة"))
+
+    # مؤشرات لوحة التحكم
+    record("dashboard.kpis.cold", queries.dashboard_kpis, setup=clear_cache)
+    record("dashboard.kpis.warm", queries.dashboard_kpis)
+    record("dashboard.urgent_tasks.cold", queries.urgent_tasks, setup=clear_cache)
+    record("partners.page.cold", lambda: queries.partner_page(3, 20), setup=clear_cache)
+    for period in report_engine.PERIODS:
+        record(f"reports.period.{period}.cold", lambda p=period: report_engine.period_report(p, date(2025, 6, 15)),
+               setup=clear_cache)
+    record("reports.archive_page.cold", lambda: report_archive.report_page(0), setup=clear_cache)
+    for chart in charts.CHARTS:
+        record(f"charts.{chart}.cold", lambda c=chart: charts.figure(c), setup=clear_cache)
+        record(f"charts.{chart}.warm", lambda c=chart: charts.figure(c))
+    record("reports.archive_body.cold", lambda: report_archive.report_body(max(1, scale // 20)), setup=clear_cache)
+
+    # حفظ محرر البيانات: 50 تعديلاً و10 إضافات و10 حذف في معاملة واحدة
+    def editor_save():
+        ids = rng.sample(range(1, scale + 1), 60)
+        database.apply_changes(
+            "parents",
+            updates=[(i, {"expertise": rng.choice(datagen.EXPERTISE)}) for i in ids[:50]],
+            inserts=[{"name": datagen._name(rng), "phone": "+968 90000000"} for _ in range(10)],
+            deletes=ids[50:])
+    record("editor.save_parents", editor_save)
+
+    # بناء حمولات الرفع (كاملة، وجزئية بعد 100 تعديل)
+    for table in TABLES:
+        record(f"sync.full_payload.{table}", lambda t=table: _build_push(t, False), times=max(1, repeat // 2))
+    with database.connection() as conn:
+        conn.execute("INSERT OR REPLACE INTO sync_state (table_name, direction, synced_at) VALUES ('parents', 'push', CURRENT_TIMESTAMP)")
+    with database.connection("parents") as conn:
+        conn.executemany("UPDATE parents SET expertise = ? WHERE id = ?",
+                         [(rng.choice(datagen.EXPERTISE), i) for i in rng.sample(range(1, scale + 1), 100)])
+    record("sync.delta_payload.parents_100", lambda: _build_push("parents", True))
+
+    # السحب من جوجل شيت بقارئ محلي: دمج كامل (بصمة ممسوحة) ثم ورقة لم تتغير
+    frames = _sheet_frames()
+    reader = lambda ws: frames[next(t for t in TABLES if sync.SHEETS[t][0] == ws)]
+
+    def forget_pull_hashes():
+        with database.connection() as conn:
+            conn.execute("DELETE FROM sync_state WHERE direction = 'pull'")
+    record("pull.merge_all", lambda: sync.pull_all(reader, TABLES), setup=forget_pull_hashes, times=max(1, repeat // 2))
+    record("pull.unchanged", lambda: sync.pull_all(reader, TABLES))
+
+    clear_cache()
+    database.close_all()
+    return results
+
+
+def run(scales, repeat, out, workdir=None):
+    workdir = workdir or tempfile.mkdtemp(prefix="bench_")
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": repeat,
+        },
+        "results": {},
+    }
+    for scale in scales:
+        print(f"scale {scale} ...", flush=True)
+        report["results"][str(scale)] = bench_scale(scale, repeat, workdir)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Wrote {out}")
+    return report
+
+
+def compare(old_path, new_path, threshold):
+    """طباعة الفرق بين ملفي نتائج؛ تعيد عدد القياسات التي تباطأت بأكثر من threshold"""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)["results"]
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)["results"]
+    regressions = 0
+    for scale in sorted(set(old) & set(new), key=int):
+        print(f"== scale {scale}")
+        for name in sorted(set(old[scale]) & set(new[scale])):
+            before, after = old[scale][name], new[scale][name]
+            if not isinstance(before, dict):
+                continue
+            a, b = before["median_ms"], after["median_ms"]
+            change = (b - a) / a if a else 0.0
+            flag = ""
+            if change > threshold:
+                flag = "  << REGRESSION"
+                regressions += 1
+            print(f"{name:40s} {a:10.2f} -> {b:10.2f} ms  {change:+7.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="قياس أداء طبقة البيانات")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_run = sub.add_parser("run")
+    p_run.add_argument("--scales", type=int, nargs="+", default=[1000, 10000])
+    p_run.add_argument("--repeat", type=int, default=5)
+    p_run.add_argument("--out", default="bench.json")
+    p_run.add_argument("--workdir")
+    p_cmp = sub.add_parser("compare")
+    p_cmp.add_argument("old")
+    p_cmp.add_argument("new")
+    p_cmp.add_argument("--threshold", type=float, default=0.25)
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        run(args.scales, args.repeat, args.out, args.workdir)
+        return 0
+    return 1 if compare(args.old, args.new, args.threshold) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""مولّد بيانات عربية تجريبية بحجم محدد وبذرة ثابتة (نفس البذرة = نفس القاعدة)
+
+python -m benchmarks.datagen bench_10k.db --scale 10000
+"""
+import argparse
+import os
+import random
+import sqlite3
+from datetime import date, timedelta
+
+import database
+import linking
+
+FIRST_NAMES = ["محمد", "أحمد", "علي", "سالم", "خالد", "سعيد", "عبدالله", "يوسف", "إبراهيم", "حمد",
+               "ناصر", "سيف", "مريم", "فاطمة", "عائشة", "زينب", "نورة", "شيخة", "ليلى", "هدى"]
+FAMILY_NAMES = ["البلوشي", "الحارثي", "اليعقوبي", "الكندي", "السعدي", "الهنائي", "العبري", "الرواحي",
+                "الشكيلي", "المعمري", "الغافري", "البوسعيدي", "الريامي", "الفارسي", "الزدجالي"]
+PARTICIPATION = ["دعم تعليمي", "دعم مالي", "خبرات مهنية", "تطوع", "مبادرات"]
+EXPERTISE = ["هندسة", "طب", "تعليم", "تقنية معلومات", "محاسبة", "قانون", "إعلام", "تجارة", "زراعة"]
+LEVELS = ["مرتفع", "متوسط", "محدود"]
+OBJECTIVES = ["تعزيز الشراكة المجتمعية", "رفع مستوى التحصيل", "تفعيل دور أولياء الأمور",
+              "تنمية المهارات القيادية", "دعم الأنشطة الطلابية", "نشر ثقافة التطوع"]
+ACTIVITIES = ["ورشة", "محاضرة", "زيارة ميدانية", "لقاء تعريفي", "معرض", "حملة توعوية", "مسابقة"]
+STATUSES = ["قيد التنفيذ", "مكتمل", "مؤجل", "لم يبدأ"]
+PRIORITIES = ["مرتفع", "متوسط", "منخفض"]
+TASK_TYPES = ["مادي", "معنوي"]
+EVENTS = ["اليوم المفتوح", "الملتقى السنوي", "حفل التكريم", "المعرض العلمي", "يوم الصحة",
+          "اليوم الوطني", "مهرجان القراءة", "ملتقى أولياء الأمور"]
+LOCATIONS = ["القاعة الرئيسية", "المسرح", "الملعب", "مركز مصادر التعلم", "قاعة الاجتماعات"]
+
+
+def _name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(FIRST_NAMES)} {rng.choice(FAMILY_NAMES)}"
+
+
+def _day(rng, start=date(2024, 1, 1), days=900):
+    return (start + timedelta(days=rng.randrange(days))).isoformat()
+
+
+def _report(rng, i):
+    return f"""تقرير دوري: مشرف تنمية العلاقات المجتمعية
+التاريخ: {_day(rng)}
+------------------------------------------
+1. ملخص الإنجاز: تم تنفيذ {rng.randint(1, 90)} عملية/فعالية.
+2. حالة أولياء الأمور: يوجد {rng.randint(10, 900)} ولي أمر مسجل.
+3. التوصيات: {rng.choice(OBJECTIVES)} عبر {rng.choice(ACTIVITIES)} رقم {i}.
+------------------------------------------"""
+
+
+def rows(scale, seed=42):
+    """صفوف كل جدول: scale شريك وبند خطة، ونصفها فعاليات، وعُشرها لقاءات وتقارير"""
+    rng = random.Random(seed)
+    return {
+        "parents": [(_name(rng), rng.choice(PARTICIPATION), rng.choice(EXPERTISE), rng.choice(LEVELS),
+                     f"+968 9{rng.randrange(10 ** 7):07d}") for _ in range(scale)],
+        "action_plan": [(rng.choice(OBJECTIVES), f"{rng.choice(ACTIVITIES)} {i}", _name(rng), _day(rng), f"{rng.randint(50, 100)}%",
+                         rng.choice(STATUSES), rng.choice(PRIORITIES), rng.choice(TASK_TYPES)) for i in range(scale)],
+        "events": [(f"{rng.choice(EVENTS)} مع {_name(rng)}", _day(rng), rng.choice(LOCATIONS), rng.randint(5, 400),
+                    rng.randint(1, 5)) for _ in range(max(1, scale // 2))],
+        "meetings": [(f"اجتماع {rng.choice(OBJECTIVES)}", _day(rng), rng.randint(3, 40), rng.choice(OBJECTIVES), "")
+                     for _ in range(max(1, scale // 10))],
+        "reports": [(_day(rng), _report(rng, i)) for i in range(max(1, scale // 10))],
+    }
+
+
+COLUMNS = {
+    "parents": ("name", "participation_type", "expertise", "interaction_level", "phone"),
+    "action_plan": ("objective", "activity", "responsibility", "timeframe", "kpi", "status", "priority", "task_type"),
+    "events": ("name", "date", "location", "attendees_count", "rating"),
+    "meetings": ("subject", "date", "attendees_count", "summary", "ai_recommendations"),
+    "reports": ("report_date", "report_content"),
+}
+
+
+def generate(path, scale, seed=42):
+    """إنشاء قاعدة جديدة في path بالمخطط الكامل ثم تعبئتها (تُستبدل إن وُجدت)"""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        database.migrate(conn)
+        with conn:
+            for table, data in rows(scale, seed).items():
+                cols = COLUMNS[table]
+                marks = ",".join("?" * len(cols))
+                conn.executemany(f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({marks})", data)
+            # التقارير تُخزن مضغوطة والروابط الآلية محسوبة كما يحفظها التطبيق
+            database.compact_reports(conn)
+            linking.update_links(conn)
+    finally:
+        conn.close()
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="توليد قاعدة بيانات تجريبية")
+    parser.add_argument("path")
+    parser.add_argument("--scale", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    generate(args.path, args.scale, args.seed)
+    print(f"Generated {args.path} at scale {args.scale}")
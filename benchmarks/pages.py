@@ -0,0 +1,462 @@
+"""قياس زمن عرض صفحات app.py كاملة عبر AppTest (دون متصفح) بأدوار المسؤول والزائر
+
+التشغيل (من جذر المستودع):
+    python -m benchmarks.pages run --scales 1000 10000 --out pages.json
+    python -m benchmarks.pages run --scales 10000 --sessions 4 --writes
+    python -m benchmarks.pages check pages.json
+
+لكل صفحة في القائمة الجانبية يُسجل: زمن أول زيارة بعد مسح الذاكرة المؤقتة، ووسيط زمن إعادة
+التشغيل الكاملة بعدها، وعدد جمل SQL في إعادة التشغيل، وذاكرة العملية (RSS) وذروتها.
+--sessions N يشغل N جلسات متزامنة في عمليات منفصلة على نفس ملف القاعدة لكشف تنازع الأقفال،
+ومع --writes تحفظ كل جلسة تعديلات على الشركاء بين الصفحات كما يفعل محرر البيانات.
+البدء البارد (cold.login و cold.dashboard) يُقاس في عمليات جديدة: زمن أول عرض لشاشة الدخول
+والمكتبات الثقيلة التي استُوردت قبلها، ثم أول صفحة بعد الدخول.
+
+يعمل دون شبكة: SCRIPT_URL يشير إلى tools/fake_script_server.py محلياً، و conn_gs يُستبدل
+باتصال وهمي يقرأ أوراق نفس الخادم المحلي (مُعبأة مسبقاً من القاعدة).
+وضع check يقارن النتائج بميزانية كل صفحة (PAGE_BUDGETS) ويخرج برمز 1 عند تجاوزها.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+import database
+import sync
+from benchmarks import datagen
+from query_cache import clear_cache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+
+PAGES = {
+    "dashboard": "📊 لوحة التحكم",
+    "action_plan": "📅 خطة العمل",
+    "partners": "👨‍👩‍👧‍👦 الشركاء وأولياء الأمور",
+    "events": "🎭 الفعاليات والأنشطة",
+    "reports": "📈 التقارير والإحصائيات",
+    "ai": "🤖 الذكاء الاصطناعي",
+}
+ROLES = ("admin", "visitor")
+
+# مكتبات ثقيلة يجب ألا تُستورد قبل الحاجة إليها (تُفحص بعد أول عرض لشاشة الدخول)
+HEAVY_MODULES = ("plotly.express", "requests", "streamlit_gsheets")
+
+_MAIN = sys.modules["__main__"]
+
+# ميزانية كل صفحة لإعادة التشغيل الدافئة: أقصى وسيط زمن (مللي ثانية) وأقصى عدد جمل SQL،
+# وتنطبق على كل الأحجام حتى 10000 شريك. "search" هو البحث الشامل في القائمة الجانبية،
+# و"login" أول عرض لشاشة الدخول في عملية جديدة (بعد استيراد streamlit نفسه).
+PAGE_BUDGETS = {
+    "login": {"first_ms": 800, "rerun_ms": 300, "sql": 2},
+    "dashboard": {"rerun_ms": 400, "sql": 5},
+    "action_plan": {"rerun_ms": 600, "sql": 5},
+    "partners": {"rerun_ms": 1500, "sql": 5},
+    "events": {"rerun_ms": 500, "sql": 5},
+    "reports": {"rerun_ms": 600, "sql": 5},
+    "ai": {"rerun_ms": 400, "sql": 5},
+    "search": {"rerun_ms": 600, "sql": 10},
+}
+
+
+# --- بدائل محلية لجوجل شيت ---
+
+_fake_script = None
+
+
+def _seed_sheets(script):
+    # أوراق الخادم المحلي تبدأ مطابقة للقاعدة، فيعمل السحب على بيانات حقيقية الحجم
+    with database.connection() as conn:
+        for table in sync.SHEETS:
+            sheet_name, columns = sync.sheet_columns(table)
+            script.sheets[sheet_name] = {"columns": columns, "rows": [list(r) for r in sync._iter_rows(conn, table)]}
+
+
+def _fake_connection_class():
+    from streamlit.connections import BaseConnection
+
+    class _Spreadsheet:
+        def get_lastUpdateTime(self):
+            return str(len(_fake_script.requests))
+
+    class _Client:
+        def _open_spreadsheet(self):
+            return _Spreadsheet()
+
+    class FakeGSheetsConnection(BaseConnection):
+        """بديل GSheetsConnection يقرأ ويكتب أوراق الخادم المحلي"""
+
+        def _connect(self, **kwargs):
+            return _Client()
+
+        @property
+        def client(self):
+            return self._instance
+
+        def read(self, worksheet=None, ttl=None, **kwargs):
+            with _fake_script.lock:
+                sheet = _fake_script.sheets.get(worksheet)
+                if not sheet:
+                    return pd.DataFrame()
+                return pd.DataFrame(sheet["rows"], columns=sheet["columns"])
+
+        def update(self, worksheet=None, data=None, **kwargs):
+            with _fake_script.lock:
+                _fake_script.sheets[worksheet] = {"columns": list(data.columns), "rows": data.values.tolist()}
+            return data
+
+    return FakeGSheetsConnection
+
+
+def install_fakes(gsheets=True):
+    """تشغيل الخادم المحلي وتوجيه SCRIPT_URL و conn_gs إليه (مرة واحدة لكل عملية)
+
+    gsheets=False يترك جوجل شيت غير مهيأ، فلا يُستورد streamlit_gsheets (لقياس البدء البارد).
+    """
+    global _fake_script
+    if _fake_script is not None:
+        return _fake_script
+    sys.path.insert(0, os.path.join(ROOT, "tools"))
+    import fake_script_server
+
+    _, _fake_script, url = fake_script_server.start()
+    os.environ["SCRIPT_URL"] = url
+    if gsheets:
+        import streamlit_gsheets
+
+        os.environ["CONNECTIONS_GSHEETS_SPREADSHEET"] = "offline"
+        streamlit_gsheets.GSheetsConnection = _fake_connection_class()
+    return _fake_script
+
+
+# --- عدادات القياس ---
+
+class StatementCounter:
+    """عدد جمل SQL التي ينفذها التطبيق؛ الجمل الداخلية (المشغلات و FTS5) تبدأ بـ "-- " ولا تُحسب"""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, statement):
+        if statement.startswith("--"):
+            return
+        with self._lock:
+            self.count += 1
+
+    def take(self):
+        with self._lock:
+            count, self.count = self.count, 0
+        return count
+
+
+def _proc_status(field):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def rss_mb():
+    """الذاكرة الحالية والذروة بالميغابايت (الذروة من getrusage إن لم يتوفر /proc)"""
+    peak = _proc_status("VmHWM")
+    if peak is None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return _proc_status("VmRSS"), peak
+
+
+def _reset_peak_rss():
+    # على لينكس تُصفَّر الذروة بالكتابة في clear_refs، فتُقاس ذروة كل صفحة وحدها
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+# --- تشغيل الصفحات ---
+
+def new_session(role):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP, default_timeout=600)
+    at.session_state.logged_in = True
+    at.session_state.user_role = role
+    at.run()
+    return at
+
+
+def _timed(action):
+    started = time.perf_counter()
+    at = action.run()
+    return at, (time.perf_counter() - started) * 1000
+
+
+def _errors(at):
+    return [e.message for e in at.exception]
+
+
+def bench_page(at, label, counter, repeat):
+    """أول زيارة للصفحة بذاكرة مؤقتة فارغة ثم repeat إعادة تشغيل كاملة عليها"""
+    clear_cache()
+    counter.take()
+    _reset_peak_rss()
+    at, first_ms = _timed(at.sidebar.radio[0].set_value(label))
+    first_sql = counter.take()
+    times, statements = [], []
+    for _ in range(repeat):
+        counter.take()
+        at, ms = _timed(at)
+        times.append(ms)
+        statements.append(counter.take())
+    rss, peak = rss_mb()
+    return at, {
+        "first_ms": round(first_ms, 1),
+        "first_sql": first_sql,
+        "rerun_ms": round(statistics.median(times), 1),
+        "rerun_min_ms": round(min(times), 1),
+        "sql": max(statements),
+        "rss_mb": round(rss or 0, 1),
+        "peak_rss_mb": round(peak, 1),
+        "errors": _errors(at),
+    }
+
+
+def bench_search(at, counter, repeat):
+    times, statements = [], []
+    for term in ["أحمد", "الملت", "كلمةغيرموجودة"][:max(1, repeat)]:
+        counter.take()
+        at, ms = _timed(at.sidebar.text_input[0].set_value(term))
+        times.append(ms)
+        statements.append(counter.take())
+    at.sidebar.text_input[0].set_value("").run()
+    return {"rerun_ms": round(statistics.median(times), 1), "sql": max(statements), "errors": _errors(at)}
+
+
+def bench_scale(scale, repeat, workdir, seed=42):
+    path = os.path.join(workdir, f"pages_{scale}.db")
+    datagen.generate(path, scale, seed)
+    database.configure(path)
+    os.environ["PERSISTENT_DB_PATH"] = path
+    script = install_fakes()
+    _seed_sheets(script)
+    counter = StatementCounter()
+    database.set_statement_trace(counter)
+    results = {}
+    try:
+        for role in ROLES:
+            clear_cache()
+            counter.take()
+            started = time.perf_counter()
+            at = new_session(role)
+            results[f"{role}.startup"] = {"first_ms": round((time.perf_counter() - started) * 1000, 1),
+                                          "first_sql": counter.take(), "errors": _errors(at)}
+            for key, label in PAGES.items():
+                at, results[f"{role}.{key}"] = bench_page(at, label, counter, repeat)
+            results[f"{role}.search"] = bench_search(at, counter, repeat)
+    finally:
+        database.set_statement_trace(None)
+        clear_cache()
+    results.update(bench_cold_start(path, repeat))
+    return results
+
+
+def _spawn(worker, jobs):
+    """تشغيل worker لكل مهمة في عمليات جديدة (spawn) بالتوازي"""
+    # AppTest يضع app.py مكان وحدة __main__، والعمليات الفرعية تعيد تشغيل __main__ عند بدئها
+    current_main = sys.modules["__main__"]
+    sys.modules["__main__"] = _MAIN
+    try:
+        with multiprocessing.get_context("spawn").Pool(len(jobs)) as pool:
+            return pool.map(worker, jobs)
+    finally:
+        sys.modules["__main__"] = current_main
+
+
+# --- بدء التشغيل البارد ---
+
+def _cold_start_worker(path):
+    # عملية جديدة لم تستورد app.py ولا مكتباته بعد؛ استيراد streamlit نفسه يُقاس منفصلاً
+    os.environ["PERSISTENT_DB_PATH"] = path
+    database.configure(path)
+    install_fakes(gsheets=False)
+    counter = StatementCounter()
+    database.set_statement_trace(counter)
+    started = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    import_ms = (time.perf_counter() - started) * 1000
+
+    at = AppTest.from_file(APP, default_timeout=600)
+    at, login_first = _timed(at)
+    login_sql = counter.take()
+    loaded = [m for m in HEAVY_MODULES if m in sys.modules]
+    at, login_rerun = _timed(at)
+    at.session_state.logged_in = True
+    at.session_state.user_role = "admin"
+    at, page_first = _timed(at)
+    at, page_rerun = _timed(at)
+    return {
+        "login": {"import_streamlit_ms": round(import_ms, 1), "first_ms": round(login_first, 1),
+                  "rerun_ms": round(login_rerun, 1), "sql": login_sql, "heavy_modules": loaded,
+                  "errors": []},
+        "dashboard": {"first_ms": round(page_first, 1), "rerun_ms": round(page_rerun, 1), "first_sql": counter.take(),
+                      "errors": _errors(at)},
+    }
+
+
+def bench_cold_start(path, repeat):
+    """زمن أول عرض لشاشة الدخول ولأول صفحة بعد الدخول في عملية جديدة (الوسيط عبر repeat عملية)"""
+    outcomes = []
+    for _ in range(max(1, repeat)):
+        outcomes.extend(_spawn(_cold_start_worker, [path]))
+    results = {}
+    for page in ("login", "dashboard"):
+        runs = [o[page] for o in outcomes]
+        result = dict(runs[-1])
+        for metric in ("import_streamlit_ms", "first_ms", "rerun_ms"):
+            if metric in result:
+                result[metric] = round(statistics.median(r[metric] for r in runs), 1)
+        results[f"cold.{page}"] = result
+    return results
+
+
+# --- جلسات متزامنة ---
+
+def _session_worker(args):
+    path, role, rounds, writes, seed = args
+    os.environ["PERSISTENT_DB_PATH"] = path
+    database.configure(path)
+    install_fakes()
+    rng = random.Random(seed)
+    with database.connection() as conn:
+        ids = [r[0] for r in conn.execute("SELECT id FROM parents")]
+    at = new_session(role)
+    times, errors, write_ms = [], [], []
+    for _ in range(rounds):
+        for label in PAGES.values():
+            at, ms = _timed(at.sidebar.radio[0].set_value(label))
+            times.append(ms)
+            errors.extend(_errors(at))
+            if writes:
+                # حفظ كالذي ينفذه محرر البيانات: 20 تعديلاً في معاملة واحدة
+                started = time.perf_counter()
+                try:
+                    database.apply_changes("parents", updates=[(i, {"expertise": rng.choice(datagen.EXPERTISE)})
+                                                               for i in rng.sample(ids, min(20, len(ids)))])
+                except sqlite3.OperationalError as e:
+                    errors.append(str(e))
+                write_ms.append((time.perf_counter() - started) * 1000)
+    return {"rerun_ms": times, "write_ms": write_ms, "errors": errors}
+
+
+def bench_sessions(scale, sessions, rounds, writes, workdir, seed=42):
+    """N جلسات في عمليات منفصلة (لكل منها مجمع اتصالات خاص) على ملف قاعدة واحد"""
+    path = os.path.join(workdir, f"sessions_{scale}.db")
+    datagen.generate(path, scale, seed)
+    jobs = [(path, ROLES[i % len(ROLES)], rounds, writes, seed + i) for i in range(sessions)]
+    started = time.perf_counter()
+    outcomes = _spawn(_session_worker, jobs)
+    wall = time.perf_counter() - started
+    reruns = [ms for o in outcomes for ms in o["rerun_ms"]]
+    saves = [ms for o in outcomes for ms in o["write_ms"]]
+    errors = [e for o in outcomes for e in o["errors"]]
+    result = {
+        "sessions": sessions,
+        "wall_s": round(wall, 2),
+        "rerun_median_ms": round(statistics.median(reruns), 1),
+        "rerun_max_ms": round(max(reruns), 1),
+        "locked_errors": sum("locked" in e for e in errors),
+        "errors": errors[:10],
+    }
+    if saves:
+        result["write_median_ms"] = round(statistics.median(saves), 1)
+        result["write_max_ms"] = round(max(saves), 1)
+    return result
+
+
+# --- التشغيل والميزانية ---
+
+def run(scales, repeat, out, sessions=0, rounds=2, writes=False, workdir=None):
+    workdir = workdir or tempfile.mkdtemp(prefix="pages_")
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": repeat,
+        },
+        "results": {},
+    }
+    for scale in scales:
+        print(f"scale {scale} ...", flush=True)
+        report["results"][str(scale)] = bench_scale(scale, repeat, workdir)
+        if sessions:
+            print(f"scale {scale}: {sessions} concurrent sessions ...", flush=True)
+            report["results"][str(scale)]["concurrent"] = bench_sessions(scale, sessions, rounds, writes, workdir)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Wrote {out}")
+    return report
+
+
+def check(report, budgets=PAGE_BUDGETS):
+    """طباعة كل صفحة مقابل ميزانيتها؛ تعيد عدد التجاوزات (والأخطاء أثناء العرض تُحسب تجاوزاً)"""
+    failures = 0
+    for scale, results in sorted(report["results"].items(), key=lambda kv: int(kv[0])):
+        print(f"== scale {scale}")
+        for name, result in sorted(results.items()):
+            if name == "concurrent":
+                continue
+            page = name.split(".", 1)[1]
+            problems = [f"exception: {e}" for e in result.get("errors", [])]
+            if result.get("heavy_modules"):
+                problems.append(f"imported before login: {', '.join(result['heavy_modules'])}")
+            for metric, limit in budgets.get(page, {}).items():
+                if metric in result and result[metric] > limit:
+                    problems.append(f"{metric} {result[metric]} > {limit}")
+            failures += bool(problems)
+            timing = "  ".join(f"{metric} {result[metric] if metric in result else '-':>7}" for metric in ("first_ms", "rerun_ms", "sql"))
+            print(f"{name:24s} {timing}  {'; '.join(problems) or 'ok'}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="قياس زمن عرض صفحات التطبيق")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_run = sub.add_parser("run")
+    p_run.add_argument("--scales", type=int, nargs="+", default=[1000, 10000])
+    p_run.add_argument("--repeat", type=int, default=3)
+    p_run.add_argument("--out", default="pages.json")
+    p_run.add_argument("--sessions", type=int, default=0)
+    p_run.add_argument("--rounds", type=int, default=2)
+    p_run.add_argument("--writes", action="store_true")
+    p_run.add_argument("--workdir")
+    p_run.add_argument("--check", action="store_true", help="فحص الميزانية بعد القياس")
+    p_check = sub.add_parser("check")
+    p_check.add_argument("report")
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        report = run(args.scales, args.repeat, args.out, args.sessions, args.rounds, args.writes, args.workdir)
+        return 1 if args.check and check(report) else 0
+    with open(args.report, encoding="utf-8") as f:
+        return 1 if check(json.load(f)) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
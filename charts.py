@@ -0,0 +1,89 @@
+import json
+
+import pandas as pd
+
+from database import connection
+from query_cache import cached
+from queries import stats_summary, stat, interaction_breakdown
+
+# عدد الفعاليات المعروضة بأسمائها في رسم الحضور؛ الباقي يُجمع في عمود "أخرى"
+TOP_EVENTS = 10
+OTHER_LABEL = "أخرى"
+
+# الحضور كرقم (القيم غير الرقمية القادمة من جوجل شيت تُحسب صفراً كما في ملخص الإحصائيات)
+_ATTENDEES = "COALESCE(CAST(attendees_count AS INTEGER), 0)"
+
+
+def top_events(n=TOP_EVENTS):
+    """أعلى n فعاليات حضوراً، وصف "أخرى" بمجموع حضور الباقي: DataFrame(label, attendees)"""
+    def load():
+        with connection() as conn:
+            top = pd.read_sql(f"""SELECT name || COALESCE(' (' || NULLIF(date, '') || ')', '') AS label, {_ATTENDEES} AS attendees
+                                  FROM events ORDER BY attendees DESC, id LIMIT ?""", conn, params=(n,))
+        # الإجماليات من جدول الملخص، فلا حاجة لمسح ثانٍ للفعاليات خارج الأعلى حضوراً
+        summary = stats_summary()
+        rest = stat(summary, "events.count") - len(top)
+        if rest > 0:
+            top.loc[len(top)] = [f"{OTHER_LABEL} ({rest})", stat(summary, "events.attendees") - int(top["attendees"].sum())]
+        return top
+    return cached(("top_events", n), ("events",), load)
+
+
+def monthly_attendance():
+    """عدد الفعاليات ومجموع الحضور لكل شهر (من فهرس التاريخ): DataFrame(month, events, attendees)"""
+    def load():
+        with connection() as conn:
+            # التواريخ بغير صيغة ISO لا يمكن نسبتها إلى شهر فتُستبعد
+            return pd.read_sql(f"""SELECT substr(date, 1, 7) AS month, COUNT(*) AS events, SUM({_ATTENDEES}) AS attendees
+                                   FROM events WHERE date > '' AND date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]*'
+                                   GROUP BY month ORDER BY month""", conn)
+    return cached(("monthly_attendance",), ("events",), load)
+
+
+def partner_types():
+    """عدد الشركاء لكل نوع مشاركة من جدول الملخص"""
+    types = {k: v for k, v in stats_summary().get("parents.participation_type", {}).items() if k}
+    df = pd.DataFrame({"participation_type": list(types), "count": list(types.values())})
+    return df.sort_values("count", ascending=False, ignore_index=True)
+
+
+def _attendance_figure():
+    import plotly.express as px
+    return px.bar(top_events(), x="label", y="attendees", title="عدد الحضور حسب الفعالية",
+                  labels={"label": "الفعالية", "attendees": "الحضور"})
+
+
+def _monthly_figure():
+    import plotly.express as px
+    return px.bar(monthly_attendance(), x="month", y="attendees", hover_data=["events"], title="الحضور حسب الشهر",
+                  labels={"month": "الشهر", "attendees": "الحضور", "events": "الفعاليات"})
+
+
+def _partner_types_figure():
+    import plotly.express as px
+    return px.pie(partner_types(), names="participation_type", values="count", title="أنواع الشراكات")
+
+
+def _interaction_figure():
+    import plotly.express as px
+    return px.pie(interaction_breakdown(), names="interaction_level", values="count", hole=0.4,
+                  color_discrete_sequence=px.colors.sequential.Blues_r)
+
+
+# الرسوم المتاحة: الاسم -> (دالة البناء، الجداول التي يعتمد عليها)
+CHARTS = {
+    "attendance": (_attendance_figure, ("events",)),
+    "monthly_attendance": (_monthly_figure, ("events",)),
+    "partner_types": (_partner_types_figure, ("parents",)),
+    "interaction": (_interaction_figure, ("parents",)),
+}
+
+
+def figure(name):
+    """مواصفات الرسم (dict) لتمريرها إلى st.plotly_chart
+
+    JSON الرسم يُبنى مرة واحدة لكل جيل من بيانات جداوله، فإعادة التشغيل لا تستدعي plotly.express؛
+    ويُعاد dict جديد في كل مرة حتى لا تُعدّل النسخة المحفوظة.
+    """
+    build, tables = CHARTS[name]
+    return json.loads(cached(("figure", name), tables, lambda: build().to_json()))
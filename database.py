@@ -1,15 +1,151 @@
 import sqlite3
 import pandas as pd
 import os
+import re
+import zlib
+import hashlib
+import queue
+import threading
+from contextlib import contextmanager
+
+from arabic_text import normalize_sql
 
 # تحديد المسار المطلق لقاعدة البيانات
 # إذا كان التطبيق يعمل على منصة تدعم المجلدات الدائمة مثل Railway، سيستخدم المسار المخصص
 DB_PATH = os.environ.get('PERSISTENT_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'community_relations.db'))
 
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
+# عدد الاتصالات المحفوظة للاستخدام المتكرر (كل جلسة ستريمليت تعمل في خيط مستقل)
+POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 4))
+
+# إعدادات تُطبق مرة واحدة عند إنشاء كل اتصال
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-8000",
+    "PRAGMA mmap_size=67108864",
+)
+
+_pool = queue.LifoQueue(maxsize=POOL_SIZE)
+_init_lock = threading.Lock()
+_initialized = False
+
+# عدّاد "جيل" لكل جدول يزداد مع كل كتابة، وتعتمد عليه ذاكرة التخزين المؤقت
+_generations = {}
+_gen_lock = threading.Lock()
+_watch_conn = None
+_seen_data_version = None
+
+# دالة اختيارية تُستدعى بنص كل جملة SQL على اتصالات المجمع (لأدوات القياس فقط)
+_statement_trace = None
+
+
+class PooledConnection(sqlite3.Connection):
+    """اتصال يعود إلى المجمع عند استدعاء close() بدلاً من إغلاقه فعلياً"""
+
+    def close(self):
+        release_connection(self)
+
+    def close_for_real(self):
+        super().close()
+
+
+# صنف الاتصالات الجديدة في المجمع؛ أداة القياس (profiler) تستبدله بصنف يسجل الاستعلامات
+_connection_factory = PooledConnection
+
+
+def _zip_text(text):
+    return None if text is None else zlib.compress(str(text).encode("utf-8"), 9)
+
+
+def _unzip_text(blob):
+    return None if blob is None else zlib.decompress(blob).decode("utf-8")
+
+
+def _text_hash(text):
+    return None if text is None else hashlib.sha256(str(text).encode("utf-8")).hexdigest()
+
+
+def register_functions(conn):
+    """دالة فك الضغط في SQL لاتصالات التطبيق فقط؛ تستخدمها read_source ولا يعتمد عليها المخطط"""
+    conn.create_function("unzip_text", 1, _unzip_text, deterministic=True)
+
+
+def _compress_reports(conn):
+    rows = conn.execute("SELECT id, report_content FROM reports WHERE report_content IS NOT NULL").fetchall()
+    for report_id, text in rows:
+        text = str(text)
+        digest = _text_hash(text)
+        conn.execute("INSERT OR IGNORE INTO report_bodies (hash, title, size, content) VALUES (?, ?, ?, ?)",
+                     (digest, text.split("\n", 1)[0][:120], len(text.encode("utf-8")), _zip_text(text)))
+        conn.execute("""UPDATE reports SET report_content = NULL, body_id = (SELECT id FROM report_bodies WHERE hash = ?)
+                        WHERE id = ?""", (digest, report_id))
+    return len(rows)
+
+
+def compact_reports(conn):
+    """ضغط التقارير المحفوظة نصاً عادياً ونقل نصوصها إلى report_bodies (النص المكرر يُخزن مرة واحدة)
+
+    قبلها تُعاد فهرسة التقارير المضغوطة التي عُدلت أو حُذفت منذ آخر استدعاء (انظر report_reindex).
+    تعيد عدد الصفوف المضغوطة. الضغط في Python لا في المشغلات، فالكتابة من أي اتصال تبقى ممكنة.
+    """
+    _reindex_reports(conn)
+    return _compress_reports(conn)
+
+
+# مصدر القراءة الكاملة للجداول التي يُخزن جزء منها مضغوطاً (الأعمدة نفسها التي يراها المستخدم)
+READ_SOURCES = {
+    "reports": """(SELECT r.id AS id, r.report_date AS report_date,
+                   COALESCE(r.report_content, (SELECT unzip_text(b.content) FROM report_bodies b WHERE b.id = r.body_id)) AS report_content
+                   FROM reports r)""",
+}
+
+
+def read_source(table):
+    """ما يوضع بعد FROM لقراءة الجدول بقيمه الكاملة (يتطلب اتصالاً من المجمع لتسجيل دوال الضغط)"""
+    return READ_SOURCES.get(table, table)
+
+
+def _open_connection():
+    conn = sqlite3.connect(DB_PATH, timeout=20, check_same_thread=False, factory=_connection_factory)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    register_functions(conn)
+    if _statement_trace is not None:
+        conn.set_trace_callback(_statement_trace)
+    return conn
+
+
+def init_db(force=False):
+    """تجهيز المخطط وتطبيق خطوات الترحيل مرة واحدة لكل عملية (process) ما لم يُطلب ذلك صراحة"""
+    global _initialized
+    if _initialized and not force:
+        return
+    with _init_lock:
+        if _initialized and not force:
+            return
+        conn = sqlite3.connect(DB_PATH, timeout=20)
+        try:
+            # وضع WAL دائم في ملف القاعدة، فنفعّله هنا قبل أن تبدأ القراءات المخزنة
+            conn.execute("PRAGMA journal_mode=WAL")
+            migrate(conn)
+        finally:
+            conn.close()
+        _initialized = True
+
+
+def _column_names(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _add_column(conn, table, column, decl):
+    # القواعد القديمة قد تحتوي العمود مسبقاً إذا أُنشئت بنسخة أحدث من init_db
+    if column not in _column_names(conn, table):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+def _create_tables(conn):
     c = conn.cursor()
-    
+
     # 1. جدول أولياء الأمور
     c.execute('''CREATE TABLE IF NOT EXISTS parents (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -19,7 +155,7 @@ def init_db():
         interaction_level TEXT,
         phone TEXT
     )''')
-    
+
     # 2. جدول خطة العمل
     c.execute('''CREATE TABLE IF NOT EXISTS action_plan (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -32,7 +168,7 @@ def init_db():
         priority TEXT,
         task_type TEXT DEFAULT 'معنوي'
     )''')
-    
+
     # 4. جدول سجل اللقاءات والملاحظات التطويرية
     c.execute('''CREATE TABLE IF NOT EXISTS meetings (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -52,21 +188,687 @@ def init_db():
         attendees_count INTEGER,
         rating INTEGER
     )''')
-    
+
     # 6. جدول التقارير المحفوظة
     c.execute('''CREATE TABLE IF NOT EXISTS reports (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         report_date TEXT,
         report_content TEXT
     )''')
-    
-    conn.commit()
-    conn.close()
+
+
+def _add_partner_and_task_columns(conn):
+    # أعمدة أضيفت بعد الإصدار الأول (كانت تُضاف سابقاً عند فشل الإدخال)
+    _add_column(conn, "parents", "expertise", "TEXT")
+    _add_column(conn, "parents", "phone", "TEXT")
+    _add_column(conn, "action_plan", "task_type", "TEXT DEFAULT 'معنوي'")
+
+
+# الجداول التي تُرفع إلى جوجل شيت وتُتتبع تغييراتها على مستوى الصف
+SYNCED_TABLES = ("action_plan", "parents", "events", "reports")
+
+
+def _create_sync_tracking(conn):
+    # آخر مزامنة ناجحة لكل جدول واتجاه (push / pull)
+    conn.execute('''CREATE TABLE IF NOT EXISTS sync_state (
+        table_name TEXT NOT NULL,
+        direction TEXT NOT NULL,
+        synced_at TEXT,
+        PRIMARY KEY (table_name, direction)
+    )''')
+    # سجل التغييرات غير المرفوعة؛ يُملأ بالمشغلات ويُفرغ بعد كل رفع ناجح
+    conn.execute('''CREATE TABLE IF NOT EXISTS sync_changes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        op TEXT NOT NULL
+    )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sync_changes_table ON sync_changes(table_name, id)")
+    for table in SYNCED_TABLES:
+        # لا داعي للتتبع قبل أول رفع كامل، فالرفع الأول يرسل الجدول كاملاً على أي حال
+        tracked = f"EXISTS (SELECT 1 FROM sync_state WHERE table_name = '{table}' AND direction = 'push')"
+        conn.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_sync_insert AFTER INSERT ON {table}
+            WHEN {tracked}
+            BEGIN INSERT INTO sync_changes (table_name, row_id, op) VALUES ('{table}', NEW.id, 'upsert'); END''')
+        conn.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_sync_update AFTER UPDATE ON {table}
+            WHEN {tracked}
+            BEGIN INSERT INTO sync_changes (table_name, row_id, op) VALUES ('{table}', NEW.id, 'upsert'); END''')
+        conn.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_sync_delete AFTER DELETE ON {table}
+            WHEN {tracked}
+            BEGIN INSERT INTO sync_changes (table_name, row_id, op) VALUES ('{table}', OLD.id, 'delete'); END''')
+
+
+def _create_sync_outbox(conn):
+    # طلبات الرفع المعلقة؛ يفرغها عامل الخلفية في sync.py ويعيد المحاولة عند الفشل
+    conn.execute('''CREATE TABLE IF NOT EXISTS sync_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        full INTEGER DEFAULT 0,
+        enqueued_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        attempts INTEGER DEFAULT 0,
+        next_attempt_at REAL DEFAULT 0,
+        last_error TEXT
+    )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sync_outbox_table ON sync_outbox(table_name)")
+
+
+# مصادر فهرس البحث الشامل: الجدول -> (رمز الجدول، عمود العنوان، أعمدة المحتوى)
+# معرف الصف في الفهرس = id * SEARCH_STRIDE + رمز الجدول، ليكون الحذف والتحديث بالمفتاح مباشرة
+SEARCH_SOURCES = {
+    "parents": (1, "name", ("participation_type", "expertise", "interaction_level", "phone")),
+    "action_plan": (2, "objective", ("activity", "responsibility", "kpi", "status", "priority", "task_type", "timeframe")),
+    "events": (3, "name", ("location", "date")),
+    "meetings": (4, "subject", ("summary", "ai_recommendations", "date")),
+    "reports": (5, "report_date", ("report_content",)),
+}
+SEARCH_STRIDE = 8
+# رمز الجدول -> الجدول؛ الفهرس بلا محتوى مخزن، فنوع النتيجة يُستنتج من معرفها
+SEARCH_KINDS = {code: table for table, (code, _, _) in SEARCH_SOURCES.items()}
+
+
+def _search_values(table, ref):
+    # ref هو NEW داخل المشغلات، أو اسم الجدول عند التعبئة الأولية
+    code, title, body_cols = SEARCH_SOURCES[table]
+    body = " || ' ' || ".join(f"COALESCE({ref}.{c}, '')" for c in body_cols)
+    return f"{ref}.id * {SEARCH_STRIDE} + {code}, '{table}', {normalize_sql(f'{ref}.{title}')}, {normalize_sql(body)}"
+
+
+def _create_search_index(conn):
+    # فهرس FTS5 واحد لكل الجداول، يُخزن فيه النص بعد تطبيع الحروف العربية وحذف التشكيل
+    conn.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+        title, body, kind UNINDEXED, tokenize = 'unicode61 remove_diacritics 2'
+    )''')
+    for table, (code, _, _) in SEARCH_SOURCES.items():
+        old_rowid = f"OLD.id * {SEARCH_STRIDE} + {code}"
+        conn.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_search_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO search_index (rowid, kind, title, body) VALUES ({_search_values(table, "NEW")});
+        END''')
+        conn.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_search_update AFTER UPDATE ON {table} BEGIN
+            DELETE FROM search_index WHERE rowid = {old_rowid};
+            INSERT INTO search_index (rowid, kind, title, body) VALUES ({_search_values(table, "NEW")});
+        END''')
+        conn.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_search_delete AFTER DELETE ON {table} BEGIN
+            DELETE FROM search_index WHERE rowid = {old_rowid};
+        END''')
+        conn.execute(f"INSERT INTO search_index (rowid, kind, title, body) SELECT {_search_values(table, table)} FROM {table}")
+
+
+def _create_dashboard_indexes(conn):
+    # فهارس لاستعلامات لوحة التحكم (العدّ حسب الحالة والأولوية ومستوى التفاعل والتاريخ)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_action_plan_status_priority ON action_plan(status, priority)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_action_plan_priority_status ON action_plan(priority, status)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_parents_interaction ON parents(interaction_level)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_events_date ON events(date)")
+
+
+# عدادات ملخص الإحصائيات: الجدول -> (المؤشر، تعبير الفئة، تعبير القيمة)
+# {r} يُستبدل بـ NEW أو OLD داخل المشغلات، أو باسم الجدول عند إعادة البناء
+STATS_COUNTERS = {
+    "parents": (
+        ("count", "''", "1"),
+        ("interaction_level", "{r}.interaction_level", "1"),
+        ("participation_type", "{r}.participation_type", "1"),
+    ),
+    "action_plan": (
+        ("count", "''", "1"),
+        ("status", "{r}.status", "1"),
+        ("priority", "{r}.priority", "1"),
+        # المهام غير المكتملة حسب الأولوية (للمهام العاجلة في لوحة التحكم)
+        ("open_priority", "{r}.priority", "CASE WHEN {r}.status IS NULL OR {r}.status != 'مكتمل' THEN 1 ELSE 0 END"),
+    ),
+    "events": (
+        ("count", "''", "1"),
+        ("attendees", "''", "COALESCE(CAST({r}.attendees_count AS INTEGER), 0)"),
+    ),
+    "meetings": (
+        ("count", "''", "1"),
+    ),
+    "reports": (
+        ("count", "''", "1"),
+    ),
+}
+
+
+def _stats_columns(table):
+    # الأعمدة التي تؤثر في عدادات الجدول؛ تعديل غيرها لا يستدعي تحديث الملخص
+    return sorted({col for _, bucket, value in STATS_COUNTERS[table]
+                   for col in re.findall(r"\{r\}\.(\w+)", f"{bucket} {value}")})
+
+
+def _stats_upserts(table, ref, sign):
+    return "\n".join(
+        f"""INSERT INTO stats_summary (metric, bucket, value)
+            VALUES ('{table}.{metric}', COALESCE({bucket.format(r=ref)}, ''), {sign}({value.format(r=ref)}))
+            ON CONFLICT(metric, bucket) DO UPDATE SET value = value + excluded.value;"""
+        for metric, bucket, value in STATS_COUNTERS[table])
+
+
+def _rebuild_stats(conn):
+    conn.execute("DELETE FROM stats_summary")
+    for table, counters in STATS_COUNTERS.items():
+        for metric, bucket, value in counters:
+            conn.execute(f"""INSERT INTO stats_summary (metric, bucket, value)
+                             SELECT '{table}.{metric}', COALESCE({bucket.format(r=table)}, ''), SUM({value.format(r=table)})
+                             FROM {table} GROUP BY 2""")
+
+
+def _create_stats_summary(conn):
+    # ملخص إحصائي تحدّثه المشغلات مع كل كتابة، فتقرأ الصفحات الأعداد دون المرور على الجداول
+    conn.execute('''CREATE TABLE IF NOT EXISTS stats_summary (
+        metric TEXT NOT NULL,
+        bucket TEXT NOT NULL DEFAULT '',
+        value INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (metric, bucket)
+    ) WITHOUT ROWID''')
+    for table in STATS_COUNTERS:
+        conn.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_stats_insert AFTER INSERT ON {table} BEGIN
+            {_stats_upserts(table, "NEW", "+")}
+        END''')
+        conn.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_stats_delete AFTER DELETE ON {table} BEGIN
+            {_stats_upserts(table, "OLD", "-")}
+        END''')
+        columns = _stats_columns(table)
+        if columns:
+            conn.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_stats_update AFTER UPDATE OF {", ".join(columns)} ON {table} BEGIN
+                {_stats_upserts(table, "OLD", "-")}
+                {_stats_upserts(table, "NEW", "+")}
+            END''')
+    _rebuild_stats(conn)
+
+
+def _create_partner_events(conn):
+    # روابط الشركاء بالفعاليات: auto يعيد حسابها المطابق الآلي، manual يضيفها المسؤول ولا تُمس
+    conn.execute('''CREATE TABLE IF NOT EXISTS partner_events (
+        partner_id INTEGER NOT NULL,
+        event_id INTEGER NOT NULL,
+        source TEXT NOT NULL DEFAULT 'auto',
+        PRIMARY KEY (partner_id, event_id)
+    ) WITHOUT ROWID''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_partner_events_event ON partner_events(event_id)")
+    # حذف الروابط مع حذف طرفها حتى لا تبقى روابط معلقة
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS trg_parents_links_delete AFTER DELETE ON parents BEGIN
+        DELETE FROM partner_events WHERE partner_id = OLD.id;
+    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS trg_events_links_delete AFTER DELETE ON events BEGIN
+        DELETE FROM partner_events WHERE event_id = OLD.id;
+    END''')
+
+
+def _create_partner_page_indexes(conn):
+    # فهارس صفحات بطاقات الشركاء (الترتيب بالاسم والفلترة حسب النوع)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_parents_name ON parents(name)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_parents_type_name ON parents(participation_type, name)")
+
+
+def _add_sync_hashes(conn):
+    # بصمة محتوى الجدول عند آخر مزامنة ناجحة، ووقت آخر تعديل للملف في جوجل (للسحب)
+    _add_column(conn, "sync_state", "content_hash", "TEXT")
+    _add_column(conn, "sync_state", "source_modified", "TEXT")
+
+
+def _create_period_indexes(conn):
+    # فهارس تغطي استعلامات التقارير الدورية (نطاق تاريخ + القيم المجمعة) دون قراءة صفوف الجداول؛
+    # فهرس الفعاليات الجديد يبدأ بالتاريخ فيغني عن idx_events_date
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_events_date_stats ON events(date, attendees_count, rating)")
+    conn.execute("DROP INDEX IF EXISTS idx_events_date")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_action_plan_timeframe_status ON action_plan(timeframe, status)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_meetings_date ON meetings(date, attendees_count)")
+
+
+def _create_plain_report_triggers(conn):
+    # مشغلات SQL خالصة على جدول التقارير، فالكتابة من خارج التطبيق (أداة sqlite3 مثلاً) تبقى مفهرسة.
+    # الصف المضغوط: report_content فارغ و body_id يشير إلى النص في report_bodies
+    compacted = "NEW.report_content IS NULL AND NEW.body_id IS NOT NULL"
+    code = SEARCH_SOURCES["reports"][0]
+    old_rowid = f"OLD.id * {SEARCH_STRIDE} + {code}"
+    conn.execute(f'''CREATE TRIGGER trg_reports_search_insert AFTER INSERT ON reports BEGIN
+        INSERT INTO search_index (rowid, kind, title, body) VALUES ({_search_values("reports", "NEW")});
+    END''')
+    # ضغط الصف لا يغير نصه، فيبقى محتواه في الفهرس كما هو ويُحدّث العنوان فقط
+    conn.execute(f'''CREATE TRIGGER trg_reports_search_update AFTER UPDATE ON reports WHEN NOT ({compacted}) BEGIN
+        DELETE FROM search_index WHERE rowid = {old_rowid};
+        INSERT INTO search_index (rowid, kind, title, body) VALUES ({_search_values("reports", "NEW")});
+    END''')
+    conn.execute(f'''CREATE TRIGGER trg_reports_search_title AFTER UPDATE OF report_date ON reports WHEN {compacted} BEGIN
+        UPDATE search_index SET title = {normalize_sql("NEW.report_date")} WHERE rowid = {old_rowid};
+    END''')
+    conn.execute(f'''CREATE TRIGGER trg_reports_search_delete AFTER DELETE ON reports BEGIN
+        DELETE FROM search_index WHERE rowid = {old_rowid};
+    END''')
+    conn.execute(f'''CREATE TRIGGER trg_reports_stats_insert AFTER INSERT ON reports BEGIN
+        {_stats_upserts("reports", "NEW", "+")}
+    END''')
+    conn.execute(f'''CREATE TRIGGER trg_reports_stats_delete AFTER DELETE ON reports BEGIN
+        {_stats_upserts("reports", "OLD", "-")}
+    END''')
+    tracked = "EXISTS (SELECT 1 FROM sync_state WHERE table_name = 'reports' AND direction = 'push')"
+    conn.execute(f'''CREATE TRIGGER trg_reports_sync_insert AFTER INSERT ON reports
+        WHEN {tracked}
+        BEGIN INSERT INTO sync_changes (table_name, row_id, op) VALUES ('reports', NEW.id, 'upsert'); END''')
+    # الضغط ليس تعديلاً يحتاج رفعاً
+    conn.execute(f'''CREATE TRIGGER trg_reports_sync_update AFTER UPDATE ON reports
+        WHEN {tracked} AND NOT (OLD.report_content IS NOT NULL AND {compacted})
+        BEGIN INSERT INTO sync_changes (table_name, row_id, op) VALUES ('reports', NEW.id, 'upsert'); END''')
+    conn.execute(f'''CREATE TRIGGER trg_reports_sync_delete AFTER DELETE ON reports
+        WHEN {tracked}
+        BEGIN INSERT INTO sync_changes (table_name, row_id, op) VALUES ('reports', OLD.id, 'delete'); END''')
+    # كتابة نص جديد (أو إفراغه) في صف مضغوط تفصله عن نصه القديم
+    conn.execute('''CREATE TRIGGER trg_reports_body_detach AFTER UPDATE OF report_content ON reports
+        WHEN OLD.body_id IS NOT NULL AND NEW.body_id IS OLD.body_id
+        BEGIN UPDATE reports SET body_id = NULL WHERE id = NEW.id; END''')
+    orphan = "DELETE FROM report_bodies WHERE id = OLD.body_id AND NOT EXISTS (SELECT 1 FROM reports WHERE body_id = OLD.body_id);"
+    conn.execute(f"CREATE TRIGGER trg_reports_body_delete AFTER DELETE ON reports BEGIN {orphan} END")
+    conn.execute(f"CREATE TRIGGER trg_reports_body_update AFTER UPDATE OF body_id ON reports BEGIN {orphan} END")
+
+
+def _create_report_archive(conn):
+    # أرشيف التقارير: النصوص مضغوطة وبلا تكرار في report_bodies، ويبقى reports جدولاً عادياً.
+    # التطبيق يكتب النص عادياً ثم يضغطه compact_reports، فلا يحتاج المخطط أي دالة Python
+    conn.execute('''CREATE TABLE IF NOT EXISTS report_bodies (
+        id INTEGER PRIMARY KEY,
+        hash TEXT NOT NULL UNIQUE,
+        title TEXT,
+        size INTEGER NOT NULL,
+        content BLOB NOT NULL
+    )''')
+    _add_column(conn, "reports", "body_id", "INTEGER REFERENCES report_bodies(id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_date ON reports(report_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_body ON reports(body_id)")
+    # الصفوف غير المضغوطة بعد (كتابات خارجية أو مسحوبة) قليلة دائماً
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_plain ON reports(id) WHERE report_content IS NOT NULL")
+    # مشغلات البحث والملخص والمزامنة السابقة تُستبدل بنسخ تراعي الصفوف المضغوطة
+    for kind in ("search", "stats", "sync"):
+        for event in ("insert", "update", "delete"):
+            conn.execute(f"DROP TRIGGER IF EXISTS trg_reports_{kind}_{event}")
+    _create_plain_report_triggers(conn)
+    _compress_reports(conn)
+
+
+def _drop_status_priority_index(conn):
+    # مؤشرات الخطة تُقرأ من stats_summary، وidx_action_plan_priority_status يغطي استعلام المهام العاجلة،
+    # فهذا الفهرس المكرر لا قارئ له ويزيد كلفة الكتابة في action_plan فقط
+    conn.execute("DROP INDEX IF EXISTS idx_action_plan_status_priority")
+
+def _search_entry(table, ref):
+    # (معرف الصف، العنوان، المحتوى) في الفهرس بلا كلمة kind التي لم تعد عموداً
+    code, title, body_cols = SEARCH_SOURCES[table]
+    body = " || ' ' || ".join(f"COALESCE({ref}.{c}, '')" for c in body_cols)
+    return f"{ref}.id * {SEARCH_STRIDE} + {code}, {normalize_sql(f'{ref}.{title}')}, {normalize_sql(body)}"
+
+
+def _search_delete(table, ref):
+    # الفهرس لا يحفظ النص، فالحذف يمرر القيم نفسها التي فُهرست (أمر 'delete' في FTS5)
+    return f"INSERT INTO search_index (search_index, rowid, title, body) SELECT 'delete', {_search_entry(table, ref)}"
+
+
+# التقرير المضغوط لا يمكن قراءة نصه في SQL خالص، فتعديله أو حذفه يُسجل هنا بالقيم المفهرسة
+# (body_id فارغ = لا شيء مفهرس بعد)، ثم يعيد compact_reports فهرسته من Python
+_REPORT_PENDING = "EXISTS (SELECT 1 FROM report_reindex WHERE report_id = {r}.id)"
+_REPORT_COMPACTED = "({r}.report_content IS NULL AND {r}.body_id IS NOT NULL)"
+_REPORT_ENTRY = f":rowid, {normalize_sql(':title')}, {normalize_sql(':body')}"
+
+
+def _report_search(conn, command, report_id, report_date, text):
+    params = {"rowid": report_id * SEARCH_STRIDE + SEARCH_SOURCES["reports"][0], "title": report_date, "body": text}
+    if command == "delete":
+        conn.execute(f"INSERT INTO search_index (search_index, rowid, title, body) VALUES ('delete', {_REPORT_ENTRY})", params)
+    else:
+        conn.execute(f"INSERT INTO search_index (rowid, title, body) VALUES ({_REPORT_ENTRY})", params)
+
+
+def _report_text(content, blob):
+    # نص التقرير كما تراه read_source: النص العادي إن وجد وإلا النص المضغوط
+    return content if content is not None else (_unzip_text(blob) or "")
+
+
+def _reindex_reports(conn):
+    pending = conn.execute("""SELECT p.report_id, p.report_date, p.body_id, b.content FROM report_reindex p
+                              LEFT JOIN report_bodies b ON b.id = p.body_id""").fetchall()
+    for report_id, report_date, body_id, blob in pending:
+        if body_id is not None:
+            _report_search(conn, "delete", report_id, report_date, _report_text(None, blob))
+        row = conn.execute("""SELECT r.report_date, r.report_content, b.content FROM reports r
+                              LEFT JOIN report_bodies b ON b.id = r.body_id WHERE r.id = ?""", (report_id,)).fetchone()
+        if row:
+            _report_search(conn, "insert", report_id, row[0], _report_text(row[1], row[2]))
+    conn.execute("DELETE FROM report_reindex")
+    # النصوص التي لم يعد يشير إليها تقرير تُحذف بعد حذف فهرستها
+    conn.executemany("DELETE FROM report_bodies WHERE id = ? AND NOT EXISTS (SELECT 1 FROM reports WHERE body_id = ?)",
+                     [(body_id, body_id) for _, _, body_id, _ in pending if body_id is not None])
+
+
+def _create_contentless_search(conn):
+    # فهرس البحث بلا نسخة من النصوص (content=''): يُقرأ منه المعرف فقط، والنص في جداوله
+    # (والتقارير مضغوطة). الحذف بأمر 'delete' لأن contentless_delete يتطلب SQLite 3.43
+    for table in SEARCH_SOURCES:
+        for event in ("insert", "update", "delete"):
+            conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_search_{event}")
+    for name in ("trg_reports_search_title", "trg_reports_body_detach", "trg_reports_body_delete", "trg_reports_body_update"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    conn.execute("DROP TABLE IF EXISTS search_index")
+    conn.execute('''CREATE VIRTUAL TABLE search_index USING fts5(
+        title, body, content = '', tokenize = 'unicode61 remove_diacritics 2'
+    )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS report_reindex (
+        report_id INTEGER PRIMARY KEY,
+        report_date TEXT,
+        body_id INTEGER
+    )''')
+
+    for table in SEARCH_SOURCES:
+        if table == "reports":
+            continue
+        conn.execute(f'''CREATE TRIGGER trg_{table}_search_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO search_index (rowid, title, body) VALUES ({_search_entry(table, "NEW")});
+        END''')
+        conn.execute(f'''CREATE TRIGGER trg_{table}_search_update AFTER UPDATE ON {table} BEGIN
+            {_search_delete(table, "OLD")};
+            INSERT INTO search_index (rowid, title, body) VALUES ({_search_entry(table, "NEW")});
+        END''')
+        conn.execute(f'''CREATE TRIGGER trg_{table}_search_delete AFTER DELETE ON {table} BEGIN
+            {_search_delete(table, "OLD")};
+        END''')
+        conn.execute(f"INSERT INTO search_index (rowid, title, body) SELECT {_search_entry(table, table)} FROM {table}")
+
+    old_pending, new_pending = _REPORT_PENDING.format(r="OLD"), _REPORT_PENDING.format(r="NEW")
+    old_packed, new_packed = _REPORT_COMPACTED.format(r="OLD"), _REPORT_COMPACTED.format(r="NEW")
+    queue_old = f"""INSERT OR IGNORE INTO report_reindex (report_id, report_date, body_id)
+        SELECT OLD.id, OLD.report_date, OLD.body_id WHERE {old_packed}"""
+    # الضغط (نص عادي -> مضغوط بنفس التاريخ) لا يغير النص المفهرس
+    compaction = f"({new_packed} AND NEW.id = OLD.id AND NEW.report_date IS OLD.report_date)"
+    conn.execute(f'''CREATE TRIGGER trg_reports_search_insert AFTER INSERT ON reports BEGIN
+        INSERT INTO search_index (rowid, title, body) SELECT {_search_entry("reports", "NEW")}
+            WHERE NOT {new_packed} AND NOT {new_pending};
+        INSERT OR IGNORE INTO report_reindex (report_id) SELECT NEW.id WHERE {new_packed};
+    END''')
+    conn.execute(f'''CREATE TRIGGER trg_reports_search_update AFTER UPDATE ON reports BEGIN
+        {_search_delete("reports", "OLD")} WHERE NOT {old_pending} AND NOT {old_packed} AND NOT {compaction};
+        INSERT INTO search_index (rowid, title, body) SELECT {_search_entry("reports", "NEW")}
+            WHERE NOT {old_pending} AND NOT {old_packed} AND NOT {new_packed};
+        INSERT OR IGNORE INTO report_reindex (report_id) SELECT NEW.id
+            WHERE (NOT {old_pending} AND NOT {old_packed} AND {new_packed} AND NOT {compaction})
+               OR (NEW.id != OLD.id AND ({old_pending} OR {old_packed}));
+        {queue_old};
+    END''')
+    conn.execute(f'''CREATE TRIGGER trg_reports_search_delete AFTER DELETE ON reports BEGIN
+        {_search_delete("reports", "OLD")} WHERE NOT {old_pending} AND NOT {old_packed};
+        {queue_old};
+    END''')
+    # كتابة نص جديد (أو إفراغه) في صف مضغوط تفصله عن نصه القديم؛ يُسجل أولاً لإعادة الفهرسة
+    # حتى لا يُحذف من الفهرس بنصه الجديد بدل القديم أياً كان ترتيب تنفيذ المشغلات
+    conn.execute(f'''CREATE TRIGGER trg_reports_body_detach AFTER UPDATE OF report_content ON reports
+        WHEN OLD.body_id IS NOT NULL AND NEW.body_id IS OLD.body_id BEGIN
+        {queue_old};
+        UPDATE reports SET body_id = NULL WHERE id = NEW.id;
+    END''')
+    rows = conn.execute("""SELECT r.id, r.report_date, r.report_content, b.content FROM reports r
+                           LEFT JOIN report_bodies b ON b.id = r.body_id""").fetchall()
+    for report_id, report_date, content, blob in rows:
+        _report_search(conn, "insert", report_id, report_date, _report_text(content, blob))
+
+def _create_auto_links(conn):
+    # الروابط الآلية تُحدّث في مسارات الكتابة (linking.refresh_links)، فتُحسب هنا مرة للبيانات الحالية؛
+    # الاستيراد داخل الدالة لأن linking نفسه يستورد database
+    from linking import update_links
+    update_links(conn)
+
+
+# خطوات ترحيل المخطط بالترتيب. لا تُعدّل خطوة بعد نشرها، بل تُضاف خطوة جديدة برقم أعلى
+MIGRATIONS = [
+    (1, "الجداول الأساسية", _create_tables),
+    (2, "أعمدة الخبرة والهاتف ونوع المهمة", _add_partner_and_task_columns),
+    (3, "تتبع التغييرات للمزامنة الجزئية", _create_sync_tracking),
+    (4, "طابور المزامنة في الخلفية", _create_sync_outbox),
+    (5, "فهرس البحث الشامل FTS5", _create_search_index),
+    (6, "فهارس لوحة التحكم", _create_dashboard_indexes),
+    (7, "ملخص الإحصائيات المحدّث بالمشغلات", _create_stats_summary),
+    (8, "روابط الشركاء بالفعاليات", _create_partner_events),
+    (9, "فهارس صفحات الشركاء", _create_partner_page_indexes),
+    (10, "بصمات المحتوى في حالة المزامنة", _add_sync_hashes),
+    (11, "فهارس التقارير الدورية", _create_period_indexes),
+    (12, "أرشيف التقارير المضغوط بلا تكرار", _create_report_archive),
+    (13, "حذف فهرس الحالة والأولوية المكرر", _drop_status_priority_index),
+    (14, "فهرس بحث بلا نسخة من النصوص", _create_contentless_search),
+    (15, "حساب الروابط الآلية للبيانات الحالية", _create_auto_links),
+]
+
+
+def schema_version(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )''')
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def migrate(conn):
+    """تطبيق خطوات الترحيل غير المطبقة، كل خطوة داخل معاملة مستقلة"""
+    current = schema_version(conn)
+    for version, description, step in MIGRATIONS:
+        if version <= current:
+            continue
+        # BEGIN IMMEDIATE يمنع عمليتين من تطبيق نفس الخطوة في الوقت ذاته
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,)).fetchone():
+                conn.rollback()
+                continue
+            step(conn)
+            conn.execute("INSERT INTO schema_version (version, description) VALUES (?, ?)", (version, description))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return schema_version(conn)
+
 
 def get_connection():
-    init_db() # التأكد من وجود الجداول في كل مرة
-    return sqlite3.connect(DB_PATH, timeout=20)
+    """جلب اتصال جاهز من المجمع (أو فتح اتصال جديد عند الحاجة)"""
+    init_db()
+    try:
+        return _pool.get_nowait()
+    except queue.Empty:
+        return _open_connection()
+
+
+def release_connection(conn):
+    # إلغاء أي معاملة معلقة حتى لا تنتقل إلى المستخدم التالي للاتصال
+    if conn.in_transaction:
+        conn.rollback()
+    # اتصال من صنف سابق (قبل set_connection_factory) لا يعود إلى المجمع
+    if type(conn) is not _connection_factory:
+        conn.close_for_real()
+        return
+    try:
+        _pool.put_nowait(conn)
+    except queue.Full:
+        conn.close_for_real()
+
+
+@contextmanager
+def connection(*changed_tables):
+    """مدير سياق: يحفظ التغييرات عند النجاح ويتراجع عنها عند الخطأ ثم يعيد الاتصال للمجمع
+
+    الجداول الممررة (إن وجدت) يُرفع جيلها بعد الحفظ الناجح لإبطال النسخ المخزنة منها،
+    لذا يجب تمرير كل جدول بيانات يعدّله الاتصال.
+    """
+    # الحفظ الخارجي السابق يُسجل الآن، قبل أن يخفيه رقم الإصدار الذي يسجله mark_changed بعد الحفظ
+    check_external_changes()
+    conn = get_connection()
+    before = conn.total_changes
+    try:
+        yield conn
+        conn.commit()
+        wrote = conn.total_changes != before
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        release_connection(conn)
+    # حتى الكتابات في جداول داخلية (كسجل المزامنة) يجب ألا تُحسب تعديلاً خارجياً
+    if changed_tables or wrote:
+        mark_changed(*changed_tables)
+
+
+def apply_changes(table, updates=(), inserts=(), deletes=()):
+    """تطبيق فروقات التحرير على جدول في معاملة واحدة
+
+    updates: أزواج (id, {العمود: القيمة}) للأعمدة التي تغيرت فقط.
+    inserts: قواميس {العمود: القيمة} للصفوف الجديدة.
+    deletes: معرفات الصفوف المحذوفة.
+    الصفوف التي تغيرت فيها نفس الأعمدة تُجمع في جملة executemany واحدة.
+    """
+    update_groups = {}
+    for row_id, values in updates:
+        cols = tuple(sorted(values))
+        update_groups.setdefault(cols, []).append(tuple(values[c] for c in cols) + (row_id,))
+    insert_groups = {}
+    for values in inserts:
+        cols = tuple(sorted(values))
+        insert_groups.setdefault(cols, []).append(tuple(values[c] for c in cols))
+
+    with connection(table) as conn:
+        for cols, params in update_groups.items():
+            assignments = ", ".join(f"{c}=?" for c in cols)
+            conn.executemany(f"UPDATE {table} SET {assignments} WHERE id=?", params)
+        for cols, params in insert_groups.items():
+            marks = ",".join("?" * len(cols))
+            conn.executemany(f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({marks})", params)
+        _delete_ids(conn, table, deletes)
+    return len(updates) + len(inserts) + len(deletes)
+
+
+# عدد المعرفات في جملة DELETE واحدة (أقل من حد متغيرات SQLite القديم وهو 999)
+DELETE_CHUNK = 500
+
+
+def _delete_ids(conn, table, ids):
+    deleted = 0
+    for i in range(0, len(ids), DELETE_CHUNK):
+        chunk = ids[i:i + DELETE_CHUNK]
+        marks = ",".join("?" * len(chunk))
+        deleted += conn.execute(f"DELETE FROM {table} WHERE id IN ({marks})", chunk).rowcount
+    return deleted
+
+
+def delete_rows(table, ids):
+    """حذف مجموعة صفوف بمعرفاتها في معاملة واحدة وبمتغيرات مربوطة
+
+    القيم الفارغة (NaN/None) تُتجاهل. يُرفع جيل الجدول مرة واحدة بعد الحذف،
+    فيكفي أن يطلب المستدعي مزامنة واحدة بعده. تعيد عدد الصفوف المحذوفة.
+    """
+    clean = sorted({int(i) for i in ids if i is not None and i == i})
+    if not clean:
+        return 0
+    with connection(table) as conn:
+        return _delete_ids(conn, table, clean)
+
+
+def rebuild_stats():
+    """إعادة حساب ملخص الإحصائيات من الجداول مباشرة (بعد الاستيراد الجماعي أو السحب من السحابة)"""
+    with connection(*STATS_COUNTERS) as conn:
+        _rebuild_stats(conn)
+
+
+def _data_version():
+    # PRAGMA data_version يتغير عند أي حفظ من اتصال آخر (بما فيها العمليات الخارجية)
+    global _watch_conn
+    if _watch_conn is None:
+        init_db()
+        _watch_conn = sqlite3.connect(DB_PATH, timeout=20, check_same_thread=False)
+    return _watch_conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+def _bump_if_external():
+    # يُستدعى والقفل _gen_lock محجوز: أي حفظ لم يُسجل عبر mark_changed يرفع جيل جميع الجداول
+    global _seen_data_version
+    version = _data_version()
+    if _seen_data_version is not None and version != _seen_data_version:
+        for name in _generations:
+            _generations[name] += 1
+    _seen_data_version = version
+
+
+def check_external_changes():
+    """إبطال النسخ المخزنة إذا حفظ اتصال آخر (أو عملية خارجية) تغييرات منذ آخر فحص"""
+    with _gen_lock:
+        _bump_if_external()
+
+
+def mark_changed(*tables):
+    """رفع جيل الجداول المعدلة بعد الحفظ عبر التطبيق"""
+    global _seen_data_version
+    with _gen_lock:
+        for table in tables:
+            _generations[table] = _generations.get(table, 0) + 1
+        # التغيير الحالي معروف المصدر، فلا داعي لاعتباره تعديلاً خارجياً
+        # (الحفظ الخارجي قبله فُحص عند فتح الاتصال في connection)
+        _seen_data_version = _data_version()
+
+
+def generation(table):
+    """الجيل الحالي للجدول؛ أي حفظ لم يُسجل عبر mark_changed يرفع جيل جميع الجداول"""
+    with _gen_lock:
+        _generations.setdefault(table, 0)
+        _bump_if_external()
+        return _generations[table]
+
+
+def close_all():
+    """إغلاق جميع الاتصالات المحفوظة (مفيد عند تغيير مسار القاعدة أو إيقاف التطبيق)"""
+    while True:
+        try:
+            _pool.get_nowait().close_for_real()
+        except queue.Empty:
+            break
+    global _watch_conn
+    with _gen_lock:
+        if _watch_conn is not None:
+            _watch_conn.close()
+            _watch_conn = None
+
+
+def set_statement_trace(callback):
+    """تفعيل تتبع جمل SQL (callback يستقبل نص الجملة) أو إيقافه بتمرير None
+
+    تُغلق الاتصالات المحفوظة حتى تُفتح الاتصالات التالية بالإعداد الجديد.
+    """
+    global _statement_trace
+    _statement_trace = callback
+    close_all()
+
+
+def set_connection_factory(factory=None):
+    """استخدام صنف اتصال آخر (مشتق من PooledConnection) للاتصالات التالية، أو الافتراضي مع None"""
+    global _connection_factory
+    _connection_factory = factory or PooledConnection
+    close_all()
+
+
+def configure(path):
+    """تبديل ملف القاعدة أثناء التشغيل (أدوات القياس والاختبار)
+
+    تُغلق الاتصالات الحالية ويُعاد تطبيق الترحيل على الملف الجديد عند أول استخدام،
+    وترتفع أجيال كل الجداول فلا تُستخدم النسخ المخزنة من الملف السابق.
+    """
+    global DB_PATH, _initialized, _seen_data_version
+    close_all()
+    with _init_lock:
+        DB_PATH = path
+        _initialized = False
+    with _gen_lock:
+        _seen_data_version = None
+        for name in _generations:
+            _generations[name] += 1
+
 
 if __name__ == "__main__":
-    init_db()
-    print("Database initialized successfully.")
+    import sys
+    # python database.py rebuild-stats  لإعادة حساب ملخص الإحصائيات
+    if sys.argv[1:] == ["rebuild-stats"]:
+        rebuild_stats()
+        print("Stats summary rebuilt successfully.")
+    else:
+        init_db()
+        print("Database initialized successfully.")
@@ -0,0 +1,197 @@
+import csv
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from database import connection, read_source
+from query_cache import cached
+
+# عدد الصفوف المقروءة من المؤشر في كل دفعة، فلا يُحمّل الجدول كاملاً في الذاكرة
+EXPORT_CHUNK = 1000
+
+# الجداول القابلة للتصدير: الجدول -> (اسم الملف، عنوان الورقة، {العمود: العنوان} بترتيب الملف)
+EXPORTS = {
+    "parents": ("partners", "الشركاء", {
+        "id": "المعرف", "name": "الاسم", "participation_type": "النوع", "expertise": "الخبرة",
+        "interaction_level": "التفاعل", "phone": "الهاتف",
+    }),
+    "action_plan": ("action_plan", "الخطة", {
+        "id": "المعرف", "objective": "الهدف", "activity": "النشاط", "responsibility": "المسؤول",
+        "timeframe": "الزمن", "kpi": "KPI", "status": "الحالة", "priority": "الأولوية", "task_type": "نوع المهمة",
+    }),
+    "events": ("events", "الفعاليات", {
+        "id": "المعرف", "name": "الفعالية", "date": "التاريخ", "location": "المكان",
+        "attendees_count": "الحضور", "rating": "التقييم",
+    }),
+    "meetings": ("meetings", "اللقاءات", {
+        "id": "المعرف", "subject": "الموضوع", "date": "التاريخ", "attendees_count": "الحضور",
+        "summary": "الملخص", "ai_recommendations": "التوصيات",
+    }),
+    "reports": ("reports", "التقارير", {
+        "id": "المعرف", "report_date": "التاريخ", "report_content": "نص التقرير",
+    }),
+}
+
+# الصيغ: الصيغة -> (الاسم المعروض، نوع MIME)
+FORMATS = {
+    "csv": ("CSV", "text/csv"),
+    "xlsx": ("Excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "parquet": ("Parquet", "application/vnd.apache.parquet"),
+}
+
+
+def export_title(table):
+    return EXPORTS[table][1]
+
+
+def file_name(table, fmt):
+    return f"{EXPORTS[table][0]}.{fmt}"
+
+
+def _chunks(conn, table):
+    cur = conn.execute(f"SELECT {', '.join(EXPORTS[table][2])} FROM {read_source(table)} ORDER BY id")
+    while True:
+        rows = cur.fetchmany(EXPORT_CHUNK)
+        if not rows:
+            return
+        yield rows
+
+
+def _write_csv(out, conn, table):
+    # BOM في بداية الملف ليتعرف Excel على الترميز فتظهر الحروف العربية صحيحة
+    text = io.TextIOWrapper(out, encoding="utf-8-sig", newline="")
+    writer = csv.writer(text)
+    writer.writerow(EXPORTS[table][2].values())
+    for rows in _chunks(conn, table):
+        writer.writerows(rows)
+    text.flush()
+    text.detach()
+
+
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'),
+}
+
+# محارف تحكم لا يقبلها XML فتُحذف من النصوص
+_XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _column_letter(index):
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _xlsx_row(number, letters, values):
+    cells = []
+    for letter, value in zip(letters, values):
+        ref = f"{letter}{number}"
+        if value is None:
+            continue
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+        else:
+            text = escape(_XML_ILLEGAL.sub("", str(value)))
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row r="{number}">{"".join(cells)}</row>'
+
+
+def _write_xlsx(out, conn, table):
+    # ملف xlsx هو أرشيف zip من ملفات XML؛ الورقة تُكتب صفاً بصف دون مكتبة إضافية
+    _, title, columns = EXPORTS[table]
+    letters = [_column_letter(i) for i in range(len(columns))]
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, content in _XLSX_PARTS.items():
+            zf.writestr(name, content)
+        zf.writestr("xl/workbook.xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(title)}" sheetId="1" r:id="rId1"/></sheets></workbook>'))
+        with zf.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                '<sheetViews><sheetView rightToLeft="1" workbookViewId="0"/></sheetViews><sheetData>'
+                + _xlsx_row(1, letters, columns.values())).encode("utf-8"))
+            number = 1
+            for rows in _chunks(conn, table):
+                lines = []
+                for row in rows:
+                    number += 1
+                    lines.append(_xlsx_row(number, letters, row))
+                sheet.write("".join(lines).encode("utf-8"))
+            sheet.write(b"</sheetData></worksheet>")
+
+
+def _arrow_types(conn, table, columns):
+    # SQLite لا يفرض نوع العمود، فالعمود الرقمي المعلن يُصدّر رقماً فقط إذا كانت كل قيمه كذلك
+    import pyarrow as pa
+    declared = {row[1]: (row[2] or "").upper() for row in conn.execute(f"PRAGMA table_info({table})")}
+    numeric = [c for c in columns if "INT" in declared.get(c, "") or "REAL" in declared.get(c, "")]
+    types = {c: pa.string() for c in columns}
+    if numeric:
+        checks = ", ".join(f"SUM(typeof({c}) NOT IN ('integer', 'null')), SUM(typeof({c}) NOT IN ('integer', 'real', 'null'))"
+                           for c in numeric)
+        counts = conn.execute(f"SELECT {checks} FROM {table}").fetchone()
+        for i, c in enumerate(numeric):
+            if not counts[2 * i]:
+                types[c] = pa.int64()
+            elif not counts[2 * i + 1]:
+                types[c] = pa.float64()
+    return [types[c] for c in columns]
+
+
+def _write_parquet(out, conn, table):
+    # أسماء الأعمدة الأصلية (لا العناوين العربية) لأن الملف موجه لأدوات التحليل
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    columns = list(EXPORTS[table][2])
+    schema = pa.schema(list(zip(columns, _arrow_types(conn, table, columns))))
+    with pq.ParquetWriter(out, schema, compression="zstd") as writer:
+        for rows in _chunks(conn, table):
+            arrays = []
+            for field, values in zip(schema, zip(*rows)):
+                if field.type == pa.string():
+                    values = [None if v is None else str(v) for v in values]
+                arrays.append(pa.array(values, type=field.type))
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+
+
+_WRITERS = {"csv": _write_csv, "xlsx": _write_xlsx, "parquet": _write_parquet}
+
+
+def export_file(table, fmt):
+    """محتوى ملف التصدير (bytes) للجدول بالصيغة المطلوبة
+
+    يُبنى من المؤشر على دفعات داخل معاملة قراءة واحدة، ويُحفظ في الذاكرة المؤقتة حتى
+    تتغير بيانات الجدول، فالنقرات التالية تعيد نفس الملف دون قراءة القاعدة.
+    """
+    def build():
+        out = io.BytesIO()
+        with connection() as conn:
+            conn.execute("BEGIN")
+            _WRITERS[fmt](out, conn, table)
+        return out.getvalue()
+    return cached(("export", table, fmt), (table,), build)
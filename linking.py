@@ -0,0 +1,104 @@
+from collections import deque
+
+from arabic_text import normalize
+from database import connection
+from query_cache import cached
+
+
+class NameMatcher:
+    """مطابقة متعددة الأنماط (Aho-Corasick): تبحث عن كل الأسماء في النص بمرور واحد عليه
+
+    الأسماء والنصوص تُطبع بنفس normalize() المستخدمة في البحث، فلا يفرق الهمز أو التشكيل.
+    """
+
+    def __init__(self, patterns):
+        # patterns: {المفتاح: النص}؛ الأنماط الفارغة تُتجاهل حتى لا تطابق كل شيء
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [set()]
+        for key, text in patterns.items():
+            pattern = normalize(text).strip()
+            if pattern:
+                self._add(key, pattern)
+        self._build()
+
+    def _add(self, key, pattern):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(set())
+            state = nxt
+        self._out[state].add(key)
+
+    def _build(self):
+        # روابط الفشل بالعرض أولاً؛ كل حالة ترث مخرجات أطول لاحقة لها
+        todo = deque(self._goto[0].values())
+        while todo:
+            state = todo.popleft()
+            for ch, nxt in self._goto[state].items():
+                todo.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] |= self._out[self._fail[nxt]]
+
+    def find(self, text):
+        """مفاتيح كل الأنماط الموجودة في النص"""
+        found = set()
+        state = 0
+        for ch in normalize(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            found |= self._out[state]
+        return found
+
+
+def update_links(conn):
+    """إعادة حساب الروابط الآلية بين الشركاء والفعاليات (اسم الشريك ضمن اسم الفعالية) على conn
+
+    الروابط اليدوية تبقى كما هي. تعيد عدد الروابط الآلية.
+    """
+    matcher = NameMatcher(dict(conn.execute("SELECT id, name FROM parents")))
+    links = [(partner_id, event_id)
+             for event_id, name in conn.execute("SELECT id, name FROM events")
+             for partner_id in matcher.find(name)]
+    conn.execute("DELETE FROM partner_events WHERE source = 'auto'")
+    conn.executemany("INSERT OR IGNORE INTO partner_events (partner_id, event_id, source) VALUES (?, ?, 'auto')", links)
+    return len(links)
+
+
+def refresh_links():
+    """تحديث الروابط الآلية بعد كل كتابة في الشركاء أو الفعاليات (الحفظ والحذف والسحب)"""
+    with connection("partner_events") as conn:
+        return update_links(conn)
+
+
+def link_partner(partner_id, event_id):
+    """ربط يدوي لشريك بفعالية لا يظهر اسمه فيها"""
+    with connection("partner_events") as conn:
+        conn.execute("""INSERT INTO partner_events (partner_id, event_id, source) VALUES (?, ?, 'manual')
+                        ON CONFLICT(partner_id, event_id) DO UPDATE SET source = 'manual'""",
+                     (int(partner_id), int(event_id)))
+
+
+def partner_event_links():
+    """الفعاليات المرتبطة بكل شريك: {معرف الشريك: [أسماء الفعاليات]}
+
+    قراءة فقط؛ الروابط الآلية تُحدّث في مسارات الكتابة عبر refresh_links.
+    """
+    def load():
+        links = {}
+        with connection() as conn:
+            for partner_id, event_name in conn.execute("""SELECT pe.partner_id, e.name FROM partner_events pe
+                                                          JOIN events e ON e.id = pe.event_id
+                                                          ORDER BY pe.partner_id, e.id"""):
+                links.setdefault(partner_id, []).append(event_name)
+        return links
+    return cached(("partner_event_links",), ("parents", "events", "partner_events"), load)
@@ -0,0 +1,229 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import database
+
+# عدد عمليات إعادة التشغيل واستدعاءات المزامنة المحفوظة في الذاكرة
+MAX_RUNS = 20
+MAX_SYNC_CALLS = 100
+# حد الاستعلامات المسجلة في إعادة تشغيل واحدة (يُحسب الباقي دون تفاصيل)
+MAX_QUERIES_PER_RUN = 500
+
+_enabled = False
+_local = threading.local()
+_lock = threading.Lock()
+_runs = deque(maxlen=MAX_RUNS)
+_sync_calls = deque(maxlen=MAX_SYNC_CALLS)
+
+
+def _ms(started):
+    return round((time.perf_counter() - started) * 1000, 3)
+
+
+class _Run:
+    """قياسات إعادة تشغيل واحدة للصفحة: الاستعلامات والأقسام المؤقتة"""
+
+    def __init__(self, label):
+        self.label = label
+        self.started_at = time.strftime("%Y-%m-%d %H:%M:%S")
+        self.started = time.perf_counter()
+        self.total_ms = None
+        self.completed = False
+        self.queries = []
+        self.dropped = 0
+        self.sections = []
+
+    def add_query(self, entry):
+        if len(self.queries) < MAX_QUERIES_PER_RUN:
+            self.queries.append(entry)
+        else:
+            self.dropped += 1
+
+    def as_dict(self):
+        return {
+            "label": self.label,
+            "started_at": self.started_at,
+            "total_ms": self.total_ms,
+            "completed": self.completed,
+            "query_count": len(self.queries) + self.dropped,
+            "sql_ms": round(sum(q["ms"] for q in self.queries), 3),
+            "sections": list(self.sections),
+            "queries": list(self.queries),
+        }
+
+
+def _current_run():
+    return getattr(_local, "run", None)
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """مؤشر يسجل نص كل جملة وزمنها (التنفيذ والجلب) وعدد صفوفها في إعادة التشغيل الحالية"""
+
+    _entry = None
+
+    def _record(self, sql, started):
+        run = _current_run()
+        if run is None:
+            self._entry = None
+            return
+        rows = self.rowcount if self.rowcount > 0 else 0
+        self._entry = {"sql": " ".join(str(sql).split())[:500], "ms": _ms(started), "rows": rows}
+        run.add_query(self._entry)
+
+    def _fetched(self, started, rows):
+        if self._entry is not None:
+            self._entry["ms"] = round(self._entry["ms"] + _ms(started), 3)
+            self._entry["rows"] += rows
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._record(sql, started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._record(sql, started)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        row = super().__next__()
+        self._fetched(started, 1)
+        return row
+
+
+class ProfiledConnection(database.PooledConnection):
+    """اتصال المجمع أثناء القياس: كل الجمل تمر عبر ProfiledCursor (بما فيها pd.read_sql)"""
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def is_enabled():
+    return _enabled
+
+
+def enable(on=True):
+    """تشغيل القياس أو إيقافه لكل العملية؛ عند الإيقاف تعود الاتصالات العادية دون أي كلفة إضافية"""
+    global _enabled
+    if on == _enabled:
+        return
+    _enabled = on
+    database.set_connection_factory(ProfiledConnection if on else None)
+
+
+def begin_run(label=""):
+    """بداية إعادة تشغيل جديدة في هذا الخيط (تُغلق السابقة إن قطعها st.stop أو st.rerun)"""
+    end_run(completed=False)
+    _local.run = _Run(label) if _enabled else None
+
+
+def set_label(label):
+    run = _current_run()
+    if run is not None:
+        run.label = label
+
+
+def end_run(completed=True):
+    run = _current_run()
+    if run is None:
+        return
+    _local.run = None
+    run.total_ms = _ms(run.started)
+    run.completed = completed
+    with _lock:
+        _runs.append(run.as_dict())
+
+
+@contextmanager
+def section(name):
+    """توقيت قسم من الصفحة (تحميل بيانات، رسم، محرر، مزامنة) ضمن إعادة التشغيل الحالية"""
+    run = _current_run()
+    if run is None:
+        yield
+        return
+    started = time.perf_counter()
+    first_query = len(run.queries)
+    try:
+        yield
+    finally:
+        run.sections.append({"name": name, "ms": _ms(started), "queries": len(run.queries) - first_query})
+
+
+def record_sync(action, sheet, started, status, attempts=1):
+    """تسجيل زمن طلب مزامنة واحد إلى السكربت (من أي خيط، بما فيه عامل الخلفية)"""
+    if not _enabled:
+        return
+    with _lock:
+        _sync_calls.append({"at": time.strftime("%H:%M:%S"), "action": action, "sheet": sheet,
+                            "ms": _ms(started), "status": status, "attempts": attempts})
+
+
+def recent_runs(n=MAX_RUNS):
+    with _lock:
+        return list(_runs)[-n:][::-1]
+
+
+def slowest_queries(n=10):
+    """أبطأ الجمل في عمليات إعادة التشغيل المحفوظة، مجمعة حسب نص الجملة"""
+    stats = {}
+    for run in recent_runs():
+        for q in run["queries"]:
+            s = stats.setdefault(q["sql"], {"sql": q["sql"], "calls": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0})
+            s["calls"] += 1
+            s["total_ms"] += q["ms"]
+            s["max_ms"] = max(s["max_ms"], q["ms"])
+            s["rows"] += q["rows"]
+    ranked = sorted(stats.values(), key=lambda s: s["max_ms"], reverse=True)[:n]
+    for s in ranked:
+        s["total_ms"] = round(s["total_ms"], 3)
+    return ranked
+
+
+def sync_calls():
+    with _lock:
+        return list(_sync_calls)[::-1]
+
+
+def clear():
+    with _lock:
+        _runs.clear()
+        _sync_calls.clear()
+
+
+def export_json():
+    return json.dumps({"exported_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "runs": recent_runs(),
+                       "slowest_queries": slowest_queries(), "sync_calls": sync_calls()},
+                      ensure_ascii=False, indent=2)
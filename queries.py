@@ -0,0 +1,110 @@
+import pandas as pd
+
+from database import connection, STATS_COUNTERS
+from query_cache import cached
+
+# القيم المستخدمة في الخطة والشركاء
+STATUS_DONE = 'مكتمل'
+PRIORITY_HIGH = 'مرتفع'
+INTERACTION_HIGH = 'مرتفع'
+
+# المهام غير المكتملة تشمل أيضاً البنود التي لم تُحدد حالتها
+_URGENT = "priority = ? AND (status IS NULL OR status != ?)"
+
+
+def stats_summary():
+    """ملخص الإحصائيات كاملاً في قراءة واحدة: {"الجدول.المؤشر": {الفئة: القيمة}}"""
+    def load():
+        summary = {}
+        with connection() as conn:
+            for metric, bucket, value in conn.execute("SELECT metric, bucket, value FROM stats_summary WHERE value != 0"):
+                summary.setdefault(metric, {})[bucket] = value
+        return summary
+    return cached(("stats_summary",), tuple(STATS_COUNTERS), load)
+
+
+def stat(summary, metric, bucket=''):
+    return summary.get(metric, {}).get(bucket, 0)
+
+
+def dashboard_kpis():
+    """مؤشرات لوحة التحكم من جدول الملخص بدلاً من عدّ الجداول"""
+    summary = stats_summary()
+    partners = stat(summary, "parents.count")
+    high = stat(summary, "parents.interaction_level", INTERACTION_HIGH)
+    return {
+        "partners": partners,
+        "events": stat(summary, "events.count"),
+        "completed_goals": stat(summary, "action_plan.status", STATUS_DONE),
+        "high_interaction_pct": high / partners * 100 if partners else 0,
+        "urgent_total": stat(summary, "action_plan.open_priority", PRIORITY_HIGH),
+    }
+
+
+def interaction_breakdown():
+    """عدد الشركاء لكل مستوى تفاعل (لرسم الدائرة دون تمرير كل الصفوف)"""
+    levels = {k: v for k, v in stats_summary().get("parents.interaction_level", {}).items() if k}
+    df = pd.DataFrame({"interaction_level": list(levels), "count": list(levels.values())})
+    return df.sort_values("count", ascending=False, ignore_index=True)
+
+
+def urgent_tasks(limit=20):
+    """المهام العاجلة غير المكتملة، الأقرب موعداً أولاً"""
+    def load():
+        with connection() as conn:
+            return pd.read_sql(f"""SELECT id, activity, timeframe, task_type FROM action_plan
+                                   WHERE {_URGENT} ORDER BY timeframe IS NULL, timeframe, id LIMIT ?""",
+                               conn, params=(PRIORITY_HIGH, STATUS_DONE, limit))
+    return cached(("urgent_tasks", limit), ("action_plan",), load)
+
+
+# ترتيب بطاقات الشركاء؛ المعرف في النهاية يجعل الترتيب ثابتاً بين الصفحات
+PARTNER_SORTS = {
+    "name": "name, id",
+    "newest": "id DESC",
+    "interaction_level": "interaction_level, name, id",
+}
+
+
+def _partner_filter(participation_type, interaction_level):
+    conditions, params = [], []
+    if participation_type:
+        conditions.append("participation_type = ?")
+        params.append(participation_type)
+    if interaction_level:
+        conditions.append("interaction_level = ?")
+        params.append(interaction_level)
+    return (f"WHERE {' AND '.join(conditions)}" if conditions else ""), params
+
+
+def partner_count(participation_type=None, interaction_level=None):
+    """عدد الشركاء المطابقين للفلاتر (COUNT فقط على فهارس الجدول)"""
+    where, params = _partner_filter(participation_type, interaction_level)
+
+    def load():
+        with connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM parents {where}", params).fetchone()[0]
+    return cached(("partner_count", participation_type, interaction_level), ("parents",), load)
+
+
+def partner_page(page=1, page_size=20, participation_type=None, interaction_level=None, sort="name"):
+    """صفحة واحدة من الشركاء مع الفلاتر (DataFrame)؛ العدد الكلي من partner_count
+
+    تكلفة الاستعلام تتبع حجم الصفحة لا عدد الشركاء الكلي (LIMIT/OFFSET على فهارس الجدول).
+    """
+    where, params = _partner_filter(participation_type, interaction_level)
+    order = PARTNER_SORTS[sort]
+
+    def load():
+        with connection() as conn:
+            return pd.read_sql(f"SELECT * FROM parents {where} ORDER BY {order} LIMIT ? OFFSET ?",
+                               conn, params=params + [page_size, (page - 1) * page_size])
+    key = ("partner_page", page, page_size, participation_type, interaction_level, sort)
+    return cached(key, ("parents",), load)
+
+
+def partner_filter_options():
+    """قيم الفلاتر المتاحة (أنواع المشاركة ومستويات التفاعل) من ملخص الإحصائيات"""
+    summary = stats_summary()
+    return (sorted(k for k in summary.get("parents.participation_type", {}) if k),
+            sorted(k for k in summary.get("parents.interaction_level", {}) if k))
@@ -0,0 +1,112 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from database import connection, generation, read_source
+
+# الحد الأقصى لحجم الذاكرة المخصصة للجداول المخزنة (بالميغابايت)
+MAX_CACHE_MB = int(os.environ.get('QUERY_CACHE_MB', 64))
+
+
+def _size_of(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """ذاكرة تخزين مشتركة بين جميع الجلسات، محدودة الحجم وتحذف الأقدم استخداماً أولاً"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, loader):
+        # المفتاح يتضمن جيل الجدول، لذا تصبح النسخة القديمة غير قابلة للوصول بعد أي كتابة
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        value = loader()
+        self._put(key, value)
+        return value
+
+    def _put(self, key, value):
+        size = _size_of(value)
+        with self._lock:
+            # حذف الأجيال السابقة لنفس المدخل فوراً بدلاً من انتظار إزاحتها
+            stale = [k for k in self._entries if k[:-1] == key[:-1] and k != key]
+            for k in stale:
+                self._drop(k)
+            if size > self.max_bytes:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        self._entries.pop(key)
+        self._bytes -= self._sizes.pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_cache = LRUCache(MAX_CACHE_MB * 1024 * 1024)
+
+
+def cached(key, tables, loader):
+    """تخزين نتيجة loader مرتبطة بأجيال الجداول التي تعتمد عليها"""
+    gens = tuple(generation(t) for t in tables)
+    return _cache.get_or_load(tuple(key) + (gens,), loader)
+
+
+def read_table(table):
+    """قراءة جدول كامل مع إعادة استخدام النسخة المخزنة ما لم تتغير بياناته"""
+    def load():
+        with connection() as conn:
+            return pd.read_sql(f"SELECT * FROM {read_source(table)}", conn)
+    # نُعيد نسخة لأن الصفحات تعدّل الأعمدة قبل العرض
+    return cached(("table", table), (table,), load).copy()
+
+
+def cache_stats():
+    return _cache.stats()
+
+
+def clear_cache():
+    _cache.clear()
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from database import connection, compact_reports, read_source
+from query_cache import cached
+
+# عدد التقارير في صفحة الأرشيف
+PAGE_SIZE = 10
+
+
+def save_report(text, report_date=None):
+    """أرشفة نص تقرير؛ النص المطابق لتقرير سابق يُخزن مرة واحدة ويشترك فيه السجلان"""
+    report_date = report_date or datetime.now().strftime("%Y-%m-%d %H:%M")
+    with connection("reports") as conn:
+        conn.execute("INSERT INTO reports (report_date, report_content) VALUES (?, ?)", (report_date, text))
+        # يُضغط معه أي تقرير كُتب نصاً عادياً من خارج التطبيق
+        compact_reports(conn)
+    return report_date
+
+
+def compact_archive():
+    """ضغط التقارير غير المضغوطة (بعد السحب من جوجل شيت مثلاً)"""
+    with connection("reports") as conn:
+        return compact_reports(conn)
+
+
+def _date_filter(date_from, date_to):
+    # report_date نص يبدأ بالتاريخ، فالمقارنة النصية على الفهرس تكفي (النهاية تشمل يومها كاملاً)
+    clauses, params = [], []
+    if date_from:
+        clauses.append("e.report_date >= ?")
+        params.append(date_from.isoformat())
+    if date_to:
+        clauses.append("e.report_date < ?")
+        params.append((date_to + timedelta(days=1)).isoformat())
+    return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def report_count(date_from=None, date_to=None):
+    where, params = _date_filter(date_from, date_to)
+
+    def load():
+        with connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM reports e {where}", params).fetchone()[0]
+    return cached(("report_count", date_from, date_to), ("reports",), load)
+
+
+def report_page(page=0, page_size=PAGE_SIZE, date_from=None, date_to=None):
+    """صفحة من الأرشيف، الأحدث أولاً: المعرف والتاريخ والعنوان والحجم دون نصوص التقارير"""
+    where, params = _date_filter(date_from, date_to)
+
+    def load():
+        with connection() as conn:
+            # التقارير التي لم تُضغط بعد يُحسب عنوانها وحجمها من نصها
+            return pd.read_sql(f"""SELECT e.id, e.report_date,
+                                          COALESCE(b.title, substr(e.report_content, 1, instr(e.report_content || char(10), char(10)) - 1)) AS title,
+                                          COALESCE(b.size, length(CAST(e.report_content AS BLOB))) AS size
+                                   FROM reports e LEFT JOIN report_bodies b ON b.id = e.body_id
+                                   {where} ORDER BY e.report_date DESC, e.id DESC LIMIT ? OFFSET ?""",
+                               conn, params=params + [page_size, page * page_size])
+    return cached(("report_page", page, page_size, date_from, date_to), ("reports",), load)
+
+
+def report_body(report_id):
+    """النص الكامل لتقرير واحد (يُفك ضغطه عند فتحه فقط)"""
+    def load():
+        with connection() as conn:
+            row = conn.execute(f"SELECT report_content FROM {read_source('reports')} WHERE id = ?", (report_id,)).fetchone()
+        return row[0] if row else None
+    return cached(("report_body", report_id), ("reports",), load)
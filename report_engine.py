@@ -0,0 +1,123 @@
+from datetime import date
+
+from database import connection
+from query_cache import cached
+from queries import STATUS_DONE
+
+# أنواع التقارير الدورية: المفتاح -> (الاسم المعروض، عدد الأشهر)
+PERIODS = {
+    "month": ("تقرير شهري", 1),
+    "quarter": ("تقرير فصلي", 3),
+    "year": ("تقرير سنوي", 12),
+}
+
+# مؤشرات التقرير بالترتيب الذي تُعرض به
+METRICS = {
+    "events": "الفعاليات المنفذة",
+    "attendees": "إجمالي الحضور",
+    "avg_rating": "متوسط تقييم الفعاليات",
+    "tasks_due": "بنود الخطة المستحقة",
+    "tasks_done": "البنود المكتملة",
+    "completion_rate": "نسبة الإنجاز %",
+    "meetings": "اللقاءات",
+    "meeting_attendees": "حضور اللقاءات",
+}
+
+
+def _add_months(d, months):
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def period_bounds(period, today=None):
+    """حدود الفترة الحالية والسابقة لها: (البداية، النهاية غير المشمولة، بداية الفترة السابقة)"""
+    months = PERIODS[period][1]
+    today = today or date.today()
+    # بداية الفترة: أول شهر في الربع أو السنة التي يقع فيها اليوم
+    start = date(today.year, (today.month - 1) // months * months + 1, 1)
+    return start, _add_months(start, months), _add_months(start, -months)
+
+
+def period_label(period, start):
+    if period == "month":
+        return start.strftime("%Y-%m")
+    if period == "quarter":
+        return f"الربع {(start.month - 1) // 3 + 1} من {start.year}"
+    return str(start.year)
+
+
+def _split(conn, sql, start, end, prev_start, **params):
+    # صف لكل فترة من مسح واحد للفهرس على النطاق [بداية السابقة، النهاية)
+    params.update(start=start.isoformat(), prev_start=prev_start.isoformat(), end=end.isoformat())
+    rows = {cur: values for cur, *values in conn.execute(sql, params)}
+    return rows.get(1), rows.get(0)
+
+
+def _metrics(events, tasks, meetings):
+    count, attendees, rating = events or (0, 0, None)
+    due, done = tasks or (0, 0)
+    met, met_attendees = meetings or (0, 0)
+    return {
+        "events": count,
+        "attendees": attendees or 0,
+        "avg_rating": round(rating, 2) if rating is not None else None,
+        "tasks_due": due,
+        "tasks_done": done or 0,
+        "completion_rate": round(done / due * 100, 1) if due else None,
+        "meetings": met,
+        "meeting_attendees": met_attendees or 0,
+    }
+
+
+def _change(current, previous):
+    # نسبة التغير عن الفترة السابقة (None إذا لم تكن هناك قيمة سابقة للمقارنة)
+    if current is None or not previous:
+        return None
+    return round((current - previous) / previous * 100, 1)
+
+
+def period_report(period, today=None):
+    """مؤشرات الفترة (شهر/فصل/سنة) التي يقع فيها today مقارنة بالفترة السابقة
+
+    ثلاثة استعلامات تجميع على فهارس التاريخ (الفعاليات، الخطة، اللقاءات)، والنتيجة محفوظة
+    لكل فترة حتى تتغير بيانات أحد الجداول الثلاثة.
+    """
+    start, end, prev_start = period_bounds(period, today)
+
+    def load():
+        with connection() as conn:
+            events = _split(conn, """SELECT date >= :start AS cur, COUNT(*), SUM(CAST(attendees_count AS INTEGER)), AVG(rating)
+                                     FROM events WHERE date >= :prev_start AND date < :end GROUP BY cur""", start, end, prev_start)
+            tasks = _split(conn, """SELECT timeframe >= :start AS cur, COUNT(*), SUM(status = :done)
+                                    FROM action_plan WHERE timeframe >= :prev_start AND timeframe < :end GROUP BY cur""",
+                           start, end, prev_start, done=STATUS_DONE)
+            meetings = _split(conn, """SELECT date >= :start AS cur, COUNT(*), SUM(CAST(attendees_count AS INTEGER))
+                                       FROM meetings WHERE date >= :prev_start AND date < :end GROUP BY cur""", start, end, prev_start)
+        current = _metrics(events[0], tasks[0], meetings[0])
+        previous = _metrics(events[1], tasks[1], meetings[1])
+        return {
+            "period": period,
+            "title": PERIODS[period][0],
+            "label": period_label(period, start),
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "previous_label": period_label(period, prev_start),
+            "current": current,
+            "previous": previous,
+            "change": {k: _change(current[k], previous[k]) for k in METRICS},
+        }
+    return cached(("period_report", period, start), ("events", "action_plan", "meetings"), load)
+
+
+def render_report(report):
+    """نص التقرير الدوري بصيغة الأرشيف"""
+    lines = [f"{report['title']}: مشرف تنمية العلاقات المجتمعية",
+             f"الفترة: {report['label']} ({report['start']} - {report['end']})",
+             "------------------------------------------"]
+    for key, name in METRICS.items():
+        value = report["current"][key]
+        change = report["change"][key]
+        trend = f" ({change:+.1f}% عن {report['previous_label']})" if change is not None else ""
+        lines.append(f"- {name}: {'—' if value is None else value}{trend}")
+    lines.append("------------------------------------------")
+    return "\n".join(lines)
@@ -0,0 +1,44 @@
+import pandas as pd
+
+from arabic_text import words
+from database import connection, read_source, SEARCH_KINDS, SEARCH_STRIDE
+
+# عناوين الأقسام في نتائج البحث الشامل
+SEARCH_LABELS = {
+    "parents": "الشركاء",
+    "action_plan": "الخطة",
+    "events": "الفعاليات",
+    "meetings": "اللقاءات",
+    "reports": "التقارير",
+}
+
+
+def build_match(query):
+    """تحويل نص المستخدم إلى استعلام FTS5 آمن: كل كلمة بادئة بين علامتي تنصيص"""
+    # الكلمات تُستخرج بعد التطبيع، فلا تصل رموز مثل * " - : ( إلى محرك FTS كعوامل
+    return " ".join(f'"{w}"*' for w in words(query))
+
+
+def search(query, limit=50):
+    """البحث في جميع الجداول عبر الفهرس؛ تعيد {عنوان القسم: DataFrame} مرتبة حسب الصلة"""
+    match = build_match(query)
+    if not match:
+        return {}
+
+    with connection() as conn:
+        hits = conn.execute(
+            "SELECT rowid FROM search_index WHERE search_index MATCH ? ORDER BY bm25(search_index, 2.0, 1.0) LIMIT ?",
+            (match, limit)).fetchall()
+
+        by_kind = {}
+        for (rowid,) in hits:
+            by_kind.setdefault(SEARCH_KINDS[rowid % SEARCH_STRIDE], []).append(rowid // SEARCH_STRIDE)
+
+        results = {}
+        for kind, ids in by_kind.items():
+            marks = ",".join("?" * len(ids))
+            df = pd.read_sql(f"SELECT * FROM {read_source(kind)} WHERE id IN ({marks})", conn, params=ids)
+            # إعادة الترتيب حسب الصلة كما أعادها الفهرس
+            rank = {row_id: i for i, row_id in enumerate(ids)}
+            results[SEARCH_LABELS[kind]] = df.sort_values("id", key=lambda s: s.map(rank)).reset_index(drop=True)
+    return results
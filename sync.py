@@ -0,0 +1,579 @@
+import base64
+import gzip
+import hashlib
+import itertools
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import profiler
+from database import connection, mark_changed, read_source
+
+# عمود المعرف في جوجل شيت؛ يربط كل صف في الورقة بالصف المحلي المقابل
+ID_COLUMN = "المعرف"
+
+# ربط كل جدول محلي بورقته وأعمدته (بالترتيب الذي يظهر في الورقة)
+SHEETS = {
+    "action_plan": ("ActionPlan", {
+        "objective": "الهدف", "activity": "النشاط", "responsibility": "المسؤول",
+        "timeframe": "الزمن", "kpi": "KPI", "priority": "الأولوية",
+        "task_type": "نوع المهمة", "status": "الحالة"
+    }),
+    "parents": ("Parents", {
+        "name": "الاسم", "participation_type": "النوع",
+        "expertise": "الخبرة", "interaction_level": "التفاعل",
+        "phone": "الهاتف"
+    }),
+    "events": ("Events", {
+        "name": "الفعالية", "date": "التاريخ",
+        "location": "المكان", "attendees_count": "الحضور"
+    }),
+    "reports": ("Reports", {
+        "report_date": "التاريخ", "report_content": "نص التقرير"
+    }),
+}
+
+# عدد المعرفات في استعلام IN واحد (أقل من حد متغيرات SQLite)
+ID_CHUNK = 500
+
+# أقصى حجم (بالبايت، قبل الضغط) لصفوف الطلب الواحد؛ الجداول الأكبر تُرفع على دفعات
+MAX_CHUNK_BYTES = 512 * 1024
+
+# يصبح False إذا تبين أن السكربت المنشور قديم ولا يفهم صيغة delta
+_delta_supported = True
+
+# إعدادات عامل الخلفية (بالثواني): فترة الفحص وحدود التراجع الأسي عند الفشل
+POLL_INTERVAL = 5
+RETRY_BASE = 2
+RETRY_MAX = 300
+
+# إعدادات طلبات HTTP: مهلة كل طلب، وإعادة المحاولة للأخطاء العابرة، وعدد الجداول المرفوعة معاً
+REQUEST_TIMEOUT = 15
+POST_RETRIES = 3
+POST_BACKOFF = 0.5
+TRANSIENT_STATUS = (429, 500, 502, 503, 504)
+PUSH_WORKERS = 4
+
+# جلسة HTTP مشتركة تعيد استخدام الاتصالات (keep-alive) بدلاً من فتح اتصال TLS لكل طلب
+_session = None
+_session_lock = threading.Lock()
+
+# قفل لكل جدول حتى لا يُرفع نفس الجدول من خيطين في الوقت ذاته
+_table_locks = {table: threading.Lock() for table in SHEETS}
+_worker = None
+_worker_lock = threading.Lock()
+_wake = threading.Event()
+
+
+def sheet_columns(table):
+    sheet_name, mapping = SHEETS[table]
+    return sheet_name, [ID_COLUMN] + list(mapping.values())
+
+
+def _format_value(value):
+    # جوجل شيت يستقبل النصوص فقط؛ القيم الفارغة تصبح خلايا فارغة
+    if value is None or value == 'NaT':
+        return ""
+    return str(value)
+
+
+def _iter_rows(conn, table, where="", params=()):
+    # الصفوف تُقرأ من المؤشر عند الحاجة دون تحميل الجدول كاملاً في الذاكرة
+    _, mapping = SHEETS[table]
+    cols = ", ".join(["id"] + list(mapping))
+    for row in conn.execute(f"SELECT {cols} FROM {read_source(table)} {where} ORDER BY id", params):
+        yield [_format_value(v) for v in row]
+
+
+def chunk_rows(rows, max_bytes=None):
+    """تقسيم الصفوف إلى دفعات لا يتجاوز حجمها (JSON) الحد؛ تعيد دفعة واحدة على الأقل ولو فارغة"""
+    max_bytes = max_bytes or MAX_CHUNK_BYTES
+    chunk, size = [], 0
+    for row in rows:
+        row_size = len(json.dumps(row, ensure_ascii=False).encode("utf-8")) + 1
+        if chunk and size + row_size > max_bytes:
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(row)
+        size += row_size
+    yield chunk
+
+
+def encode_rows(rows):
+    """ضغط الدفعة بـ gzip ثم base64 لتمر داخل JSON (Apps Script يقرأ جسم الطلب نصاً)"""
+    data = gzip.compress(json.dumps(rows, ensure_ascii=False).encode("utf-8"))
+    return base64.b64encode(data).decode("ascii")
+
+
+def rows_hash(rows):
+    """بصمة متدحرجة (SHA-1) لصفوف مرتبة دون جمعها في الذاكرة"""
+    h = hashlib.sha1()
+    for row in rows:
+        h.update("\x1f".join(row).encode("utf-8"))
+        h.update(b"\x1e")
+    return h.hexdigest()
+
+
+def _sync_state(conn, table, direction):
+    # تعيد (content_hash, source_modified) لآخر مزامنة ناجحة، أو (None, None)
+    row = conn.execute("SELECT content_hash, source_modified FROM sync_state WHERE table_name = ? AND direction = ?",
+                       (table, direction)).fetchone()
+    return row or (None, None)
+
+
+def _last_change_id(conn, table):
+    return conn.execute("SELECT COALESCE(MAX(id), 0) FROM sync_changes WHERE table_name = ?", (table,)).fetchone()[0]
+
+
+def _has_baseline(conn, table):
+    return conn.execute("SELECT 1 FROM sync_state WHERE table_name = ? AND direction = 'push' AND synced_at IS NOT NULL",
+                        (table,)).fetchone() is not None
+
+
+def full_payloads(conn, table):
+    """الجدول كاملاً: طلب update واحد إذا كان صغيراً، وإلا begin ثم دفعات append مضغوطة ثم commit
+
+    السكربت يجمع الدفعات في ورقة مؤقتة ولا يستبدل الورقة الأصلية إلا عند commit.
+    """
+    sheet_name, columns = sheet_columns(table)
+    chunks = chunk_rows(_iter_rows(conn, table))
+    first = next(chunks)
+    second = next(chunks, None)
+    if second is None:
+        yield {"action": "update", "sheetName": sheet_name, "columns": columns, "rows": first}
+        return
+
+    upload_id = uuid.uuid4().hex
+    yield {"action": "begin", "sheetName": sheet_name, "columns": columns, "uploadId": upload_id}
+    total = 0
+    for seq, chunk in enumerate(itertools.chain((first, second), chunks)):
+        total += len(chunk)
+        yield {"action": "append", "sheetName": sheet_name, "uploadId": upload_id, "seq": seq,
+               "encoding": "gzip", "rows": encode_rows(chunk)}
+    yield {"action": "commit", "sheetName": sheet_name, "uploadId": upload_id, "rowCount": total}
+
+
+def delta_payloads(conn, table, up_to):
+    """الصفوف المضافة/المعدلة والمحذوفة منذ آخر رفع، مع دمج التغييرات المتكررة لنفس الصف
+
+    التعديلات الكثيرة تُرسل في عدة طلبات delta (كل منها مستقل)، والحذف في الطلب الأخير.
+    """
+    ops = {}
+    for row_id, op in conn.execute(
+            "SELECT row_id, op FROM sync_changes WHERE table_name = ? AND id <= ? ORDER BY id", (table, up_to)):
+        ops[row_id] = op
+    if not ops:
+        return
+
+    upsert_ids = [rid for rid, op in ops.items() if op == "upsert"]
+    found = set()
+
+    def upserts():
+        for i in range(0, len(upsert_ids), ID_CHUNK):
+            chunk = upsert_ids[i:i + ID_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            for row in _iter_rows(conn, table, f"WHERE id IN ({marks})", chunk):
+                found.add(int(row[0]))
+                yield row
+
+    sheet_name, columns = sheet_columns(table)
+
+    def payload(rows, deletes):
+        return {"action": "delta", "sheetName": sheet_name, "columns": columns,
+                "idColumn": ID_COLUMN, "upserts": rows, "deletes": deletes}
+
+    previous = None
+    for chunk in chunk_rows(upserts()):
+        if previous is not None:
+            yield payload(previous, [])
+        previous = chunk
+    # صف عُدّل ثم حُذف قبل الرفع لن يظهر في الاستعلام، فنعامله كمحذوف
+    deletes = [str(rid) for rid, op in ops.items() if op == "delete" or (op == "upsert" and rid not in found)]
+    yield payload(previous, deletes)
+
+
+def mark_pushed(table, up_to, content_hash=None):
+    with connection() as conn:
+        conn.execute("DELETE FROM sync_changes WHERE table_name = ? AND id <= ?", (table, up_to))
+        conn.execute("""INSERT INTO sync_state (table_name, direction, synced_at, content_hash)
+                        VALUES (?, 'push', CURRENT_TIMESTAMP, ?)
+                        ON CONFLICT(table_name, direction) DO UPDATE SET
+                            synced_at = excluded.synced_at, content_hash = excluded.content_hash""",
+                     (table, content_hash))
+
+
+def reset_tracking(conn, table):
+    """إلغاء خط الأساس بعد استبدال الجدول من خارج التطبيق، فيكون الرفع التالي كاملاً"""
+    conn.execute("DELETE FROM sync_changes WHERE table_name = ?", (table,))
+    conn.execute("DELETE FROM sync_state WHERE table_name = ? AND direction = 'push'", (table,))
+
+
+def _accepted(response, payload):
+    global _delta_supported
+    if response.status_code != 200:
+        return False
+    # صيغ delta والرفع المجزأ تتطلب السكربت المرجعي (apps_script/Code.gs) الذي يرد بـ {"ok": true}
+    if payload["action"] != "update":
+        try:
+            return response.json().get("ok") is True
+        except ValueError:
+            if payload["action"] == "delta":
+                _delta_supported = False
+            return False
+    return True
+
+
+def _get_session():
+    # requests يُستورد مع أول طلب فقط، فلا يبطئ بدء التطبيق
+    import requests
+
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=PUSH_WORKERS)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def post(script_url, payload):
+    """إرسال حمولة إلى السكربت مع إعادة المحاولة للأخطاء العابرة (انقطاع، مهلة، 429، 5xx)
+
+    الانتظار بين المحاولات يتضاعف مع تذبذب عشوائي. تعيد آخر استجابة أو ترفع آخر استثناء.
+    """
+    import requests
+
+    started = time.perf_counter()
+    for attempt in range(POST_RETRIES + 1):
+        try:
+            response = _get_session().post(script_url, json=payload, timeout=REQUEST_TIMEOUT)
+            if response.status_code not in TRANSIENT_STATUS or attempt == POST_RETRIES:
+                profiler.record_sync(payload.get("action"), payload.get("sheetName"), started, response.status_code, attempt + 1)
+                return response
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == POST_RETRIES:
+                profiler.record_sync(payload.get("action"), payload.get("sheetName"), started, type(e).__name__, attempt + 1)
+                raise
+        time.sleep(POST_BACKOFF * 2 ** attempt * random.uniform(0.8, 1.2))
+
+
+def _send_all(script_url, payloads):
+    # تعيد "ok" أو "rejected" (رد السكربت برفض الصيغة) أو "failed" (شبكة أو خطأ خادم)
+    for payload in payloads:
+        try:
+            response = post(script_url, payload)
+        except Exception:
+            return "failed"
+        if not _accepted(response, payload):
+            return "rejected" if response.status_code == 200 else "failed"
+    return "ok"
+
+
+def push_table(script_url, table, full=False, force=False):
+    """رفع تغييرات جدول واحد إلى جوجل شيت عبر Apps Script
+
+    الرفع كامل في أول مرة أو عند الطلب، وجزئي (delta) فيما عدا ذلك. لا يُرسل شيء إذا لم
+    يُسجل أي تغيير منذ آخر رفع، أو إذا طابقت بصمة الجدول بصمة آخر رفع كامل (ما لم يُطلب force).
+    البصمة تمر على الجدول كاملاً، فتُحسب في الرفع الكامل فقط؛ الرفع الجزئي يفرغها ليعاد حسابها.
+    """
+    if not script_url or table not in SHEETS:
+        return False
+
+    with _table_locks[table]:
+        with connection() as conn:
+            # تفعيل التتبع قبل قراءة الجدول حتى لا تضيع أي كتابة تحدث أثناء الرفع الأول
+            conn.execute("INSERT OR IGNORE INTO sync_state (table_name, direction, synced_at) VALUES (?, 'push', NULL)", (table,))
+            conn.commit()
+            # السجل والصفوف تُقرأ داخل معاملة واحدة (لقطة متسقة) أثناء إرسال الدفعات
+            conn.execute("BEGIN")
+            up_to = _last_change_id(conn, table)
+            baseline = _has_baseline(conn, table)
+            use_delta = not full and _delta_supported and baseline
+            content_hash = None
+            if use_delta and not up_to and not force:
+                # التتبع يعمل منذ آخر رفع ولم يُسجل أي تغيير: لا حاجة للشبكة ولا لقراءة الجدول
+                status = "ok"
+                content_hash = _sync_state(conn, table, "push")[0]
+            elif use_delta:
+                status = _send_all(script_url, delta_payloads(conn, table, up_to))
+            else:
+                content_hash = rows_hash(_iter_rows(conn, table))
+                if not force and baseline and content_hash == _sync_state(conn, table, "push")[0]:
+                    # لا فرق عن آخر رفع (حتى لو عُدل صف ثم أُعيد كما كان)
+                    status = "ok"
+                else:
+                    status = _send_all(script_url, full_payloads(conn, table))
+        if status == "ok":
+            mark_pushed(table, up_to, content_hash)
+            return True
+    # رفض الصيغة الجزئية (مثلاً ورقة بلا عمود معرف) يعني أن الورقة تحتاج رفعاً كاملاً
+    if use_delta and status == "rejected":
+        return push_table(script_url, table, full=True, force=True)
+    return False
+
+
+def push_all(script_url, tables, full=False, workers=PUSH_WORKERS):
+    """رفع عدة جداول بالتوازي على عدد محدود من الخيوط
+
+    تعيد {الجدول: {"ok": نجح الرفع؟, "seconds": زمن الرفع}} بترتيب الجداول الممررة.
+    """
+    def push(table):
+        started = time.perf_counter()
+        try:
+            ok = push_table(script_url, table, full=full)
+        except Exception:
+            ok = False
+        return {"ok": ok, "seconds": time.perf_counter() - started}
+    tables = list(tables)
+    if not tables:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(workers, len(tables))) as pool:
+        return dict(zip(tables, pool.map(push, tables)))
+
+
+# --- طابور المزامنة في الخلفية ---
+def enqueue(table, full=False):
+    """تسجيل طلب رفع في الطابور الدائم والعودة فوراً؛ عامل الخلفية يتولى الإرسال"""
+    with connection() as conn:
+        conn.execute("INSERT INTO sync_outbox (table_name, full) VALUES (?, ?)", (table, int(full)))
+    _wake.set()
+
+
+def _due_tables(now):
+    # كل الطلبات المعلقة لنفس الجدول تُدمج في رفع واحد
+    with connection() as conn:
+        return conn.execute("""SELECT table_name, MAX(id), MAX(full), MAX(attempts) FROM sync_outbox
+                               GROUP BY table_name HAVING MAX(next_attempt_at) <= ?""", (now,)).fetchall()
+
+
+def drain_once(script_url):
+    """رفع الجداول المستحقة مرة واحدة؛ تعيد عدد الجداول التي نجح رفعها"""
+    pushed = 0
+    now = time.time()
+    for table, last_id, full, attempts in _due_tables(now):
+        ok = push_table(script_url, table, full=bool(full))
+        with connection() as conn:
+            if ok:
+                conn.execute("DELETE FROM sync_outbox WHERE table_name = ? AND id <= ?", (table, last_id))
+                pushed += 1
+            else:
+                # تراجع أسي مع تذبذب عشوائي حتى لا تتزامن المحاولات بعد انقطاع الشبكة
+                delay = min(RETRY_MAX, RETRY_BASE * 2 ** attempts) * random.uniform(0.8, 1.2)
+                conn.execute("""UPDATE sync_outbox SET attempts = attempts + 1, next_attempt_at = ?, last_error = ?
+                                WHERE table_name = ? AND id <= ?""",
+                             (now + delay, f"فشل رفع {table}", table, last_id))
+    return pushed
+
+
+def _run_worker(script_url):
+    while True:
+        _wake.clear()
+        try:
+            drain_once(script_url)
+        except Exception:
+            # لا يجوز أن يتوقف العامل بسبب خطأ عابر في القاعدة أو الشبكة
+            pass
+        _wake.wait(POLL_INTERVAL)
+
+
+def start_worker(script_url):
+    """تشغيل عامل الخلفية مرة واحدة لكل عملية (آمن للاستدعاء في كل إعادة تشغيل للصفحة)"""
+    global _worker
+    if not script_url:
+        return
+    with _worker_lock:
+        if _worker is not None and _worker.is_alive():
+            return
+        _worker = threading.Thread(target=_run_worker, args=(script_url,), name="sync-outbox", daemon=True)
+        _worker.start()
+
+
+def outbox_status():
+    """عدد الطلبات المعلقة ووقت آخر رفع ناجح وآخر خطأ، لعرضها في القائمة الجانبية"""
+    with connection() as conn:
+        depth = conn.execute("SELECT COUNT(*) FROM sync_outbox").fetchone()[0]
+        last_success = conn.execute("SELECT MAX(synced_at) FROM sync_state WHERE direction = 'push'").fetchone()[0]
+        last_error = conn.execute(
+            "SELECT last_error FROM sync_outbox WHERE last_error IS NOT NULL ORDER BY id DESC LIMIT 1").fetchone()
+    return {
+        "depth": depth,
+        "last_success": last_success,
+        "last_error": last_error[0] if last_error else None,
+    }
+
+
+# --- السحب من جوجل شيت ---
+def _cell(value):
+    # توحيد القيم قبل المقارنة: الخلايا الفارغة و NaN نص فارغ، و 12.0 القادمة من الورقة تصبح 12
+    if value is None or value == 'NaT' or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def _row_hash(values):
+    return hashlib.sha1("\x1f".join(values).encode("utf-8")).hexdigest()
+
+
+def _sheet_id(value):
+    try:
+        row_id = int(float(value))
+    except (TypeError, ValueError):
+        return None
+    return row_id if row_id > 0 else None
+
+
+def fetch_sheets(reader, tables):
+    """قراءة أوراق الجداول بالتوازي؛ تعيد {الجدول: DataFrame أو الاستثناء الذي حدث}"""
+    def fetch(table):
+        try:
+            return reader(SHEETS[table][0])
+        except Exception as e:
+            return e
+    if not tables:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(tables)) as pool:
+        return dict(zip(tables, pool.map(fetch, tables)))
+
+
+def _mark_pulled(conn, table, content_hash, modified):
+    conn.execute("""INSERT INTO sync_state (table_name, direction, synced_at, content_hash, source_modified)
+                    VALUES (?, 'pull', CURRENT_TIMESTAMP, ?, ?)
+                    ON CONFLICT(table_name, direction) DO UPDATE SET synced_at = excluded.synced_at,
+                        content_hash = excluded.content_hash, source_modified = excluded.source_modified""",
+                 (table, content_hash, modified))
+
+
+def pull_table(table, sheet_df, modified=None):
+    """دمج محتوى الورقة في الجدول المحلي داخل معاملة واحدة دون حذف الجدول كاملاً
+
+    الصفوف تُطابق بعمود المعرف، والصفوف بلا معرف (أو الأوراق القديمة بلا عمود معرف)
+    تُطابق بمحتواها. لا يُكتب إلا الصف الذي تغيرت بصمته، والصفوف التي عُدلت محلياً
+    ولم تُرفع بعد لا تُستبدل ولا تُحذف. إذا طابقت بصمة الورقة بصمة آخر سحب لا يُكتب شيء.
+    تعيد {"inserted", "updated", "deleted"}.
+    """
+    _, mapping = SHEETS[table]
+    columns = list(mapping)
+    sheet_df = sheet_df.dropna(how='all')
+    has_ids = ID_COLUMN in sheet_df.columns
+    present = [c for c in columns if mapping[c] in sheet_df.columns]
+
+    incoming = []
+    for record in sheet_df.to_dict("records"):
+        values = [_cell(record.get(mapping[c])) for c in present]
+        if not any(values):
+            continue
+        row_id = _sheet_id(record.get(ID_COLUMN)) if has_ids else None
+        incoming.append((row_id, values))
+
+    counts = {"inserted": 0, "updated": 0, "deleted": 0}
+    # ورقة بلا صفوف بيانات لا تُفرغ الجدول المحلي (حماية من قراءة فاشلة أو ورقة ممسوحة)
+    if not incoming:
+        return counts
+    sheet_hash = rows_hash([present] + [[str(row_id or "")] + values for row_id, values in incoming])
+    with connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        # الجدول المحلي الفارغ يُملأ دائماً حتى لو لم تتغير الورقة
+        if (_sync_state(conn, table, "pull")[0] == sheet_hash
+                and conn.execute(f"SELECT EXISTS (SELECT 1 FROM {table})").fetchone()[0]):
+            _mark_pulled(conn, table, sheet_hash, modified)
+            return counts
+        local = {row[0]: [_cell(v) for v in row[1:]]
+                 for row in conn.execute(f"SELECT id, {', '.join(present)} FROM {read_source(table)}")} if present else {}
+        pending = {row_id for (row_id,) in conn.execute(
+            "SELECT DISTINCT row_id FROM sync_changes WHERE table_name = ?", (table,))}
+        last_change = _last_change_id(conn, table)
+
+        # الصفوف المحلية التي لم تُطابق بمعرف تبقى متاحة للمطابقة بالمحتوى
+        sheet_ids = {rid for rid, _ in incoming if rid is not None}
+        unmatched = {}
+        for row_id, values in local.items():
+            if row_id not in sheet_ids:
+                unmatched.setdefault(_row_hash(values), []).append(row_id)
+
+        updates, inserts = [], []
+        matched = set()
+        for row_id, values in incoming:
+            if row_id in matched:
+                # معرف مكرر في الورقة: يُضاف الصف بمعرف جديد
+                row_id = None
+            if row_id is not None and row_id in local:
+                matched.add(row_id)
+                if row_id not in pending and _row_hash(local[row_id]) != _row_hash(values):
+                    updates.append(values + [row_id])
+            elif row_id is not None and row_id in pending:
+                # صف حُذف محلياً ولم يُرفع الحذف بعد
+                continue
+            elif row_id is None and unmatched.get(_row_hash(values)):
+                matched.add(unmatched[_row_hash(values)].pop())
+            else:
+                if row_id is not None:
+                    matched.add(row_id)
+                inserts.append((row_id, values))
+
+        deletes = [row_id for row_id in local if row_id not in matched and row_id not in pending]
+
+        def db_values(values):
+            return [v if v != "" else None for v in values]
+
+        if updates:
+            assignments = ", ".join(f"{c} = ?" for c in present)
+            conn.executemany(f"UPDATE {table} SET {assignments} WHERE id = ?",
+                             [db_values(v[:-1]) + [v[-1]] for v in updates])
+        if inserts:
+            marks = ", ".join("?" * (len(present) + 1))
+            conn.executemany(f"INSERT INTO {table} (id, {', '.join(present)}) VALUES ({marks})",
+                             [[row_id] + db_values(values) for row_id, values in inserts])
+        for i in range(0, len(deletes), ID_CHUNK):
+            chunk = deletes[i:i + ID_CHUNK]
+            conn.execute(f"DELETE FROM {table} WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+
+        counts.update(inserted=len(inserts), updated=len(updates), deleted=len(deletes))
+        if has_ids and all(row_id is not None for row_id, _ in inserts):
+            # ما سُحب من الورقة موجود فيها أصلاً، فلا داعي لإعادة رفعه
+            conn.execute("DELETE FROM sync_changes WHERE table_name = ? AND id > ?", (table, last_change))
+        else:
+            # صفوف في الورقة بلا معرف: الرفع التالي يجب أن يكون كاملاً ليكتب المعرفات فيها
+            reset_tracking(conn, table)
+        _mark_pulled(conn, table, sheet_hash, modified)
+    if any(counts.values()):
+        mark_changed(table)
+    return counts
+
+
+def pull_all(reader, tables=None, modified=None):
+    """سحب عدة جداول: القراءة من الأوراق بالتوازي ثم الدمج في القاعدة جدولاً جدولاً
+
+    modified وقت آخر تعديل لملف جوجل شيت إن أمكن معرفته؛ الجداول التي سُحبت بعد
+    آخر تعديل لا تُقرأ من الشبكة أصلاً ما لم تكن فارغة محلياً.
+    تعيد {الجدول: عدادات التغيير أو الاستثناء}.
+    """
+    tables = list(tables if tables is not None else SHEETS)
+    results = {}
+    if modified:
+        with connection() as conn:
+            # الجدول الفارغ محلياً (بعد فقد البيانات مثلاً) يُسحب دائماً كما في pull_table
+            unchanged = [t for t in tables if _sync_state(conn, t, "pull")[1] == modified
+                         and conn.execute(f"SELECT EXISTS (SELECT 1 FROM {t})").fetchone()[0]]
+        for table in unchanged:
+            results[table] = {"inserted": 0, "updated": 0, "deleted": 0}
+        tables = [t for t in tables if t not in unchanged]
+    for table, sheet_df in fetch_sheets(reader, tables).items():
+        if isinstance(sheet_df, Exception):
+            results[table] = sheet_df
+            continue
+        if sheet_df is None or sheet_df.empty:
+            results[table] = {"inserted": 0, "updated": 0, "deleted": 0}
+            continue
+        try:
+            with _table_locks[table]:
+                results[table] = pull_table(table, sheet_df, modified)
+        except Exception as e:
+            results[table] = e
+    return results
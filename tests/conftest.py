@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+
+import database  # noqa: E402
+import fake_script_server  # noqa: E402
+from benchmarks import datagen  # noqa: E402
+from query_cache import clear_cache  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    """قاعدة تجريبية صغيرة بالمخطط الكامل (100 شريك وبند خطة، 50 فعالية، 10 تقارير)"""
+    path = str(tmp_path / "test.db")
+    datagen.generate(path, 100)
+    database.configure(path)
+    clear_cache()
+    yield path
+    database.close_all()
+
+
+@pytest.fixture
+def script():
+    """خادم Apps Script محلي؛ يعيد FakeScript وعنوانه في script.url"""
+    server, fake, url = fake_script_server.start()
+    fake.url = url
+    yield fake
+    server.shutdown()
+    server.server_close()
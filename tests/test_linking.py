@@ -0,0 +1,31 @@
+import database
+import linking
+
+
+def _event_name(event_id):
+    with database.connection() as conn:
+        return conn.execute("SELECT name FROM events WHERE id = ?", (event_id,)).fetchone()[0]
+
+
+def test_reading_links_writes_nothing(db):
+    traced = []
+    database.set_statement_trace(traced.append)
+    try:
+        links = linking.partner_event_links()
+    finally:
+        database.set_statement_trace(None)
+    assert links
+    assert not [sql for sql in traced if sql.lstrip().upper().startswith(("INSERT", "UPDATE", "DELETE"))]
+
+
+def test_refresh_links_after_write_invalidates_cache(db):
+    with database.connection("parents", "events") as conn:
+        partner = conn.execute("INSERT INTO parents (name) VALUES ('شريكفريد')").lastrowid
+        conn.execute("INSERT INTO events (name) VALUES ('أمسية شريكفريد الثقافية')")
+    assert partner not in linking.partner_event_links()
+    linking.refresh_links()
+    assert linking.partner_event_links()[partner] == ["أمسية شريكفريد الثقافية"]
+    # الروابط اليدوية تبقى بعد إعادة الحساب
+    linking.link_partner(partner, 1)
+    linking.refresh_links()
+    assert sorted(linking.partner_event_links()[partner]) == sorted(["أمسية شريكفريد الثقافية", _event_name(1)])
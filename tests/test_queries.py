@@ -0,0 +1,18 @@
+import database
+import queries
+import whatsapp
+
+
+def test_partner_count_matches_filters(db):
+    with database.connection() as conn:
+        expected = conn.execute("SELECT COUNT(*) FROM parents WHERE interaction_level = 'مرتفع'").fetchone()[0]
+    assert queries.partner_count() == 100
+    assert queries.partner_count(interaction_level="مرتفع") == expected
+
+
+def test_partner_page_and_links_cover_one_page(db):
+    page = queries.partner_page(2, 20, sort="newest")
+    assert page["id"].tolist() == list(range(80, 60, -1))
+    links = whatsapp.partner_links(page, "thanks_short")
+    assert list(links.index) == page["id"].tolist()
+    assert all(link.startswith(whatsapp.WHATSAPP_URL) for link in links if link)
@@ -0,0 +1,133 @@
+import sqlite3
+
+import database
+import report_archive
+import search
+from database import read_source
+
+
+def _reports():
+    with database.connection() as conn:
+        return conn.execute(f"SELECT id, report_date, report_content FROM {read_source('reports')} ORDER BY id").fetchall()
+
+
+def test_generated_reports_are_compressed(db):
+    with database.connection() as conn:
+        plain, total = conn.execute("SELECT COUNT(report_content), COUNT(*) FROM reports").fetchone()
+        stored = conn.execute("SELECT SUM(size), SUM(length(content)) FROM report_bodies").fetchone()
+    assert plain == 0 and total == 10
+    assert stored[1] < stored[0]
+    assert all(text.startswith("تقرير دوري") for _, _, text in _reports())
+
+
+def test_identical_reports_share_one_body(db):
+    report_archive.save_report("تقرير مكرر\nسطر ثان", "2026-10-01 09:00")
+    report_archive.save_report("تقرير مكرر\nسطر ثان", "2026-10-02 09:00")
+    with database.connection() as conn:
+        ids = conn.execute("SELECT DISTINCT body_id FROM reports WHERE report_date LIKE '2026-10-0%'").fetchall()
+        title = conn.execute("SELECT title FROM report_bodies WHERE id = ?", ids[0]).fetchone()[0]
+    assert len(ids) == 1
+    assert title == "تقرير مكرر"
+    assert {r[2] for r in _reports()[-2:]} == {"تقرير مكرر\nسطر ثان"}
+
+
+def test_external_writes_need_no_app_functions(db):
+    # اتصال sqlite3 عادي بلا دوال الضغط (كأداة sqlite3 أو عملية أخرى)
+    ext = sqlite3.connect(db)
+    ext.execute("INSERT INTO reports (report_date, report_content) VALUES ('2026-11-01', 'تقرير خارجي عن المعرض')")
+    ext.execute("UPDATE reports SET report_date = '2025-01-01' WHERE id = 1")
+    ext.execute("DELETE FROM reports WHERE id = 2")
+    ext.commit()
+    assert ext.execute("SELECT COUNT(*) FROM reports").fetchone()[0] == 10
+    ext.close()
+
+    assert "التقارير" in search.search("المعرض")
+    assert report_archive.compact_archive() == 1
+    assert "التقارير" in search.search("المعرض")
+    rows = {row[0]: row for row in _reports()}
+    assert rows[1][1] == "2025-01-01" and rows[1][2].startswith("تقرير دوري")
+    assert 2 not in rows
+
+
+def _orphans():
+    with database.connection() as conn:
+        return conn.execute("""SELECT COUNT(*) FROM report_bodies b
+                               WHERE NOT EXISTS (SELECT 1 FROM reports WHERE body_id = b.id)""").fetchone()[0]
+
+
+def test_rewriting_a_compressed_report_detaches_its_body(db):
+    report_archive.save_report("نص قديم فريد", "2026-09-01")
+    report_archive.save_report("نص ثان للحذف", "2026-09-02")
+    ext = sqlite3.connect(db)
+    ext.execute("UPDATE reports SET report_content = 'نص جديد' WHERE id = 11")
+    ext.execute("UPDATE reports SET report_content = NULL WHERE id = 4")
+    ext.execute("UPDATE reports SET report_date = '2027-01-01' WHERE id = 5")
+    ext.execute("DELETE FROM reports WHERE id = 12")
+    ext.commit()
+    ext.close()
+
+    report_archive.compact_archive()
+    rows = {row[0]: row[2] for row in _reports()}
+    assert rows[11] == "نص جديد" and rows[4] is None
+    assert _orphans() == 0
+    assert search.search("جديد")["التقارير"]["id"].tolist() == [11]
+    assert search.search("2027")["التقارير"]["id"].tolist() == [5]
+    # النصوص المحذوفة من الفهرس لا تعيد أي نتيجة
+    assert search.search("فريد") == {} and search.search("للحذف") == {}
+
+
+def test_search_index_keeps_no_copy_of_texts(db):
+    text = "تقرير مكرر عن الأنشطة والفعاليات المدرسية\n" + "تفاصيل " * 200
+    for _ in range(50):
+        report_archive.save_report(text)
+    with database.connection() as conn:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE name LIKE 'search_index%'")}
+        index_bytes = conn.execute("SELECT SUM(length(block)) FROM search_index_data").fetchone()[0]
+        body_bytes = conn.execute("SELECT SUM(length(content)) FROM report_bodies").fetchone()[0]
+        plain_bytes = conn.execute("SELECT SUM(length(CAST(report_content AS BLOB))) FROM reports").fetchone()[0]
+    assert "search_index_content" not in tables
+    assert plain_bytes is None
+    # 50 نسخة من النص: تُخزن مضغوطة مرة واحدة، والفهرس (لكل الجداول) أصغر كثيراً من نسخها العادية
+    plain = 50 * len(text.encode("utf-8"))
+    assert index_bytes < plain / 3
+    assert body_bytes < len(text.encode("utf-8")) * 2
+
+
+def test_archive_page_filters_by_date(db):
+    report_archive.save_report("تقرير أكتوبر", "2030-10-05 10:00")
+    report_archive.save_report("تقرير نوفمبر", "2030-11-05 10:00")
+    from datetime import date
+    assert report_archive.report_count(date(2030, 10, 1), date(2030, 10, 31)) == 1
+    page = report_archive.report_page(0, 10, date(2030, 1, 1))
+    assert page["title"].tolist() == ["تقرير نوفمبر", "تقرير أكتوبر"]
+    assert report_archive.report_body(int(page["id"][0])) == "تقرير نوفمبر"
+
+
+def test_upgrade_compresses_existing_reports(tmp_path, monkeypatch):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    monkeypatch.setattr(database, "MIGRATIONS", database.MIGRATIONS[:11])
+    database.migrate(conn)
+    for text in ("تقرير أول عن الرحلة", "تقرير ثان", "تقرير أول عن الرحلة"):
+        conn.execute("INSERT INTO reports (report_date, report_content) VALUES ('2026-05-01', ?)", (text,))
+    conn.execute("DELETE FROM reports WHERE id = 2")
+    conn.commit()
+    monkeypatch.undo()
+
+    assert database.migrate(conn) == database.MIGRATIONS[-1][0]
+    # المخطط لا يعتمد على دوال Python: اتصال sqlite3 عادي يقرأ ويكتب التقارير
+    assert conn.execute("SELECT type FROM sqlite_master WHERE name = 'reports'").fetchone()[0] == "table"
+    assert conn.execute("SELECT COUNT(*) FROM reports WHERE report_content IS NULL").fetchone()[0] == 2
+    conn.close()
+    database.configure(path)
+    try:
+        rows = _reports()
+        assert [(r[0], r[2]) for r in rows] == [(1, "تقرير أول عن الرحلة"), (3, "تقرير أول عن الرحلة")]
+        with database.connection() as conn:
+            assert conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'reports'").fetchone()[0] == 3
+            assert conn.execute("SELECT COUNT(*) FROM report_bodies").fetchone()[0] == 1
+        assert search.search("الرحلة")["التقارير"]["id"].tolist() == [1, 3]
+        report_archive.save_report("تقرير جديد")
+        assert _reports()[-1][0] == 4
+    finally:
+        database.close_all()
@@ -0,0 +1,146 @@
+import pandas as pd
+import pytest
+
+import database
+import sync
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    # لا انتظار بين المحاولات، وكل اختبار يبدأ بسكربت يفهم صيغة delta
+    monkeypatch.setattr(sync, "POST_BACKOFF", 0)
+    monkeypatch.setattr(sync, "_delta_supported", True)
+
+
+def _count(table):
+    with database.connection() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def _sheet(script, table):
+    return script.sheets[sync.SHEETS[table][0]]
+
+
+def test_post_retries_on_503(db, script):
+    script.fail_next = sync.POST_RETRIES
+    assert sync.push_table(script.url, "parents")
+    assert script.fail_next == 0
+    assert len(_sheet(script, "parents")["rows"]) == _count("parents")
+
+
+def test_push_fails_after_retries_exhausted(db, script):
+    script.fail_next = sync.POST_RETRIES + 1
+    assert not sync.push_table(script.url, "parents")
+    assert script.requests == []
+
+
+def test_push_all_runs_tables_in_parallel(db, script):
+    script.delay = 0.2
+    tables = ["action_plan", "parents", "events", "reports"]
+    results = sync.push_all(script.url, tables)
+    assert list(results) == tables
+    assert all(r["ok"] for r in results.values())
+    assert script.max_in_flight > 1
+    for table in tables:
+        assert len(_sheet(script, table)["rows"]) == _count(table)
+
+
+def test_unchanged_push_sends_nothing(db, script):
+    assert sync.push_table(script.url, "events")
+    sent = len(script.requests)
+    assert sync.push_table(script.url, "events")
+    assert len(script.requests) == sent
+
+
+def test_delta_push_sends_only_changes(db, script):
+    assert sync.push_table(script.url, "parents")
+    sent = len(script.requests)
+    with database.connection("parents") as conn:
+        conn.execute("UPDATE parents SET expertise = 'تعديل' WHERE id IN (3, 7)")
+        conn.execute("DELETE FROM parents WHERE id = 5")
+    assert sync.push_table(script.url, "parents")
+
+    new = script.requests[sent:]
+    assert [p["action"] for p in new] == ["delta"]
+    assert sorted(int(row[0]) for row in new[0]["upserts"]) == [3, 7]
+    assert new[0]["deletes"] == ["5"]
+    rows = {int(row[0]): row for row in _sheet(script, "parents")["rows"]}
+    assert 5 not in rows
+    assert rows[3][3] == "تعديل"
+    assert len(rows) == _count("parents")
+
+
+def test_large_push_is_chunked(db, script, monkeypatch):
+    monkeypatch.setattr(sync, "MAX_CHUNK_BYTES", 2000)
+    assert sync.push_table(script.url, "action_plan")
+
+    actions = [p["action"] for p in script.requests]
+    assert actions[0] == "begin" and actions[-1] == "commit"
+    appends = [p for p in script.requests if p["action"] == "append"]
+    assert len(appends) > 1 and set(actions[1:-1]) == {"append"}
+    assert [p["seq"] for p in appends] == list(range(len(appends)))
+    assert script.requests[-1]["rowCount"] == _count("action_plan")
+    assert len(_sheet(script, "action_plan")["rows"]) == _count("action_plan")
+
+
+def test_pull_table_merges_by_id(db):
+    _, columns = sync.sheet_columns("events")
+    with database.connection() as conn:
+        frame = pd.DataFrame(list(sync._iter_rows(conn, "events")), columns=columns)
+    frame.loc[frame[sync.ID_COLUMN] == "2", "المكان"] = "مكان من الورقة"
+    frame = frame[frame[sync.ID_COLUMN] != "4"]
+    frame.loc[len(frame) + 1] = ["", "فعالية من الورقة", "2026-01-01", "المسرح", "30"]
+
+    counts = sync.pull_table("events", frame)
+
+    assert counts == {"inserted": 1, "updated": 1, "deleted": 1}
+    with database.connection() as conn:
+        assert conn.execute("SELECT location FROM events WHERE id = 2").fetchone()[0] == "مكان من الورقة"
+        assert conn.execute("SELECT 1 FROM events WHERE id = 4").fetchone() is None
+        assert conn.execute("SELECT COUNT(*) FROM events WHERE name = 'فعالية من الورقة'").fetchone()[0] == 1
+    # نفس الورقة مرة ثانية لا تغير شيئاً
+    assert not any(sync.pull_table("events", frame).values())
+
+
+def test_pull_all_refills_empty_table_despite_unchanged_sheet(db):
+    _, columns = sync.sheet_columns("events")
+    with database.connection() as conn:
+        frame = pd.DataFrame(list(sync._iter_rows(conn, "events")), columns=columns)
+    reads = []
+
+    def reader(sheet):
+        reads.append(sheet)
+        return frame
+
+    sync.pull_all(reader, ["events"], modified="2026-10-01T00:00:00Z")
+    assert sync.pull_all(reader, ["events"], modified="2026-10-01T00:00:00Z")["events"] == {"inserted": 0, "updated": 0, "deleted": 0}
+    assert len(reads) == 1
+
+    with database.connection("events") as conn:
+        conn.execute("DELETE FROM events")
+    sync.pull_all(reader, ["events"], modified="2026-10-01T00:00:00Z")
+    assert len(reads) == 2
+    assert _count("events") == len(frame)
+
+
+def test_delta_push_does_not_hash_the_table(db, script, monkeypatch):
+    assert sync.push_table(script.url, "reports")
+    with database.connection("reports") as conn:
+        conn.execute("UPDATE reports SET report_date = '2026-02-02' WHERE id = 2")
+
+    rows_hash = sync.rows_hash
+
+    def full_scan(rows):
+        raise AssertionError("delta push read the whole table")
+    monkeypatch.setattr(sync, "rows_hash", full_scan)
+    assert sync.push_table(script.url, "reports")
+    assert script.requests[-1]["action"] == "delta"
+    with database.connection() as conn:
+        assert sync._sync_state(conn, "reports", "push")[0] is None
+    monkeypatch.setattr(sync, "rows_hash", rows_hash)
+
+    # الرفع الكامل التالي يعيد حساب البصمة فيرسل الجدول مرة واحدة ثم لا شيء
+    sent = len(script.requests)
+    assert sync.push_table(script.url, "reports", full=True)
+    assert sync.push_table(script.url, "reports", full=True)
+    assert len(script.requests) == sent + 1
@@ -0,0 +1,163 @@
+"""خادم محلي يحاكي سكربت Apps Script (apps_script/Code.gs) لتجربة المزامنة دون جوجل
+
+التشغيل:
+    python tools/fake_script_server.py --port 8765 --fail-rate 0.3 --delay 0.5
+ثم تشغيل التطبيق مع SCRIPT_URL=http://127.0.0.1:8765/
+
+يحتفظ بالأوراق في الذاكرة ويطبق صيغ update و delta والرفع المجزأ (begin/append/commit)
+كما يفعل السكربت الحقيقي.
+--fail-rate يرد بـ 503 على نسبة من الطلبات لاختبار إعادة المحاولة، و --delay يضيف زمن استجابة.
+الاختبارات (tests/test_sync.py) تشغله عبر start() وتستخدم fail_next و max_in_flight.
+طلب GET يعيد محتوى الأوراق الحالي بصيغة JSON.
+"""
+import argparse
+import base64
+import gzip
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeScript:
+    def __init__(self, fail_rate=0.0, delay=0.0):
+        self.fail_rate = fail_rate
+        self.delay = delay
+        self.sheets = {}
+        self.uploads = {}
+        self.requests = []
+        self.lock = threading.Lock()
+        # عدد الطلبات القادمة التي يُرد عليها بـ 503 (فشل محدد لاختبار إعادة المحاولة)
+        self.fail_next = 0
+        # الطلبات قيد المعالجة الآن، وأقصى عدد متزامن منها (لاختبار الرفع المتوازي)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def begin_request(self):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                return False
+            return True
+
+    def end_request(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def handle(self, payload):
+        # نفس منطق doPost في Code.gs، تحت قفل واحد كما يفعل LockService
+        with self.lock:
+            self.requests.append(payload)
+            action = payload.get("action")
+            if action == "update":
+                self.sheets[payload["sheetName"]] = {"columns": payload["columns"], "rows": payload["rows"]}
+            elif action == "delta":
+                return self._apply_delta(payload)
+            elif action == "begin":
+                self.uploads[payload["uploadId"]] = {"columns": payload["columns"], "rows": [], "seq": -1}
+            elif action == "append":
+                return self._append(payload)
+            elif action == "commit":
+                return self._commit(payload)
+            else:
+                return {"ok": False, "error": f"unknown action: {action}"}
+            return {"ok": True}
+
+    def _apply_delta(self, payload):
+        sheet = self.sheets.get(payload["sheetName"])
+        if sheet is None or payload["idColumn"] not in sheet["columns"]:
+            return {"ok": False, "error": "missing_id_column"}
+        id_index = sheet["columns"].index(payload["idColumn"])
+        rows = sheet["rows"]
+        row_by_id = {str(row[id_index]): i for i, row in enumerate(rows)}
+        for row in payload["upserts"]:
+            target = row_by_id.get(str(row[0]))
+            if target is None:
+                rows.append(row)
+            else:
+                rows[target] = row
+        deleted = {str(i) for i in payload["deletes"]}
+        sheet["rows"] = [row for row in rows if str(row[id_index]) not in deleted]
+        return {"ok": True}
+
+    def _append(self, payload):
+        upload = self.uploads.get(payload["uploadId"])
+        if upload is None:
+            return {"ok": False, "error": "unknown_upload"}
+        if payload["seq"] <= upload["seq"]:
+            return {"ok": True}
+        if payload["seq"] != upload["seq"] + 1:
+            return {"ok": False, "error": "out_of_order"}
+        rows = payload["rows"]
+        if payload.get("encoding") == "gzip":
+            rows = json.loads(gzip.decompress(base64.b64decode(rows)).decode("utf-8"))
+        upload["rows"].extend(rows)
+        upload["seq"] = payload["seq"]
+        return {"ok": True}
+
+    def _commit(self, payload):
+        upload = self.uploads.pop(payload["uploadId"], None)
+        if upload is None:
+            return {"ok": False, "error": "unknown_upload"}
+        if len(upload["rows"]) != payload["rowCount"]:
+            return {"ok": False, "error": "row_count_mismatch"}
+        self.sheets[payload["sheetName"]] = {"columns": upload["columns"], "rows": upload["rows"]}
+        return {"ok": True}
+
+
+def make_handler(script):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            accept = script.begin_request()
+            try:
+                if script.delay:
+                    time.sleep(script.delay)
+                if not accept or random.random() < script.fail_rate:
+                    self._reply(503, {"ok": False, "error": "unavailable"})
+                    return
+                self._reply(200, script.handle(json.loads(body)))
+            finally:
+                script.end_request()
+
+        def do_GET(self):
+            with script.lock:
+                self._reply(200, script.sheets)
+
+        def _reply(self, status, obj):
+            out = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+        def log_message(self, *args):
+            pass
+    return Handler
+
+
+def start(port=0, fail_rate=0.0, delay=0.0):
+    """تشغيل الخادم في خيط خلفي؛ تعيد (server, script, url)"""
+    script = FakeScript(fail_rate, delay)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(script))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, script, f"http://127.0.0.1:{server.server_port}/"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="محاكي سكربت Apps Script للمزامنة")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--delay", type=float, default=0.0)
+    args = parser.parse_args()
+    server, _, url = start(args.port, args.fail_rate, args.delay)
+    print(f"Fake Apps Script listening on {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,66 @@
+from string import Formatter
+from urllib.parse import quote
+
+import pandas as pd
+
+WHATSAPP_URL = "https://api.whatsapp.com/send"
+
+SIGNATURE = "أ . توفيق اليعقوبي (مشرف تنمية علاقات مجتمعية)"
+
+# قوالب الرسائل؛ الحقول {name} و {p_type} تُملأ من بيانات الشريك
+TEMPLATES = {
+    # رسالة الشكر المطولة (عمود المراسلة الذكية في جدول الشركاء)
+    "thanks": f"""الأخ الفاضل الأستاذ {{name}} المحترم،،
+
+السلام عليكم ورحمة الله وبركاته..
+يسرنا في قسم تنمية العلاقات المجتمعية أن نتقدم لشخصكم الكريم بخالص الشكر وعظيم الامتنان على مساهماتكم القيمة وتفاعلكم المستمر في مجال ({{p_type}}). إننا نؤمن يقيناً بأن نجاح مبادراتنا يعتمد بشكل كبير على وجود شركاء متميزين مثلكم، ونثمن عالياً هذا العطاء الذي يعكس روح المسؤولية والتعاون المشترك. نتطلع دوماً لاستمرار هذا التعاون المثمر، ونسأل الله العلي القدير أن يبارك في جهودكم ويسدد خطاكم لما فيه خير الجميع.
+
+تفضلوا بقبول فائق التقدير والامتنان،،
+{SIGNATURE}""",
+    # رسالة الشكر المختصرة (بطاقات الشركاء)
+    "thanks_short": f"السلام عليكم ورحمة الله وبركاته الأستاذ {{name}}، نتقدم لكم بخالص الشكر لمساهمتكم في ({{p_type}}).\n\n{SIGNATURE}",
+}
+
+# حقول القوالب -> أعمدة جدول الشركاء
+TEMPLATE_FIELDS = {"name": "name", "p_type": "participation_type"}
+
+
+def encode(text):
+    """ترميز نسبي كامل (UTF-8) صالح لمعامل text في الرابط، بما فيه & و # والحروف العربية"""
+    return quote(str(text), safe="")
+
+
+def clean_phones(phones):
+    """إبقاء الأرقام فقط من أرقام الهواتف (عملية متجهة على العمود كاملاً)"""
+    return phones.fillna("").astype(str).str.replace(r"\D", "", regex=True)
+
+
+def whatsapp_link(phone, text):
+    """رابط واتساب لرقم واحد ونص جاهز، أو "" إذا لم يكن هناك رقم صالح"""
+    digits = "".join(filter(str.isdigit, str(phone or "")))
+    if not digits:
+        return ""
+    return f"{WHATSAPP_URL}?phone={digits}&text={encode(text)}"
+
+
+def build_links(df, template):
+    """روابط واتساب لكل صفوف الشركاء دفعة واحدة
+
+    أجزاء القالب الثابتة تُرمّز مرة واحدة، وقيم الحقول تُرمّز مرة لكل قيمة مختلفة،
+    ثم تُجمع الأجزاء بعمليات نصية على الأعمدة بدلاً من apply لكل صف.
+    """
+    phones = clean_phones(df["phone"]) if "phone" in df.columns else pd.Series("", index=df.index)
+    links = WHATSAPP_URL + "?phone=" + phones + "&text="
+    for literal, field, _, _ in Formatter().parse(TEMPLATES[template]):
+        if literal:
+            links = links + encode(literal)
+        if field is not None:
+            values = df[TEMPLATE_FIELDS[field]].fillna("").astype(str)
+            links = links + values.map({v: encode(v) for v in values.unique()})
+    names = df["name"].fillna("").astype(str).str.strip()
+    return links.where((phones != "") & (names != ""), "")
+
+
+def partner_links(df, template):
+    """روابط القالب لصفوف الشركاء المعروضة فقط (صفحة واحدة) كسلسلة مفهرسة بمعرف الشريك"""
+    return pd.Series(build_links(df, template).values, index=df["id"].values)